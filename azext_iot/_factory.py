@@ -11,6 +11,11 @@ Factory functions for IoT Hub and Device Provisioning Service.
 from azext_iot.common.sas_token_auth import SasTokenAuthentication
 from azext_iot.common.utility import ensure_iotdps_sdk_min_version
 from azext_iot.common.auth import IoTOAuth
+from azext_iot.common.rate_governor import (
+    RateGovernedPipeline,
+    exempt_throttled_retries,
+    get_rate_governor,
+)
 from azext_iot.common.shared import SdkType, AuthenticationTypeDataplane
 from azext_iot.constants import (
     IOTDPS_TRACK_2_SDK_MIN_VERSION,
@@ -85,6 +90,13 @@ class SdkResolver(object):
         sdk_client = sdk_map[sdk_type]()
         sdk_client.config.enable_http_logger = True
         sdk_client.config.add_user_agent(USER_AGENT)
+        if sdk_type in (SdkType.service_sdk, SdkType.device_sdk):
+            # clients are created per call, pacing is shared through the process-wide governor.
+            # Throttled requests are retried by the governor instead of per connection by urllib3.
+            exempt_throttled_retries(sdk_client.config.retry_policy.policy)
+            sdk_client.config.pipeline = RateGovernedPipeline(
+                sdk_client.config.pipeline, get_rate_governor()
+            )
         return sdk_client
 
     def _construct_sdk_map(self):
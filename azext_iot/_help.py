@@ -69,6 +69,21 @@ helps[
     - name: Receive all messages and parse message payload as JSON
       text: >
         az iot hub monitor-events -n {iothub_name} --content-type application/json
+    - name: Receive all messages as newline delimited JSON (one event per line), suitable for piping to other tools
+      text: >
+        az iot hub monitor-events -n {iothub_name} --content-type application/json --compact
+    - name: Receive all messages using one worker process per CPU core, for hubs with many busy partitions
+      text: >
+        az iot hub monitor-events -n {iothub_name} --workers 0 --compact
+    - name: Resume monitoring after the last event processed by a previous run with the same consumer group
+      text: >
+        az iot hub monitor-events -n {iothub_name} --cg {consumer_group_name} --checkpoint
+    - name: Monitor a busy IoT Hub, dropping the oldest buffered events when output cannot keep up
+      text: >
+        az iot hub monitor-events -n {iothub_name} --queue-size 500 --overflow dropOldest
+    - name: Print message rates, payload sizes and latency for all devices instead of individual events
+      text: >
+        az iot hub monitor-events -n {iothub_name} --stats
 """
 
 helps[
@@ -187,6 +202,13 @@ helps[
 ] = """
     type: command
     short-summary: List devices in an IoT Hub.
+    examples:
+    - name: List all devices as NDJSON, writing devices as they are received.
+      text: >
+        az iot hub device-identity list -n {iothub_name} --top -1 --stream
+    - name: List the id and status of all edge devices.
+      text: >
+        az iot hub device-identity list -n {iothub_name} --top -1 --ee --fields deviceId status
 """
 
 helps[
@@ -654,6 +676,12 @@ helps[
     - name: Query all module twin data on target device.
       text: >
         az iot hub query -n {iothub_name} -q "select * from devices.modules where devices.deviceId = '{device_id}'"
+    - name: Stream all device twins as NDJSON to a file, with constant memory use.
+      text: >
+        az iot hub query -n {iothub_name} -q "select * from devices" --stream > twins.ndjson
+    - name: Scan all device twins of a large hub with 8 concurrent queries over deviceId ranges.
+      text: >
+        az iot hub query -n {iothub_name} -q "select * from devices" --parallel 8 --stream > twins.ndjson
 """
 
 helps[
@@ -1109,6 +1137,10 @@ helps[
 ] = """
     type: command
     short-summary: List individual device enrollments in an Azure IoT Hub Device Provisioning Service.
+    examples:
+    - name: List all individual enrollments as NDJSON, writing enrollments as they are received.
+      text: >
+        az iot dps enrollment list --dps-name {dps_name} --stream
 """
 
 helps[
@@ -1244,6 +1276,10 @@ helps[
 ] = """
     type: command
     short-summary: List enrollments groups in an Azure IoT Hub Device Provisioning Service.
+    examples:
+    - name: List all enrollment groups as NDJSON, writing enrollment groups as they are received.
+      text: >
+        az iot dps enrollment-group list --dps-name {dps_name} --stream
 """
 
 helps[
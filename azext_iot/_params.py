@@ -33,6 +33,7 @@ from azext_iot.common.shared import (
     AuthenticationType,
     AuthenticationTypeDataplane,
     RenewKeyType,
+    MonitorOverflowType,
 )
 from azext_iot._validators import mode2_iot_login_handler
 from azext_iot.assets.user_messages import info_param_properties_device
@@ -79,6 +80,14 @@ children_list_prop_type = CLIArgumentType(
     help="Child device list (space separated).",
 )
 
+query_stream_type = CLIArgumentType(
+    options_list=["--stream"],
+    arg_type=get_three_state_flag(),
+    help="Write each result record as a single line of JSON (NDJSON) as result pages are received, "
+    "instead of returning one JSON array once all pages are received. Memory use does not grow "
+    "with the result size. The --output format does not apply.",
+)
+
 event_timeout_type = CLIArgumentType(
     options_list=["--timeout", "--to", "-t"],
     type=int,
@@ -390,6 +399,57 @@ def load_arguments(self, _):
             options_list=["--interface", "-i"],
             help="Target interface identifier to filter on. For example: dtmi:com:example:TemperatureController;1",
         )
+        context.argument(
+            "compact",
+            options_list=["--compact"],
+            arg_type=get_three_state_flag(),
+            help="Output each event as a single line of JSON (NDJSON). Only applies to JSON output. "
+            "Recommended when piping events to other tools.",
+        )
+        context.argument(
+            "prefetch",
+            options_list=["--prefetch"],
+            type=int,
+            help="Maximum number of messages each partition receiver requests from the service ahead of processing "
+            "(AMQP link credit). Larger values increase throughput on busy hubs at the cost of memory.",
+        )
+        context.argument(
+            "workers",
+            options_list=["--workers"],
+            type=int,
+            help="Number of worker processes to shard Event Hub partitions across. Each worker uses its own "
+            "connection and parser. Use 0 to size from the CPU count. Not supported on Windows.",
+        )
+        context.argument(
+            "checkpoint",
+            options_list=["--checkpoint"],
+            arg_type=get_three_state_flag(),
+            help="Record the offset of processed events per hub, consumer group and partition in a local store. "
+            "When a checkpoint exists, monitoring resumes after the checkpointed offset and --enqueued-time is ignored.",
+        )
+        context.argument(
+            "queue_size",
+            options_list=["--queue-size"],
+            type=int,
+            help="Parse and output events on a separate thread, behind a buffer of at most this many received "
+            "message batches, so a slow consumer does not stall receiving. By default events are parsed as they "
+            "are received.",
+        )
+        context.argument(
+            "overflow",
+            options_list=["--overflow"],
+            arg_type=get_enum_type(MonitorOverflowType),
+            help="Behavior when the --queue-size buffer between receivers and parsing is full. 'block' pauses "
+            "receiving until buffered events are processed, 'dropNewest' and 'dropOldest' discard events to keep up.",
+        )
+        context.argument(
+            "stats",
+            options_list=["--stats"],
+            arg_type=get_three_state_flag(),
+            help="Print aggregated statistics instead of events: per-device and per-partition message rates, "
+            "payload size histogram and enqueue-to-receive latency. Payloads are not decoded. "
+            "A summary is printed every 10 seconds and a final report when monitoring stops.",
+        )
 
     with self.argument_context("iot hub monitor-feedback") as context:
         context.argument(
@@ -559,6 +619,28 @@ def load_arguments(self, _):
             type=int,
             help="Maximum number of elements to return. By default query has no cap.",
         )
+        context.argument("stream", arg_type=query_stream_type)
+        context.argument(
+            "parallel",
+            options_list=["--parallel"],
+            type=int,
+            help="Split the query into this many queries over disjoint deviceId ranges and run them "
+            "concurrently. Records are returned in no particular order, without duplicates. "
+            "Supports 'select ... from devices [where ...]' and 'select ... from devices.modules "
+            "[where ...]' queries without aggregation, group by, order by or top. Throttled requests "
+            "pause all slices for the Retry-After returned by the service.",
+        )
+
+    with self.argument_context("iot hub device-identity list") as context:
+        context.argument("stream", arg_type=query_stream_type)
+        context.argument(
+            "fields",
+            options_list=["--fields"],
+            nargs="+",
+            help="Space-separated list of device twin fields to return, such as deviceId or "
+            "properties.reported.firmware. The projection is applied by the service, so only "
+            "the requested fields are transferred.",
+        )
 
     with self.argument_context("iot device") as context:
         context.argument(
@@ -1016,6 +1098,9 @@ def load_arguments(self, _):
             help="Include attestation keys and information in enrollment results.",
         )
 
+    with self.argument_context("iot dps enrollment list") as context:
+        context.argument("stream", arg_type=query_stream_type)
+
     with self.argument_context("iot dps enrollment update") as context:
         context.argument(
             "endorsement_key",
@@ -1023,6 +1108,9 @@ def load_arguments(self, _):
             help="TPM endorsement key for a TPM device.",
         )
 
+    with self.argument_context("iot dps enrollment-group list") as context:
+        context.argument("stream", arg_type=query_stream_type)
+
     with self.argument_context("iot dps enrollment-group") as context:
         context.argument(
             "enrollment_id",
@@ -1253,10 +1253,22 @@ def _load_central_monitors_help():
                     Polls device-twin from central and compares it to the last device-twin
                     Parses out properties from device-twin, and detects if changes were made
                     Prints subset of properties that were changed within the polling interval
+                    The polling interval shortens while properties change and backs off while they don't,
+                    between 10 and 60 seconds.
+                    Multiple devices, selected with --device-ids, --template or a --device-id pattern,
+                    are polled concurrently from a single process, as often as every 2 seconds.
+                    With --source events, device twin change notifications are read from the app's
+                    event stream instead of polling.
         examples:
         - name: Basic usage
           text: >
             az iot central diagnostics monitor-properties --app-id {app_id} -d {device_id}
+        - name: Monitor properties of all devices using a device template
+          text: >
+            az iot central diagnostics monitor-properties --app-id {app_id} --template {template_id}
+        - name: Monitor property changes of all devices from twin change notifications
+          text: >
+            az iot central diagnostics monitor-properties --app-id {app_id} --source events
     """
 
     helps[
@@ -1273,6 +1285,12 @@ def _load_central_monitors_help():
         - name: Basic usage
           text: >
             az iot central diagnostics validate-properties --app-id {app_id} -d {device_id}
+        - name: Validate reported properties of several devices
+          text: >
+            az iot central diagnostics validate-properties --app-id {app_id} --device-ids {device_id_1} {device_id_2}
+        - name: Validate reported properties of devices matching a pattern from twin change notifications
+          text: >
+            az iot central diagnostics validate-properties --app-id {app_id} --source events -d 'sensor-*'
     """
 
     helps[
@@ -13,6 +13,10 @@ from azext_iot.central.models.v1_1_preview import TemplateV1_1_preview
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.common import utility
 from azext_iot.central.providers import CentralDeviceTemplateProvider
+from azext_iot.central.providers.template_store import (
+    DeviceTemplateStore,
+    get_default_template_store_path,
+)
 from azext_iot.central.models.enum import ApiVersion
 
 
@@ -25,7 +29,11 @@ def get_device_template(
     api_version=ApiVersion.v1.value,
 ) -> Union[TemplatePreview, TemplateV1, TemplateV1_1_preview]:
     provider = CentralDeviceTemplateProvider(
-        cmd=cmd, app_id=app_id, token=token, api_version=api_version
+        cmd=cmd,
+        app_id=app_id,
+        token=token,
+        api_version=api_version,
+        template_store=DeviceTemplateStore(get_default_template_store_path(cmd)),
     )
 
     template = provider.get_device_template(
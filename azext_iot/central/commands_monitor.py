@@ -5,17 +5,18 @@
 # --------------------------------------------------------------------------------------------
 
 
+from knack.util import CLIError
 from azure.cli.core.commands import AzCliCommand
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.central.providers.monitor_provider import MonitorProvider
-from azext_iot.monitor.models.enum import Severity
+from azext_iot.monitor.models.enum import PropertySource, Severity
 from azext_iot.monitor.models.arguments import (
     CommonParserArguments,
     CommonHandlerArguments,
     CentralHandlerArguments,
     TelemetryArguments,
 )
-from azext_iot.monitor.property import PropertyMonitor
+from azext_iot.monitor.property import PropertyChangeReporter, PropertyMonitor
 
 
 def validate_messages(
@@ -122,34 +123,189 @@ def monitor_events(
 
 def monitor_properties(
     cmd,
-    device_id: str,
     app_id: str,
+    device_id: str = None,
+    device_ids=None,
+    template=None,
+    source=PropertySource.twin.value,
+    consumer_group="$Default",
+    timeout=0,
+    repair=False,
+    yes=False,
     token=None,
     central_dns_suffix=CENTRAL_ENDPOINT,
 ):
-    monitor = PropertyMonitor(
-        cmd=cmd,
+    if _is_single_device_poll(source, device_id, device_ids, template):
+        monitor = PropertyMonitor(
+            cmd=cmd,
+            app_id=app_id,
+            device_id=device_id,
+            token=token,
+            central_dns_suffix=central_dns_suffix,
+        )
+        monitor.start_property_monitor()
+        return
+
+    _start_multi_device_monitor(
+        cmd,
         app_id=app_id,
         device_id=device_id,
+        device_ids=device_ids,
+        template=template,
+        source=source,
+        consumer_group=consumer_group,
+        timeout=timeout,
+        repair=repair,
+        yes=yes,
         token=token,
         central_dns_suffix=central_dns_suffix,
     )
-    monitor.start_property_monitor()
 
 
 def validate_properties(
     cmd,
-    device_id: str,
     app_id: str,
+    device_id: str = None,
+    device_ids=None,
+    template=None,
+    source=PropertySource.twin.value,
+    consumer_group="$Default",
+    timeout=0,
+    repair=False,
+    yes=False,
     token=None,
     central_dns_suffix=CENTRAL_ENDPOINT,
     minimum_severity=Severity.warning.name,
 ):
-    monitor = PropertyMonitor(
+    if _is_single_device_poll(source, device_id, device_ids, template):
+        monitor = PropertyMonitor(
+            cmd=cmd,
+            app_id=app_id,
+            device_id=device_id,
+            token=token,
+            central_dns_suffix=central_dns_suffix,
+        )
+        monitor.start_validate_property_monitor(Severity[minimum_severity])
+        return
+
+    _start_multi_device_monitor(
+        cmd,
+        app_id=app_id,
+        device_id=device_id,
+        device_ids=device_ids,
+        template=template,
+        source=source,
+        consumer_group=consumer_group,
+        timeout=timeout,
+        repair=repair,
+        yes=yes,
+        token=token,
+        central_dns_suffix=central_dns_suffix,
+        minimum_severity=Severity[minimum_severity],
+    )
+
+
+def _is_single_device_poll(source, device_id, device_ids, template) -> bool:
+    if source != PropertySource.twin.value or device_ids or template:
+        return False
+
+    if not device_id:
+        raise CLIError(
+            "--device-id, --device-ids or --template is required when monitoring properties "
+            "with --source {}.".format(PropertySource.twin.value)
+        )
+
+    return "*" not in device_id and "?" not in device_id
+
+
+def _start_multi_device_monitor(
+    cmd,
+    app_id,
+    device_id,
+    device_ids,
+    template,
+    source,
+    consumer_group,
+    timeout,
+    repair,
+    yes,
+    token,
+    central_dns_suffix,
+    minimum_severity: Severity = None,
+):
+    reporter = PropertyChangeReporter(
         cmd=cmd,
         app_id=app_id,
+        token=token,
+        central_dns_suffix=central_dns_suffix,
+        minimum_severity=minimum_severity,
+    )
+
+    # the event stream is filtered on device id patterns directly, the app device list
+    # is only needed to select devices by template or to poll their twins
+    if not device_ids and (template or source == PropertySource.twin.value):
+        device_ids = reporter.list_device_ids(device_id_pattern=device_id, template=template)
+        device_id = None
+        if not device_ids:
+            raise CLIError("No devices found matching the specified device id or template.")
+
+    if source == PropertySource.twin.value:
+        reporter.start_poll_monitor(device_ids)
+        return
+
+    _start_property_change_monitor(
+        cmd,
+        app_id=app_id,
         device_id=device_id,
+        device_ids=device_ids,
+        consumer_group=consumer_group,
+        timeout=timeout,
+        repair=repair,
+        yes=yes,
         token=token,
         central_dns_suffix=central_dns_suffix,
+        on_change=reporter.on_change,
+    )
+
+
+def _start_property_change_monitor(
+    cmd,
+    app_id,
+    device_id,
+    device_ids,
+    consumer_group,
+    timeout,
+    repair,
+    yes,
+    token,
+    central_dns_suffix,
+    on_change,
+):
+    telemetry_args = TelemetryArguments(
+        cmd,
+        timeout=timeout,
+        properties=None,
+        enqueued_time=None,
+        repair=repair,
+        yes=yes,
+    )
+    common_handler_args = CommonHandlerArguments(
+        output=telemetry_args.output,
+        common_parser_args=CommonParserArguments(),
+        device_id=device_id,
+        devices=device_ids,
+    )
+    central_handler_args = CentralHandlerArguments(
+        duration=0,
+        max_messages=0,
+        common_handler_args=common_handler_args,
+    )
+    provider = MonitorProvider(
+        cmd=cmd,
+        app_id=app_id,
+        token=token,
+        consumer_group=consumer_group,
+        central_dns_suffix=central_dns_suffix,
+        central_handler_args=central_handler_args,
     )
-    monitor.start_validate_property_monitor(Severity[minimum_severity])
+    provider.start_monitor_property_changes(telemetry_args, on_change)
@@ -13,7 +13,11 @@ class BaseTemplate(metaclass=ABCMeta):
         self.id = None
         self.schema_names = None
         self.raw_template = template
+        self.etag = None
+        self._schema_index = None
+        self._validators = {}
         try:
+            self.etag = template.get("etag")
             self.name = template.get("displayName")
             self.components = self._extract_components(template)
             if self.components:
@@ -24,6 +28,52 @@ class BaseTemplate(metaclass=ABCMeta):
         except Exception:
             raise CLIError("Could not parse iot central device template.")
 
+    def get_schema(self, name, is_component=False, identifier="") -> dict:
+        """
+        Returns the schema of name. If identifier is specified only the interface
+        (or component) with that identifier is searched, otherwise the first interface
+        (or component) defining name.
+        """
+        if self._schema_index is None:
+            self._schema_index = self._build_schema_index()
+
+        return self._schema_index.get((is_component, identifier or None, name))
+
+    def get_validator(self, name, is_component=False, identifier=""):
+        """
+        Returns a callable validating a value against the schema of name (see get_schema),
+        or None if there is no such schema. Validators are compiled once and cached.
+        """
+        key = (is_component, identifier or None, name)
+        validator = self._validators.get(key)
+        if validator is None:
+            schema = self.get_schema(name, is_component=is_component, identifier=identifier)
+            if not schema:
+                return None
+
+            from azext_iot.monitor.central_validator import compile_validator
+
+            validator = self._validators[key] = compile_validator(schema)
+        return validator
+
+    def _build_schema_index(self) -> dict:
+        # flat index of (is_component, identifier or None, name) to schema,
+        # so schema lookups do not scan every interface
+        index = {}
+        for is_component, entities in (
+            (False, getattr(self, "interfaces", None)),
+            (True, self.components),
+        ):
+            for identifier, entry in (entities or {}).items():
+                if not isinstance(entry, dict):
+                    continue
+                for name, schema in entry.items():
+                    index[(is_component, identifier, name)] = schema
+                    # without identifier the first interface defining name wins
+                    if schema and (is_component, None, name) not in index:
+                        index[(is_component, None, name)] = schema
+        return index
+
     def _get_schema_name(self, schema) -> str:
         return "name" if "name" in schema else "@id"
 
@@ -15,6 +15,7 @@ class DeviceTwin:
             device_twin.pop("_links")
 
         self.device_id = device_twin.get("deviceId")
+        self.etag = device_twin.get("etag")
         self.desired_property = Property(
             "desired property",
             device_twin.get("properties", {}).get("desired"),
@@ -26,22 +26,6 @@ class Template(BaseTemplate):
         except Exception:
             raise CLIError("Could not parse iot central device template.")
 
-    def get_schema(self, name, is_component=False, identifier="") -> dict:
-        entities = self.components if is_component else self.interfaces
-        if identifier:
-            # identifier specified, do a pointed lookup
-            entry = entities.get(identifier, {})
-            return entry.get(name)
-
-        # find first matching name in any component
-        for entry in entities.values():
-            schema = entry.get(name)
-            if schema:
-                return schema
-
-        # not found
-        return None
-
     def _extract_root_interface_contents(self, dcm: dict) -> dict:
         rootContents = dcm.get("contents", {})
         contents = [
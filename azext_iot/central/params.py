@@ -11,7 +11,7 @@ CLI parameter definitions.
 from knack.arguments import CLIArgumentType, CaseInsensitiveList
 from azext_iot.central.common import DestinationType, ExportSource
 from azure.cli.core.commands.parameters import get_three_state_flag, get_enum_type
-from azext_iot.monitor.models.enum import Severity
+from azext_iot.monitor.models.enum import PropertySource, Severity
 from azext_iot.central.models.enum import ApiVersion
 from azext_iot._params import event_msg_prop_type, event_timeout_type
 
@@ -288,6 +288,30 @@ def load_central_arguments(self, _):
             help="The IoT Edge Module ID if the device type is IoT Edge.",
         )
 
+    for command in ["monitor-properties", "validate-properties"]:
+        with self.argument_context("iot central diagnostics {}".format(command)) as context:
+            context.argument(
+                "source",
+                options_list=["--source"],
+                arg_type=get_enum_type(PropertySource),
+                help="Source of property changes. 'twin' polls the device twins of the target devices. "
+                "'events' reads device twin change notifications from the app's event stream, "
+                "for all devices or the devices matching --device-id. "
+                "Requires twin change events to be routed to the event stream.",
+            )
+            context.argument(
+                "device_ids",
+                options_list=["--device-ids", "--dids"],
+                nargs="+",
+                help="Space-separated list of device ids to monitor, instead of --device-id.",
+            )
+            context.argument(
+                "template",
+                options_list=["--template"],
+                help="Monitor all devices using this device template id. "
+                "Can be combined with a --device-id pattern such as 'sensor-*'.",
+            )
+
     with self.argument_context("iot central role") as context:
         context.argument(
             "role_id",
@@ -12,6 +12,7 @@ from knack.log import get_logger
 from azext_iot.central.providers.central_provider import CentralProvider
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.central import services as central_services
+from azext_iot.central.providers.provider_cache import ProviderCache
 from azext_iot.central.models.v1_1_preview import (
     DestinationV1_1_preview,
     WebhookDestinationV1_1_preview,
@@ -24,7 +25,7 @@ logger = get_logger(__name__)
 class CentralDestinationProvider(CentralProvider):
     def __init__(self, cmd, app_id: str, api_version: str, token=None):
         super().__init__(cmd, app_id, api_version, token=token)
-        self._destinations = {}
+        self._destinations = ProviderCache()
 
     def list_destinations(
         self, central_dns_suffix=CENTRAL_ENDPOINT
@@ -9,6 +9,7 @@ from typing import List, Union
 from knack.log import get_logger
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.central import services as central_services
+from azext_iot.central.providers.provider_cache import ProviderCache
 from azext_iot.central.models.v1_1_preview import DeviceGroupV1_1_preview
 from azext_iot.central.models.preview import DeviceGroupPreview
 
@@ -33,7 +34,7 @@ class CentralDeviceGroupProvider:
         self._app_id = app_id
         self._token = token
         self._api_version = api_version
-        self._device_groups = {}
+        self._device_groups = ProviderCache()
 
     def list_device_groups(
         self, central_dns_suffix=CENTRAL_ENDPOINT
@@ -14,6 +14,7 @@ from azext_iot.central.models.enum import DeviceStatus, ApiVersion
 from azext_iot.central.models.v1 import DeviceV1
 from azext_iot.central.models.v1_1_preview import DeviceV1_1_preview
 from azext_iot.central.models.preview import DevicePreview
+from azext_iot.central.providers.provider_cache import ProviderCache
 from azext_iot.dps.services import global_service as dps_global_service
 
 
@@ -22,7 +23,7 @@ MODEL = "Device"
 
 
 class CentralDeviceProvider:
-    def __init__(self, cmd, app_id: str, api_version: str, token=None):
+    def __init__(self, cmd, app_id: str, api_version: str, token=None, pin_cache=False):
         """
         Provider for device APIs
 
@@ -34,15 +35,17 @@ class CentralDeviceProvider:
                 MUST INCLUDE type (e.g. 'SharedAccessToken ...', 'Bearer ...')
                 Useful in scenarios where user doesn't own the app
                 therefore AAD token won't work, but a SAS token generated by owner will
+            pin_cache: (OPTIONAL) keep cached devices for the lifetime of the provider,
+                instead of expiring and evicting them
         """
         self._cmd = cmd
         self._app_id = app_id
         self._api_version = api_version
         self._token = token
-        self._devices = {}
-        self._device_templates = {}
-        self._device_credentials = {}
-        self._device_registration_info = {}
+        cache_args = {"max_entries": None, "ttl": None} if pin_cache else {}
+        self._devices = ProviderCache(**cache_args)
+        self._device_credentials = ProviderCache(**cache_args)
+        self._device_registration_info = ProviderCache(**cache_args)
 
     def get_device(
         self,
@@ -51,22 +54,22 @@ class CentralDeviceProvider:
     ) -> Union[DeviceV1, DeviceV1_1_preview, DevicePreview]:
 
         # get or add to cache
-        device = self._devices.get(device_id)
-        if not device:
-            device = central_services.device.get_device(
+        device = self._devices.get_or_fetch(
+            device_id,
+            lambda: central_services.device.get_device(
                 cmd=self._cmd,
                 app_id=self._app_id,
                 device_id=device_id,
                 token=self._token,
                 central_dns_suffix=central_dns_suffix,
                 api_version=self._api_version,
-            )
-            self._devices[device_id] = device
+            ),
+        )
 
         if not device:
             raise CLIError("No device found with id: '{}'.".format(device_id))
 
-        return self._devices[device_id]
+        return device
 
     def list_devices(
         self,
@@ -328,16 +331,27 @@ class CentralDeviceProvider:
         self,
         device_id,
         central_dns_suffix=CENTRAL_ENDPOINT,
+        etag=None,
+        session=None,
     ) -> DeviceTwin:
-
+        """
+        Returns the device twin. When etag is provided, returns None if the twin
+        is unchanged since the twin with that etag was fetched.
+        session is an optional requests.Session to send the request with.
+        """
         twin = central_services.device.get_device_twin(
             cmd=self._cmd,
             app_id=self._app_id,
             device_id=device_id,
             token=self._token,
             central_dns_suffix=central_dns_suffix,
+            etag=etag,
+            session=session,
         )
 
+        if not twin and etag:
+            return None
+
         if not twin:
             raise CLIError("No twin found for device with id: '{}'.".format(device_id))
 
@@ -384,6 +398,9 @@ class CentralDeviceProvider:
             central_dns_suffix=central_dns_suffix
         )
 
+    def get_cache_stats(self) -> dict:
+        return {"devices": self._devices.get_stats()}
+
     def _dps_populate_essential_info(self, dps_info, device_status: DeviceStatus):
         error = {
             DeviceStatus.provisioned: "None.",
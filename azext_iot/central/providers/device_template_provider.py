@@ -5,16 +5,30 @@
 # --------------------------------------------------------------------------------------------
 
 from typing import List, Union
+from azure.cli.core.azclierror import ResourceNotFoundError
+from knack.log import get_logger
 from knack.util import CLIError
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.central import services as central_services
 from azext_iot.central.models.v1 import TemplateV1
 from azext_iot.central.models.v1_1_preview import TemplateV1_1_preview
 from azext_iot.central.models.preview import TemplatePreview
+from azext_iot.central.providers.provider_cache import ProviderCache
+from azext_iot.central.providers.template_store import DeviceTemplateStore
+
+logger = get_logger(__name__)
 
 
 class CentralDeviceTemplateProvider:
-    def __init__(self, cmd, app_id, api_version: str, token=None):
+    def __init__(
+        self,
+        cmd,
+        app_id,
+        api_version: str,
+        token=None,
+        template_store: DeviceTemplateStore = None,
+        pin_cache=False,
+    ):
         """
         Provider for device_template APIs
 
@@ -26,12 +40,18 @@ class CentralDeviceTemplateProvider:
                 MUST INCLUDE type (e.g. 'SharedAccessToken ...', 'Bearer ...')
                 Useful in scenarios where user doesn't own the app
                 therefore AAD token won't work, but a SAS token generated by owner will
+            template_store: (OPTIONAL) on-disk store of fetched templates, templates found
+                in it are revalidated with a conditional request instead of downloaded again
+            pin_cache: (OPTIONAL) keep cached templates for the lifetime of the provider,
+                instead of expiring and evicting them
         """
         self._cmd = cmd
         self._app_id = app_id
         self._api_version = api_version
         self._token = token
-        self._device_templates = {}
+        self._template_store = template_store
+        cache_args = {"max_entries": None, "ttl": None} if pin_cache else {}
+        self._device_templates = ProviderCache(**cache_args)
 
     def get_device_template(
         self,
@@ -39,9 +59,23 @@ class CentralDeviceTemplateProvider:
         central_dns_suffix=CENTRAL_ENDPOINT,
     ) -> Union[TemplateV1, TemplateV1_1_preview, TemplatePreview]:
         # get or add to cache
-        device_template = self._device_templates.get(device_template_id)
+        device_template = self._device_templates.get_or_fetch(
+            device_template_id,
+            lambda: self._fetch_device_template(device_template_id, central_dns_suffix),
+        )
+
         if not device_template:
-            device_template = central_services.device_template.get_device_template(
+            raise CLIError(
+                "No device template for device template with id: '{}'.".format(
+                    device_template_id
+                )
+            )
+
+        return device_template
+
+    def _fetch_device_template(self, device_template_id, central_dns_suffix):
+        if not self._template_store:
+            return central_services.device_template.get_device_template(
                 cmd=self._cmd,
                 app_id=self._app_id,
                 device_template_id=device_template_id,
@@ -49,16 +83,30 @@ class CentralDeviceTemplateProvider:
                 central_dns_suffix=central_dns_suffix,
                 api_version=self._api_version,
             )
-            self._device_templates[device_template_id] = device_template
 
-        if not device_template:
-            raise CLIError(
-                "No device template for device template with id: '{}'.".format(
-                    device_template_id
-                )
+        store_key = (self._app_id, central_dns_suffix, self._api_version)
+        stored = self._template_store.get(*store_key, device_template_id)
+        etag, stored_template = stored if stored else (None, None)
+        try:
+            template = central_services.device_template.get_device_template(
+                cmd=self._cmd,
+                app_id=self._app_id,
+                device_template_id=device_template_id,
+                token=self._token,
+                central_dns_suffix=central_dns_suffix,
+                api_version=self._api_version,
+                etag=etag,
             )
+        except ResourceNotFoundError:
+            self._template_store.invalidate(*store_key, device_template_id)
+            raise
 
-        return device_template
+        if template is None:
+            logger.debug("Using stored device template '%s'.", device_template_id)
+            return stored_template
+
+        self._template_store.set(*store_key, template)
+        return template
 
     def list_device_templates(
         self,
@@ -73,26 +121,21 @@ class CentralDeviceTemplateProvider:
             api_version=self._api_version,
         )
 
+        # add to cache, the listed (raw or compact) templates are returned as is
+        self._device_templates.update({template.id: template for template in templates})
+
         if compact:  # if asked for compact, just keep reduced info
-            for template in templates:
-                self._device_templates.update(
-                    {
-                        template.id: {
-                            "displayName": template.raw_template["displayName"],
-                            template.get_id_key(): template.raw_template[
-                                template.get_id_key()
-                            ],
-                            template.get_type_key(): template.raw_template[
-                                template.get_type_key()
-                            ],
-                        }
-                    }
-                )
-        else:
-            self._device_templates.update(
-                {template.id: template.raw_template for template in templates}
-            )
-        return list(self._device_templates.values())
+            return [
+                {
+                    "displayName": template.raw_template["displayName"],
+                    template.get_id_key(): template.raw_template[template.get_id_key()],
+                    template.get_type_key(): template.raw_template[
+                        template.get_type_key()
+                    ],
+                }
+                for template in templates
+            ]
+        return [template.raw_template for template in templates]
 
     def map_device_templates(
         self,
@@ -109,6 +152,9 @@ class CentralDeviceTemplateProvider:
         )
         return {template.name: template.id for template in templates}
 
+    def get_cache_stats(self) -> dict:
+        return {"deviceTemplates": self._device_templates.get_stats()}
+
     def create_device_template(
         self,
         device_template_id: str,
@@ -169,5 +215,9 @@ class CentralDeviceTemplateProvider:
         # remove from cache
         # pop "miss" raises a KeyError if None is not provided
         self._device_templates.pop(device_template_id, None)
+        if self._template_store:
+            self._template_store.invalidate(
+                self._app_id, central_dns_suffix, self._api_version, device_template_id
+            )
 
         return result
@@ -12,6 +12,7 @@ from knack.util import CLIError
 from azext_iot.central.providers.central_provider import CentralProvider
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.central import services as central_services
+from azext_iot.central.providers.provider_cache import ProviderCache
 from azext_iot.central.models.v1_1_preview import ExportV1_1_preview
 
 logger = get_logger(__name__)
@@ -20,7 +21,7 @@ logger = get_logger(__name__)
 class CentralExportProvider(CentralProvider):
     def __init__(self, cmd, app_id: str, api_version: str, token=None):
         super().__init__(cmd, app_id, api_version, token=token)
-        self._exports = {}
+        self._exports = ProviderCache()
 
     def list_exports(
         self, central_dns_suffix=CENTRAL_ENDPOINT
@@ -10,6 +10,7 @@ from knack.util import CLIError
 from knack.log import get_logger
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.central import services as central_services
+from azext_iot.central.providers.provider_cache import ProviderCache
 from azext_iot.central.models.preview import JobPreview
 from azext_iot.central.models.v1_1_preview import JobV1_1_preview
 
@@ -34,7 +35,7 @@ class CentralJobProvider:
         self._app_id = app_id
         self._api_version = api_version
         self._token = token
-        self._jobs = {}
+        self._jobs = ProviderCache()
 
     def list_jobs(
         self, central_dns_suffix=CENTRAL_ENDPOINT
@@ -4,6 +4,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+from knack.log import get_logger
 from azext_iot.central.models.enum import ApiVersion
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azure.cli.core.commands import AzCliCommand
@@ -11,12 +12,18 @@ from azext_iot.central.providers import (
     CentralDeviceProvider,
     CentralDeviceTemplateProvider,
 )
+from azext_iot.central.providers.template_store import (
+    DeviceTemplateStore,
+    get_default_template_store_path,
+)
 
 from azext_iot.monitor.models.arguments import (
     CentralHandlerArguments,
     TelemetryArguments,
 )
 
+logger = get_logger(__name__)
+
 
 class MonitorProvider:
     """
@@ -32,11 +39,22 @@ class MonitorProvider:
         central_handler_args: CentralHandlerArguments,
         central_dns_suffix: str,
     ):
-        central_device_provider = CentralDeviceProvider(
-            cmd=cmd, app_id=app_id, token=token, api_version=ApiVersion.v1.value
+        # the template resolver reports devices ready once their device and template are
+        # cached, so cached entities are kept for the whole run
+        self._central_device_provider = CentralDeviceProvider(
+            cmd=cmd,
+            app_id=app_id,
+            token=token,
+            api_version=ApiVersion.v1.value,
+            pin_cache=True,
         )
-        central_template_provider = CentralDeviceTemplateProvider(
-            cmd=cmd, app_id=app_id, token=token, api_version=ApiVersion.v1.value
+        self._central_template_provider = CentralDeviceTemplateProvider(
+            cmd=cmd,
+            app_id=app_id,
+            token=token,
+            api_version=ApiVersion.v1.value,
+            template_store=DeviceTemplateStore(get_default_template_store_path(cmd)),
+            pin_cache=True,
         )
         self._targets = self._build_targets(
             cmd=cmd,
@@ -45,9 +63,10 @@ class MonitorProvider:
             consumer_group=consumer_group,
             central_dns_suffix=central_dns_suffix,
         )
+        self._central_handler_args = central_handler_args
         self._handler = self._build_handler(
-            central_device_provider=central_device_provider,
-            central_template_provider=central_template_provider,
+            central_device_provider=self._central_device_provider,
+            central_template_provider=self._central_template_provider,
             central_handler_args=central_handler_args,
             central_dns_suffix=central_dns_suffix,
         )
@@ -55,24 +74,62 @@ class MonitorProvider:
     def start_monitor_events(self, telemetry_args: TelemetryArguments):
         from azext_iot.monitor import telemetry
 
-        telemetry.start_multiple_monitors(
-            targets=self._targets,
-            enqueued_time_utc=telemetry_args.enqueued_time,
-            on_start_string=self._handler.generate_startup_string("Monitoring"),
-            on_message_received=self._handler.parse_message,
-            timeout=telemetry_args.timeout,
-        )
+        try:
+            telemetry.start_multiple_monitors(
+                targets=self._targets,
+                enqueued_time_utc=telemetry_args.enqueued_time,
+                on_start_string=self._handler.generate_startup_string("Monitoring"),
+                on_messages_received=self._handler.parse_messages,
+                timeout=telemetry_args.timeout,
+            )
+        finally:
+            self._handler.close()
+            self._log_cache_stats()
 
     def start_validate_messages(self, telemetry_args: TelemetryArguments):
         from azext_iot.monitor import telemetry
 
-        telemetry.start_multiple_monitors(
-            targets=self._targets,
-            enqueued_time_utc=telemetry_args.enqueued_time,
-            on_start_string=self._handler.generate_startup_string("Validating"),
-            on_message_received=self._handler.validate_message,
-            timeout=telemetry_args.timeout,
+        self._handler.warm_up()
+        try:
+            telemetry.start_multiple_monitors(
+                targets=self._targets,
+                enqueued_time_utc=telemetry_args.enqueued_time,
+                on_start_string=self._handler.generate_startup_string("Validating"),
+                on_messages_received=self._handler.validate_messages,
+                timeout=telemetry_args.timeout,
+            )
+        finally:
+            self._handler.close()
+            self._log_cache_stats()
+
+    def start_monitor_property_changes(self, telemetry_args: TelemetryArguments, on_change):
+        """
+        Reports device twin change notifications from the event stream to on_change,
+        see PropertyChangeHandler.
+        """
+        from azext_iot.monitor import telemetry
+        from azext_iot.monitor.handlers import PropertyChangeHandler
+
+        handler = PropertyChangeHandler(
+            common_handler_args=self._central_handler_args.common_handler_args,
+            on_change=on_change,
         )
+        try:
+            telemetry.start_multiple_monitors(
+                targets=self._targets,
+                enqueued_time_utc=telemetry_args.enqueued_time,
+                on_start_string="Monitoring property changes",
+                on_messages_received=handler.parse_messages,
+                timeout=telemetry_args.timeout,
+            )
+        finally:
+            handler.close()
+            self._log_cache_stats()
+
+    def _log_cache_stats(self):
+        stats = self._central_device_provider.get_cache_stats()
+        stats.update(self._central_template_provider.get_cache_stats())
+        logger.debug("Central provider cache stats: %s", stats)
 
     def _build_targets(
         self,
@@ -10,6 +10,7 @@ from knack.util import CLIError
 from knack.log import get_logger
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.central import services as central_services
+from azext_iot.central.providers.provider_cache import ProviderCache
 from azext_iot.central.models.v1_1_preview import OrganizationV1_1_preview
 
 logger = get_logger(__name__)
@@ -33,7 +34,7 @@ class CentralOrganizationProvider:
         self._app_id = app_id
         self._token = token
         self._api_version = api_version
-        self._orgs = {}
+        self._orgs = ProviderCache()
 
     def list_organizations(
         self, central_dns_suffix=CENTRAL_ENDPOINT
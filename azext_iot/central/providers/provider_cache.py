@@ -0,0 +1,190 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Optional
+from azure.cli.core.azclierror import ResourceNotFoundError
+from azext_iot.constants import (
+    CENTRAL_CACHE_MAX_ENTRIES,
+    CENTRAL_CACHE_NEGATIVE_TTL_SEC,
+    CENTRAL_CACHE_TTL_SEC,
+)
+
+
+class ProviderCache:
+    """
+    Entity cache shared by the Central providers.
+
+    Entries are evicted least recently used first once max_entries is reached and expire
+    ttl seconds after they were stored. Without max_entries or ttl entries are kept until
+    they are removed. Lookups of entities the service reported as not
+    found are remembered for negative_ttl seconds, so repeated lookups of an unknown id
+    raise the original error without another request.
+
+    Supports the dict operations the providers rely on (get, item access, in, pop, update,
+    values). Safe to use from multiple threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = CENTRAL_CACHE_MAX_ENTRIES,
+        ttl: Optional[float] = CENTRAL_CACHE_TTL_SEC,
+        negative_ttl: float = CENTRAL_CACHE_NEGATIVE_TTL_SEC,
+    ):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._lock = threading.RLock()
+        # key -> (expiry, value), ordered from least to most recently used
+        self._entries = OrderedDict()
+        # key -> (expiry, error)
+        self._not_found = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_fetch(self, key, fetch: Callable[[], object]):
+        """
+        Returns the cached value of key, calling fetch on a miss.
+
+        A ResourceNotFoundError raised by fetch is cached for negative_ttl seconds
+        and raised again for lookups of key within that window.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            error = self._lookup_not_found(key)
+            if error is not None:
+                self.negative_hits += 1
+                raise error
+            self.misses += 1
+
+        try:
+            value = fetch()
+        except ResourceNotFoundError as e:
+            if self._negative_ttl:
+                with self._lock:
+                    self._not_found[key] = (time.monotonic() + self._negative_ttl, e)
+            raise
+
+        if value is not None:
+            self[key] = value
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self._not_found.pop(key, None)
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else default
+
+    def update(self, values: dict):
+        for key, value in values.items():
+            self[key] = value
+
+    def values(self) -> list:
+        with self._lock:
+            self._expire()
+            return [value for _, value in self._entries.values()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._not_found.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.negative_hits
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "negativeHits": self.negative_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hitRatio": round((self.hits + self.negative_hits) / lookups, 3)
+                if lookups
+                else None,
+            }
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._not_found.pop(key, None)
+            expiry = time.monotonic() + self._ttl if self._ttl else None
+            self._entries[key] = (expiry, value)
+            self._entries.move_to_end(key)
+            while self._max_entries and len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __getitem__(self, key):
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                raise KeyError(key)
+            return value
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._entries)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expiry, value = entry
+        if expiry is not None and expiry <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _lookup_not_found(self, key):
+        entry = self._not_found.get(key)
+        if entry is None:
+            return None
+
+        expiry, error = entry
+        if expiry <= time.monotonic():
+            del self._not_found[key]
+            return None
+        return error
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [
+            key
+            for key, (expiry, _) in self._entries.items()
+            if expiry is not None and expiry <= now
+        ]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
@@ -10,6 +10,7 @@ from knack.util import CLIError
 from knack.log import get_logger
 from azext_iot.constants import CENTRAL_ENDPOINT
 from azext_iot.central import services as central_services
+from azext_iot.central.providers.provider_cache import ProviderCache
 from azext_iot.central.models.v1 import RoleV1
 from azext_iot.central.models.v1_1_preview import RoleV1_1_preview
 from azext_iot.central.models.preview import RolePreview
@@ -35,7 +36,7 @@ class CentralRoleProvider:
         self._app_id = app_id
         self._token = token
         self._api_version = api_version
-        self._roles = {}
+        self._roles = ProviderCache()
 
     def list_roles(
         self, central_dns_suffix=CENTRAL_ENDPOINT
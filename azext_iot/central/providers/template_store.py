@@ -0,0 +1,81 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+from knack.log import get_logger
+from azext_iot.central.services import _utility
+from azext_iot.constants import EXTENSION_CONFIG_ROOT_KEY, VERSION
+
+logger = get_logger(__name__)
+
+TEMPLATE_STORE_DIR_NAME = "central_templates"
+
+
+def get_default_template_store_path(cmd) -> str:
+    return os.path.join(
+        cmd.cli_ctx.config.config_dir, EXTENSION_CONFIG_ROOT_KEY, TEMPLATE_STORE_DIR_NAME
+    )
+
+
+class DeviceTemplateStore:
+    """
+    On-disk cache of IoT Central device templates, keyed by app and template id.
+
+    Templates are stored as JSON with the etag they were fetched with, so later commands
+    can revalidate them with a conditional request instead of downloading them again.
+    Entries written by another extension version are ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def get(self, app_id: str, central_dns_suffix: str, api_version: str, template_id: str):
+        """Returns the stored (etag, template) of template_id, or None."""
+        try:
+            with open(self._get_file(app_id, central_dns_suffix, api_version, template_id), "r") as f:
+                entry = json.load(f)
+            if not isinstance(entry, dict) or entry.get("version") != VERSION:
+                return None
+            template = _utility.get_object(entry["template"], model="Template", api_version=api_version)
+        except FileNotFoundError:
+            return None
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug("Unable to read stored device template '%s': %s", template_id, e)
+            return None
+
+        template.etag = entry["etag"]
+        return entry["etag"], template
+
+    def set(self, app_id: str, central_dns_suffix: str, api_version: str, template):
+        if not template.etag:
+            # nothing to revalidate the template with
+            return
+
+        file_path = self._get_file(app_id, central_dns_suffix, api_version, template.id)
+        entry = {"version": VERSION, "etag": template.etag, "template": template.raw_template}
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            temp_path = "{}.{}.tmp".format(file_path, os.getpid())
+            with open(temp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, file_path)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug("Unable to store device template '%s': %s", template.id, e)
+
+    def invalidate(self, app_id: str, central_dns_suffix: str, api_version: str, template_id: str):
+        try:
+            os.remove(self._get_file(app_id, central_dns_suffix, api_version, template_id))
+        except OSError:
+            pass
+
+    def _get_file(self, app_id, central_dns_suffix, api_version, template_id) -> str:
+        key = "\n".join([app_id, str(central_dns_suffix), api_version, template_id])
+        return os.path.join(
+            self.path, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json"
+        )
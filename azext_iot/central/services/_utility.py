@@ -6,6 +6,7 @@
 # Nothing in this file should be used outside of service/central
 
 from knack.util import CLIError, to_snake_case, to_camel_case
+from azure.cli.core.azclierror import ResourceNotFoundError
 from requests import Response
 from knack.log import logging
 
@@ -77,6 +78,9 @@ def try_extract_result(response: Response):
         raise CLIError("Error parsing response body")
 
     if "error" in body:
+        # not found is raised as a CLIError subclass so provider caches can remember it
+        if response.status_code == 404:
+            raise ResourceNotFoundError(body["error"])
         raise CLIError(body["error"])
 
     return body
@@ -567,6 +567,8 @@ def get_device_twin(
     device_id: str,
     token: str,
     central_dns_suffix=CENTRAL_ENDPOINT,
+    etag: str = None,
+    session: requests.Session = None,
 ) -> DeviceTwin:
     """
     Get device twin given a device id
@@ -578,9 +580,13 @@ def get_device_twin(
         token: (OPTIONAL) authorization token to fetch device details from IoTC.
             MUST INCLUDE type (e.g. 'SharedAccessToken ...', 'Bearer ...')
         central_dns_suffix: {centralDnsSuffixInPath} as found in docs
+        etag: (OPTIONAL) etag of a previously fetched twin, the twin is only
+            returned if it has changed since.
+        session: (OPTIONAL) HTTP session to send the request with, lets callers
+            polling many twins reuse connections.
 
     Returns:
-        twin: dict
+        twin: DeviceTwin, None if the twin matches etag
     """
 
     if not token:
@@ -591,15 +597,22 @@ def get_device_twin(
 
     url = f"https://{app_id}.{central_dns_suffix}/system/iothub/devices/{device_id}/get-twin?extendedInfo=true"
     headers = _utility.get_headers(token, cmd)
+    if etag:
+        headers["If-None-Match"] = etag
 
     # Construct parameters
 
-    response = requests.get(
+    response = (session or requests).get(
         url,
         headers=headers,
         verify=not should_disable_connection_verify(),
     )
-    return DeviceTwin(_utility.try_extract_result(response))
+    if etag and response.status_code == 304:
+        return None
+
+    twin = DeviceTwin(_utility.try_extract_result(response))
+    twin.etag = response.headers.get("ETag") or twin.etag
+    return twin
 
 
 def run_manual_failover(
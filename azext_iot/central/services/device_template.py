@@ -30,6 +30,7 @@ def get_device_template(
     token: str,
     api_version: str,
     central_dns_suffix=CENTRAL_ENDPOINT,
+    etag: str = None,
 ) -> Union[TemplatePreview, TemplateV1, TemplateV1_1_preview]:
     """
     Get a specific device template from IoTC
@@ -41,22 +42,31 @@ def get_device_template(
         token: (OPTIONAL) authorization token to fetch device details from IoTC.
             MUST INCLUDE type (e.g. 'SharedAccessToken ...', 'Bearer ...')
         central_dns_suffix: {centralDnsSuffixInPath} as found in docs
+        etag: (OPTIONAL) etag of a previously fetched template, the template is only
+            returned if it has changed since.
 
     Returns:
-        device: dict
+        device: dict, None if the template matches etag
     """
     url = "https://{}.{}/{}/{}".format(
         app_id, central_dns_suffix, BASE_PATH, device_template_id
     )
     headers = _utility.get_headers(token, cmd)
+    if etag:
+        headers["If-None-Match"] = etag
 
     # Construct parameters
     query_parameters = {}
     query_parameters["api-version"] = api_version
 
     response = requests.get(url, headers=headers, params=query_parameters)
+    if etag and response.status_code == 304:
+        return None
+
     result = _utility.try_extract_result(response)
-    return _utility.get_object(result, model=MODEL, api_version=api_version)
+    template = _utility.get_object(result, model=MODEL, api_version=api_version)
+    template.etag = response.headers.get("ETag") or template.etag
+    return template
 
 
 def list_device_templates(
@@ -0,0 +1,263 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+rate_governor: Process-wide pacing and throttling (429) retries of IoT Hub data-plane requests.
+
+"""
+
+import atexit
+import re
+import threading
+import time
+
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from knack.log import get_logger
+from urllib3.util.retry import Retry
+from azext_iot.constants import (
+    DATAPLANE_RATE_BUDGETS,
+    DATAPLANE_RATE_INCREASE,
+    DATAPLANE_THROTTLE_DEFAULT_DELAY_SEC,
+    DATAPLANE_THROTTLE_MAX_RETRIES,
+)
+
+logger = get_logger(__name__)
+
+OTHER_OPERATIONS = "other"
+
+_METHODS_PATH = re.compile(r"^/twins/[^/]+(/modules/[^/]+)?/methods/?$", re.IGNORECASE)
+_TWIN_PATH = re.compile(r"^/twins/", re.IGNORECASE)
+_REGISTRY_PATH = re.compile(r"^/devices(/[^/]+(/modules(/[^/]+)?)?)?/?$", re.IGNORECASE)
+_QUERY_PATH = re.compile(r"^/devices/query/?$", re.IGNORECASE)
+
+
+def get_operation_class(method: str, url: str) -> str:
+    """Returns the throttling class of an IoT Hub service request."""
+    path = urlparse(url).path
+    if _METHODS_PATH.match(path):
+        return "methods"
+    if _TWIN_PATH.match(path):
+        return "twin"
+    if _REGISTRY_PATH.match(path) and not _QUERY_PATH.match(path):
+        return "registry_read" if method.upper() == "GET" else "registry_write"
+    return OTHER_OPERATIONS
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with an adaptive rate.
+
+    The rate grows by rate_increase after each request that was not throttled, up to
+    max_rate, and is halved when a request is throttled. throttled also holds all requests
+    until the given delay passed. A bucket without rate only applies these delays, until
+    it is throttled while it has a backoff_rate, which becomes its rate.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        max_rate: Optional[float] = None,
+        rate_increase: float = DATAPLANE_RATE_INCREASE,
+        backoff_rate: Optional[float] = None,
+    ):
+        self.rate = rate
+        self._backoff_rate = backoff_rate
+        self._min_rate = (rate or backoff_rate) / 10 if rate or backoff_rate else None
+        self._max_rate = max_rate or rate or backoff_rate
+        self._burst = burst
+        self._rate_increase = rate_increase
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Blocks until a request may be sent, returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._resume_at - now
+                if delay <= 0:
+                    if not self.rate:
+                        return waited
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def succeeded(self):
+        with self._lock:
+            if self.rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.rate * self._rate_increase, self._max_rate)
+
+    def throttled(self, delay: float):
+        with self._lock:
+            now = time.monotonic()
+            if self.rate:
+                self._refill(now)
+                self.rate = max(self.rate / 2, self._min_rate)
+                self._tokens = 0.0
+            elif self._backoff_rate:
+                self.rate = self._backoff_rate
+                self._updated = now
+                self._tokens = 0.0
+            self._resume_at = max(self._resume_at, now + delay)
+
+    def _refill(self, now: float):
+        self._tokens = min(self._tokens + (now - self._updated) * self.rate, self._burst)
+        self._updated = now
+
+
+class RateGovernor:
+    """
+    Paces IoT Hub data-plane requests per operation class (see get_operation_class) and
+    retries requests throttled with 429, waiting for the Retry-After returned by the
+    service or an exponential backoff. Requests are not paced until a request of their
+    class is throttled, which pauses all requests of the class and limits them to the
+    rate of its budget from then on. Counters per class are returned by get_stats.
+    """
+
+    def __init__(
+        self,
+        budgets: Dict[str, Tuple[float, int, float]] = None,
+        max_retries: int = DATAPLANE_THROTTLE_MAX_RETRIES,
+        default_delay: float = DATAPLANE_THROTTLE_DEFAULT_DELAY_SEC,
+    ):
+        budgets = DATAPLANE_RATE_BUDGETS if budgets is None else budgets
+        self._max_retries = max_retries
+        self._default_delay = default_delay
+        self._lock = threading.Lock()
+        self._buckets = {
+            operation: TokenBucket(burst=burst, max_rate=max_rate, backoff_rate=rate)
+            for operation, (rate, burst, max_rate) in budgets.items()
+        }
+        self._buckets.setdefault(OTHER_OPERATIONS, TokenBucket())
+        self._stats = {
+            operation: {"requests": 0, "throttled": 0, "waitedSec": 0.0}
+            for operation in self._buckets
+        }
+
+    def send(self, method: str, url: str, send: Callable[[], object]):
+        """
+        Calls send, a request of method to url, once the request budget allows it.
+        send must return an msrest pipeline response.
+        """
+        operation = get_operation_class(method, url)
+        bucket = self._buckets.get(operation, self._buckets[OTHER_OPERATIONS])
+        stats = self._stats.get(operation, self._stats[OTHER_OPERATIONS])
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            response = send()
+            http_response = response.http_response
+
+            with self._lock:
+                stats["requests"] += 1
+                stats["waitedSec"] += waited
+            if http_response.status_code != 429 or attempt >= self._max_retries:
+                if http_response.status_code != 429:
+                    bucket.succeeded()
+                return response
+
+            delay = self._get_retry_delay(http_response.headers, attempt)
+            # the throttled response is not read, release its connection
+            internal_response = getattr(http_response, "internal_response", None)
+            if internal_response is not None:
+                internal_response.close()
+            with self._lock:
+                stats["throttled"] += 1
+            bucket.throttled(delay)
+            logger.info(
+                "IoT Hub throttled a %s request, retrying in %.1f seconds.", operation, delay
+            )
+            attempt += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                operation: dict(stats, rate=self._buckets[operation].rate)
+                for operation, stats in self._stats.items()
+            }
+
+    def _get_retry_delay(self, headers, attempt: int) -> float:
+        try:
+            return max(float(headers.get("Retry-After")), 0.0)
+        except (TypeError, ValueError):
+            return self._default_delay * 2 ** attempt
+
+
+class ThrottleExemptRetry(Retry):
+    """urllib3 Retry leaving throttled (429) responses to the RateGovernor."""
+
+    RETRY_AFTER_STATUS_CODES = Retry.RETRY_AFTER_STATUS_CODES - frozenset([429])
+
+
+def exempt_throttled_retries(policy: Retry):
+    """
+    Stops policy from retrying 429 responses, Retry-After is still respected for the
+    other status codes. policy is changed in place, msrest hands it to the adapters of
+    its session when the client is created. Retries derived from policy keep its type.
+    """
+    policy.__class__ = ThrottleExemptRetry
+    if policy.status_forcelist:
+        policy.status_forcelist = [code for code in policy.status_forcelist if code != 429]
+
+
+class RateGovernedPipeline:
+    """Sends the requests of an msrest pipeline through a RateGovernor."""
+
+    def __init__(self, pipeline, governor: RateGovernor):
+        self._pipeline = pipeline
+        self._governor = governor
+
+    def run(self, request, **kwargs):
+        return self._governor.send(
+            request.method, request.url, lambda: self._pipeline.run(request, **kwargs)
+        )
+
+    def __enter__(self):
+        self._pipeline.__enter__()
+        return self
+
+    def __exit__(self, *exc_details):
+        return self._pipeline.__exit__(*exc_details)
+
+    def __getattr__(self, name):
+        # msrest reaches into the pipeline it created, e.g. to close the session of its sender
+        return getattr(self._pipeline, name)
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> RateGovernor:
+    """Returns the RateGovernor shared by all data-plane clients of the process."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = RateGovernor()
+            # the counters of the command are logged once it finished
+            atexit.register(_log_stats, _governor)
+        return _governor
+
+
+def _log_stats(governor: RateGovernor):
+    # operation classes without requests are left out
+    stats = {
+        operation: operation_stats
+        for operation, operation_stats in governor.get_stats().items()
+        if operation_stats["requests"]
+    }
+    if stats:
+        logger.debug("IoT Hub data-plane request stats: %s", stats)
@@ -298,3 +298,13 @@ class DiscoveryResourceType(Enum):
     """
     IoTHub = "IoT Hub"
     DPS = "IoT Hub Device Provisioning Service"
+
+
+class MonitorOverflowType(Enum):
+    """
+    Event monitor behavior when the processing queue is full.
+    """
+
+    block = "block"
+    dropNewest = "dropNewest"
+    dropOldest = "dropOldest"
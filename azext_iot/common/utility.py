@@ -26,6 +26,11 @@ from knack.util import CLIError
 
 logger = get_logger(__name__)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def parse_entity(entity, filter_none=False):
     """
@@ -165,6 +170,17 @@ def shell_safe_json_parse(json_or_dict_string, preserve_order=False):
             )  # raise json_ex error which is more readable and likely.
 
 
+def compact_json_dumps(value) -> str:
+    """Serializes value to JSON without whitespace, with orjson when it is installed."""
+    if orjson:
+        try:
+            return orjson.dumps(value).decode("utf8")
+        except TypeError:
+            # orjson is stricter than json (i.e. non-str keys), fall back
+            pass
+    return json.dumps(value, separators=(",", ":"))
+
+
 def read_file_content(file_path, allow_binary=False):
     from codecs import open as codecs_open
 
@@ -31,6 +31,10 @@ MIN_SIM_MSG_INTERVAL = 1
 MIN_SIM_MSG_COUNT = 1
 SIM_RECEIVE_SLEEP_SEC = 3
 CENTRAL_ENDPOINT = "azureiotcentral.com"
+# Central provider entity caches: max entries, entry lifetime and not found (404) lifetime
+CENTRAL_CACHE_MAX_ENTRIES = 10000
+CENTRAL_CACHE_TTL_SEC = 5 * 60
+CENTRAL_CACHE_NEGATIVE_TTL_SEC = 30
 DEVICE_DEVICESCOPE_PREFIX = "ms-azure-iot-edge://"
 TRACING_PROPERTY = "azureiot*com^dtracing^1"
 TRACING_ALLOWED_FOR_LOCATION = ("northeurope", "westus2", "southeastasia")
@@ -39,8 +43,46 @@ USER_AGENT = "IoTPlatformCliExtension/{}".format(VERSION)
 IOTHUB_RESOURCE_ID = "https://iothubs.azure.net"
 IOTDPS_RESOURCE_ID = "https://azure-devices-provisioning.net"
 DIGITALTWINS_RESOURCE_ID = "https://digitaltwins.azure.net"
-DEVICETWIN_POLLING_INTERVAL_SEC = 10
 DEVICETWIN_MONITOR_TIME_SEC = 15
+# Bounds of the adaptive device twin polling interval, backing off while the twin is unchanged
+DEVICETWIN_POLLING_MIN_INTERVAL_SEC = 10
+DEVICETWIN_POLLING_MAX_INTERVAL_SEC = 60
+# Minimum device twin polling interval of devices polled concurrently by the multi-device scheduler
+DEVICETWIN_MULTI_POLLING_MIN_INTERVAL_SEC = 2
+# Maximum concurrent device twin requests when monitoring properties of multiple devices
+DEVICETWIN_POLLING_CONCURRENCY = 8
+# Default link credit for Event Hub partition receivers used by event monitors
+EVENT_MONITOR_PREFETCH = 300
+# Default number of received batches buffered between event monitor receivers and the handler
+EVENT_MONITOR_QUEUE_SIZE = 100
+# Lifetime of cached IoT Hub events endpoint metadata used by event monitors
+EVENT_TARGET_CACHE_TTL_SEC = 24 * 60 * 60
+# Interval between summaries printed by event monitors in stats mode
+EVENT_MONITOR_STATS_INTERVAL_SEC = 10
+# Number of query result pages requested ahead of the page being processed
+QUERY_PREFETCH_PAGES = 2
+# Adaptive query paging: page sizes grow from the service default toward the service maximum
+# while pages are received within the target latency and stay under the byte limit
+QUERY_DEFAULT_PAGE_SIZE = 100
+QUERY_MAX_PAGE_SIZE = 1000
+QUERY_PAGE_TARGET_LATENCY_SEC = 1.0
+QUERY_PAGE_MAX_BYTES = 4 * 1024 * 1024
+# Maximum number of concurrent slices of a parallel query
+QUERY_MAX_PARALLEL = 32
+# Data-plane rate governor budgets per operation class: (requests/sec once throttled, burst, max requests/sec).
+# Requests are not paced until IoT Hub throttles (429) a request of the class. The rate then starts at the
+# IoT Hub S1 throttling limits, grows on success and halves when throttled again
+DATAPLANE_RATE_BUDGETS = {
+    "registry_read": (100 / 60, 10, 100.0),
+    "registry_write": (100 / 60, 10, 100.0),
+    "twin": (50.0, 50, 500.0),
+    "methods": (20.0, 20, 500.0),
+}
+# Factor a data-plane rate grows by after each request that was not throttled
+DATAPLANE_RATE_INCREASE = 1.05
+# Retries of a throttled (429) data-plane request, and the delay used when no Retry-After is returned
+DATAPLANE_THROTTLE_MAX_RETRIES = 5
+DATAPLANE_THROTTLE_DEFAULT_DELAY_SEC = 1.0
 # (Lib name, minimum version (including), maximum version (excluding))
 EVENT_LIB = ("uamqp", "1.2", "1.3")
 PNP_DTDLV2_COMPONENT_MARKER = "__t"
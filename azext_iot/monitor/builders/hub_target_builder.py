@@ -7,9 +7,12 @@
 import asyncio
 import uamqp
 
+from functools import partial
+
 from azext_iot.common.sas_token_auth import SasTokenAuthentication
 from azext_iot.common.utility import parse_entity, unicode_binary_map, url_encode_str
 from azext_iot.monitor.builders._common import query_meta_data
+from azext_iot.monitor.builders.target_cache import EventTargetCache
 from azext_iot.monitor.models.target import Target
 
 # To provide amqp frame trace
@@ -30,21 +33,37 @@ class AmqpBuilder:
 
 
 class EventTargetBuilder:
-    def __init__(self):
+    def __init__(self, cache: EventTargetCache = None):
         self.eventLoop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.eventLoop)
+        self.cache = cache
+        self.from_cache = False
 
     def build_iot_hub_target(self, target):
         return self.eventLoop.run_until_complete(
             self._build_iot_hub_target_async(target)
         )
 
+    def invalidate_cached_target(self, target):
+        if self.cache:
+            self.cache.invalidate(target["entity"])
+
     def _build_auth_container(self, target):
+        return self.build_auth_factory(target)()
+
+    def build_auth_factory(self, target):
+        """
+        Returns a callable creating a new auth container for the events endpoint of target.
+        Used where each process or connection needs its own auth container.
+        """
         sas_uri = "sb://{}/{}".format(
             target["events"]["endpoint"], target["events"]["path"]
         )
-        return uamqp.authentication.SASTokenAsync.from_shared_access_key(
-            sas_uri, target["policy"], target["primarykey"]
+        return partial(
+            uamqp.authentication.SASTokenAsync.from_shared_access_key,
+            sas_uri,
+            target["policy"],
+            target["primarykey"],
         )
 
     async def _evaluate_redirect(self, endpoint):
@@ -72,6 +91,12 @@ class EventTargetBuilder:
             await receive_client.close_async()
 
     async def _build_iot_hub_target_async(self, target):
+        if "events" not in target and self.cache:
+            events = self.cache.get(target["entity"])
+            if events:
+                target["events"] = events
+                self.from_cache = True
+
         if "events" not in target:
             endpoint = AmqpBuilder.build_iothub_amqp_endpoint_from_target(target)
             _, update = await self._evaluate_redirect(endpoint)
@@ -89,6 +114,8 @@ class EventTargetBuilder:
             for i in range(int(partition_count)):
                 partition_ids.append(str(i))
             target["events"]["partition_ids"] = partition_ids
+            if self.cache:
+                self.cache.set(target["entity"], target["events"])
         else:
             endpoint = target["events"]["endpoint"]
             path = target["events"]["path"]
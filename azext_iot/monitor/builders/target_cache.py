@@ -0,0 +1,85 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import time
+
+from typing import Optional
+from knack.log import get_logger
+from azext_iot.constants import EXTENSION_CONFIG_ROOT_KEY, EVENT_TARGET_CACHE_TTL_SEC
+
+logger = get_logger(__name__)
+
+TARGET_CACHE_FILE_NAME = "event_targets.json"
+CACHED_EVENT_KEYS = ("endpoint", "path", "address", "partition_ids")
+
+
+def get_default_target_cache_path(cmd) -> str:
+    return os.path.join(
+        cmd.cli_ctx.config.config_dir, EXTENSION_CONFIG_ROOT_KEY, TARGET_CACHE_FILE_NAME
+    )
+
+
+class EventTargetCache:
+    """
+    On-disk cache of resolved IoT Hub events endpoints, keyed by hub hostname.
+
+    Stores the Event Hub compatible endpoint, path, address and partition ids resolved
+    through the $management redirect and metadata query, so later monitor starts can
+    skip both round trips. Entries expire after ttl seconds and should be invalidated
+    when the cached endpoint is no longer valid (link redirect or auth failure).
+    """
+
+    def __init__(self, path: str, ttl: int = EVENT_TARGET_CACHE_TTL_SEC):
+        self.path = path
+        self.ttl = ttl
+
+    def get(self, hostname: str) -> Optional[dict]:
+        entry = self._load().get(hostname)
+        if not entry:
+            return None
+        if entry.get("expires", 0) <= time.time():
+            logger.debug("Cached events endpoint for %s has expired.", hostname)
+            return None
+        if any(key not in entry for key in CACHED_EVENT_KEYS):
+            return None
+        return {key: entry[key] for key in CACHED_EVENT_KEYS}
+
+    def set(self, hostname: str, events: dict):
+        entry = {key: events[key] for key in CACHED_EVENT_KEYS}
+        entry["expires"] = time.time() + self.ttl
+        entries = self._load()
+        entries[hostname] = entry
+        self._save(entries)
+
+    def invalidate(self, hostname: str):
+        entries = self._load()
+        if entries.pop(hostname, None) is not None:
+            logger.debug("Invalidated cached events endpoint for %s.", hostname)
+            self._save(entries)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries: dict):
+        now = time.time()
+        entries = {k: v for k, v in entries.items() if v.get("expires", 0) > now}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = "{}.{}.tmp".format(self.path, os.getpid())
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.debug("Unable to write events endpoint cache: %s", e)
@@ -6,5 +6,6 @@
 
 from azext_iot.monitor.central_validator.validate_schema import validate
 from azext_iot.monitor.central_validator.utils import extract_schema_type
+from azext_iot.monitor.central_validator.compile_schema import compile_validator
 
-__all__ = ["validate", "extract_schema_type"]
+__all__ = ["validate", "extract_schema_type", "compile_validator"]
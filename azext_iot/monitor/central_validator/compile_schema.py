@@ -0,0 +1,147 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Compiles DTDL schemas into validator callables.
+
+compile_validator(schema) returns a callable taking a single value, with the same result
+as validate(schema, value). Schema type extraction, validator lookup and any per-schema
+preparation (enum values, object fields) happen once at compile time.
+"""
+
+import isodate
+
+from typing import Callable
+from azext_iot.monitor.central_validator import utils
+
+GEOPOINT_REQUIRED_KEYS = frozenset(["lat", "lon"])
+GEOPOINT_ALL_KEYS = frozenset(["alt", "lat", "lon"])
+VECTOR_KEYS = frozenset(["x", "y", "z"])
+
+
+def compile_validator(schema) -> Callable[[object], bool]:
+    validate_value = _compile_value_validator(schema)
+
+    def _validate(value):
+        # if theres nothing to validate, then its valid
+        if value is None:
+            return True
+        return validate_value(value)
+
+    return _validate
+
+
+def _compile_value_validator(schema):
+    schema_type = utils.extract_schema_type(schema)
+    if not schema_type:
+        return _invalid
+
+    compiler = _compilers.get(schema_type)
+
+    # invalid schema type detected
+    if not compiler:
+        return _invalid
+
+    return compiler(schema)
+
+
+def _invalid(value):
+    return False
+
+
+def _instance_of(types):
+    def _compile(schema):
+        return lambda value: isinstance(value, types)
+
+    return _compile
+
+
+def _iso8601(parse):
+    def _compile(schema):
+        def _validate(value):
+            try:
+                return bool(parse(value))
+            except Exception:
+                return False
+
+        return _validate
+
+    return _compile
+
+
+def _compile_geopoint(schema):
+    def _validate(value):
+        if not isinstance(value, dict):
+            return False
+        keys = value.keys()
+        if not GEOPOINT_REQUIRED_KEYS <= keys or not keys <= GEOPOINT_ALL_KEYS:
+            return False
+        return all(isinstance(val, (float, int)) for val in value.values())
+
+    return _validate
+
+
+def _compile_vector(schema):
+    def _validate(value):
+        if not isinstance(value, dict) or value.keys() != VECTOR_KEYS:
+            return False
+        return all(isinstance(val, (float, int)) for val in value.values())
+
+    return _validate
+
+
+def _compile_enum(schema):
+    if not isinstance(schema, dict):
+        return _invalid
+
+    enum_values = schema.get("schema", {}).get("enumValues", [])
+    allowed_values = tuple(
+        item["enumValue"] for item in enum_values if "enumValue" in item
+    )
+    return lambda value: value in allowed_values
+
+
+def _compile_object(schema):
+    if not isinstance(schema, dict):
+        return _invalid
+
+    fields = schema.get("schema", {}).get("fields", [])
+    field_validators = {field["name"]: compile_validator(field) for field in fields}
+
+    def _validate(value):
+        if not isinstance(value, dict):
+            return False
+
+        for key, val in value.items():
+            validate_field = field_validators.get(key)
+            if not validate_field or not validate_field(val):
+                return False
+
+        return True
+
+    return _validate
+
+
+_compilers = {
+    # primitive
+    "boolean": _instance_of(bool),
+    "double": _instance_of((float, int)),
+    "float": _instance_of((float, int)),
+    "integer": _instance_of(int),
+    "long": _instance_of((float, int)),
+    "string": _instance_of(str),
+    # primitive - time
+    "date": _iso8601(isodate.parse_date),
+    "dateTime": _iso8601(isodate.parse_datetime),
+    "duration": _iso8601(isodate.parse_duration),
+    "time": _iso8601(isodate.parse_time),
+    # pre-defined complex
+    "geopoint": _compile_geopoint,
+    "vector": _compile_vector,
+    # complex
+    "Enum": _compile_enum,
+    "Object": _compile_object,
+}
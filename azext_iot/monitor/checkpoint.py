@@ -0,0 +1,144 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import sqlite3
+import time
+
+from typing import Optional
+from knack.log import get_logger
+from azext_iot.constants import EXTENSION_CONFIG_ROOT_KEY
+from azext_iot.monitor.parsers.decoder import (
+    OFFSET_IDENTIFIER,
+    SEQUENCE_NUMBER_IDENTIFIER,
+    decode_identifier,
+)
+
+logger = get_logger(__name__)
+
+CHECKPOINT_FILE_NAME = "monitor_checkpoints.db"
+DEFAULT_FLUSH_INTERVAL_SEC = 5.0
+DEFAULT_FLUSH_COUNT = 1000
+
+
+def get_default_checkpoint_path(cmd) -> str:
+    return os.path.join(
+        cmd.cli_ctx.config.config_dir, EXTENSION_CONFIG_ROOT_KEY, CHECKPOINT_FILE_NAME
+    )
+
+
+class CheckpointStore:
+    """
+    Local SQLite store of the last processed event per Event Hub partition.
+
+    Checkpoints are keyed by hub (events endpoint hostname and path), consumer group
+    and partition. Updates are kept in memory and written in batches, either every
+    flush_interval seconds or once flush_count updates are pending.
+    The database connection is opened lazily so a store can be handed to worker processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SEC,
+        flush_count: int = DEFAULT_FLUSH_COUNT,
+    ):
+        self.path = path
+        self._flush_interval = flush_interval
+        self._flush_count = flush_count
+        self._connection = None
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def get_checkpoint(self, hub: str, consumer_group: str, partition: str) -> Optional[dict]:
+        key = (hub, consumer_group, str(partition))
+        if key in self._pending:
+            offset, sequence_number = self._pending[key]
+            return {"offset": offset, "sequence_number": sequence_number}
+
+        row = (
+            self._connect()
+            .execute(
+                "SELECT offset, sequence_number FROM checkpoints "
+                "WHERE hub = ? AND consumer_group = ? AND partition = ?",
+                key,
+            )
+            .fetchone()
+        )
+        if not row:
+            return None
+        return {"offset": row[0], "sequence_number": row[1]}
+
+    def update(
+        self, hub: str, consumer_group: str, partition: str, offset: str, sequence_number: int = None
+    ):
+        self._pending[(hub, consumer_group, str(partition))] = (offset, sequence_number)
+
+        if (
+            len(self._pending) >= self._flush_count
+            or time.monotonic() - self._last_flush >= self._flush_interval
+        ):
+            self.flush()
+
+    def update_from_message(self, hub: str, consumer_group: str, partition: str, message):
+        annotations = message.annotations or {}
+        offset = annotations.get(OFFSET_IDENTIFIER)
+        if offset is None:
+            return
+        self.update(
+            hub,
+            consumer_group,
+            partition,
+            offset=decode_identifier(offset),
+            sequence_number=annotations.get(SEQUENCE_NUMBER_IDENTIFIER),
+        )
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+
+        now = time.time()
+        rows = [key + value + (now,) for key, value in self._pending.items()]
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(hub, consumer_group, partition, offset, sequence_number, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self._pending = {}
+
+    def close(self):
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            logger.warning("Failed to save monitor checkpoints: %s", e)
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection:
+            return self._connection
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(self.path, timeout=30)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "hub TEXT NOT NULL, "
+            "consumer_group TEXT NOT NULL, "
+            "partition TEXT NOT NULL, "
+            "offset TEXT NOT NULL, "
+            "sequence_number INTEGER, "
+            "updated REAL, "
+            "PRIMARY KEY (hub, consumer_group, partition))"
+        )
+        return self._connection
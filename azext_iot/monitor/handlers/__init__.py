@@ -6,5 +6,7 @@
 
 from azext_iot.monitor.handlers.common_handler import CommonHandler
 from azext_iot.monitor.handlers.central_handler import CentralHandler
+from azext_iot.monitor.handlers.stats_handler import StatsHandler
+from azext_iot.monitor.handlers.property_handler import PropertyChangeHandler
 
-__all__ = ["CommonHandler", "CentralHandler"]
+__all__ = ["CommonHandler", "CentralHandler", "StatsHandler", "PropertyChangeHandler"]
@@ -18,10 +18,15 @@ from azext_iot.central.providers import (
 from azext_iot.monitor.handlers import CommonHandler
 from azext_iot.monitor.models.arguments import CentralHandlerArguments
 from azext_iot.monitor.parsers.central_parser import CentralParser
-from azext_iot.monitor.parsers.issue import Issue
+from azext_iot.monitor.parsers.decoder import DEVICE_ID_IDENTIFIER, decode_identifier
+from azext_iot.monitor.parsers.issue import IssueAggregator
+from azext_iot.monitor.template_resolver import DeviceTemplateResolver
 
 logger = get_logger(__name__)
 
+# Seconds between checks for messages released by device template lookups
+RESOLVED_DRAIN_INTERVAL_SEC = 1
+
 
 class CentralHandler(CommonHandler):
     def __init__(
@@ -40,9 +45,16 @@ class CentralHandler(CommonHandler):
 
         self._central_handler_args = central_handler_args
 
-        self._messages = []
-        self._issues: List[Issue] = []
+        self._n_messages = 0
+        self._issues = IssueAggregator()
         self._central_dns_suffix = central_dns_suffix
+        self._stopped = False
+        self._drain_handle = None
+        self._resolver = DeviceTemplateResolver(
+            central_device_provider=central_device_provider,
+            central_template_provider=central_template_provider,
+            central_dns_suffix=central_dns_suffix,
+        )
 
         if self._central_handler_args.duration:
             loop = get_loop()
@@ -51,7 +63,67 @@ class CentralHandler(CommonHandler):
                 self._central_handler_args.duration + 5, self._quit_duration_exceeded
             )
 
+    def warm_up(self):
+        """Resolves device templates of known devices before messages are validated."""
+        self._resolver.warm_up()
+
     def validate_message(self, message):
+        if not self._should_process_message(message, filter_interface=False):
+            return
+
+        # wait for the device template to be resolved off the message path
+        device_id = decode_identifier((message.annotations or {}).get(DEVICE_ID_IDENTIFIER))
+        if not self._resolver.is_ready(device_id):
+            self._resolver.park(device_id, message)
+            self._schedule_drain()
+            return
+
+        self._validate_message(message)
+
+    def validate_messages(self, messages):
+        for message in self._resolver.pop_ready():
+            self._validate_message(message)
+
+        for message in messages:
+            self.validate_message(message)
+
+    def close(self):
+        try:
+            self._validate_parked_messages()
+        except KeyboardInterrupt:
+            # max messages reached
+            pass
+        finally:
+            super(CentralHandler, self).close()
+
+    def _schedule_drain(self):
+        # parked messages are released by the next batch, or by this timer on an idle stream
+        if self._drain_handle is None:
+            self._drain_handle = get_loop().call_later(
+                RESOLVED_DRAIN_INTERVAL_SEC, self._drain_resolved
+            )
+
+    def _drain_resolved(self):
+        self._drain_handle = None
+        if self._stopped:
+            return
+
+        for message in self._resolver.pop_ready():
+            self._validate_message(message)
+        if self._resolver.has_pending():
+            self._schedule_drain()
+
+    def _validate_parked_messages(self):
+        # waits for lookups in flight, messages of unresolved devices are validated as is
+        if self._drain_handle:
+            self._drain_handle.cancel()
+            self._drain_handle = None
+        for message in self._resolver.close():
+            if self._stopped:
+                return
+            self._validate_message(message)
+
+    def _validate_message(self, message):
         parser = CentralParser(
             message=message,
             common_parser_args=self._common_handler_args.common_parser_args,
@@ -60,22 +132,16 @@ class CentralHandler(CommonHandler):
             central_dns_suffix=self._central_dns_suffix,
         )
 
-        if not self._should_process_device(parser.device_id):
-            return
-
-        if not self._should_process_module(parser.module_id):
-            return
-
-        parsed_message = parser.parse_message()
+        parser.parse_message()
 
-        self._messages.append(parsed_message)
-        n_messages = len(self._messages)
+        self._n_messages += 1
+        n_messages = self._n_messages
 
         issues = parser.issues_handler.get_issues_with_minimum_severity(
             self._central_handler_args.minimum_severity
         )
 
-        self._issues.extend(issues)
+        self._issues.add_all(issues)
 
         self._print_progress_update(n_messages)
 
@@ -122,7 +188,7 @@ class CentralHandler(CommonHandler):
             print("Processed {} messages...".format(n_messages), flush=True)
 
     def _print_results(self):
-        n_messages = len(self._messages)
+        n_messages = self._n_messages
 
         if not self._issues:
             print("No errors detected after parsing {} message(s).".format(n_messages))
@@ -133,7 +199,13 @@ class CentralHandler(CommonHandler):
 
         print("Processing and displaying results.")
 
-        issues = [issue.json_repr() for issue in self._issues]
+        if self._issues.ungrouped:
+            logger.warning(
+                "%s issue(s) exceeded the number of tracked issue groups and are not listed.",
+                self._issues.ungrouped,
+            )
+
+        issues = self._issues.get_summary()
 
         if self._central_handler_args.style.lower() == "json":
             self._handle_json_summary(issues)
@@ -143,20 +215,21 @@ class CentralHandler(CommonHandler):
             self._handle_csv_summary(issues)
             return
 
-    def _handle_json_summary(self, issues: List[Issue]):
+    def _handle_json_summary(self, issues: List[dict]):
         import json
 
         output = json.dumps(issues, indent=4)
         print(output)
 
-    def _handle_csv_summary(self, issues: List[Issue]):
-        fieldnames = ["severity", "details", "message", "device_id", "template_id"]
-        writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
+    def _handle_csv_summary(self, issues: List[dict]):
+        fieldnames = ["severity", "details", "message", "device_id", "template_id", "count"]
+        writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames, extrasaction="ignore")
         writer.writeheader()
         for issue in issues:
             writer.writerow(issue)
 
     def _quit_messages_exceeded(self):
+        self._stopped = True
         message = "Successfully parsed {} message(s).".format(
             self._central_handler_args.max_messages
         )
@@ -165,6 +238,8 @@ class CentralHandler(CommonHandler):
         stop_monitor()
 
     def _quit_duration_exceeded(self):
+        self._validate_parked_messages()
+        self._stopped = True
         message = "{} second(s) have elapsed.".format(
             self._central_handler_args.duration
         )
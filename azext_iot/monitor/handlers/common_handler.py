@@ -4,68 +4,111 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-import json
 import re
-import yaml
 
 from azext_iot.monitor.base_classes import AbstractBaseEventsHandler
+from azext_iot.monitor.output import EventWriter
 from azext_iot.monitor.parsers.common_parser import CommonParser
+from azext_iot.monitor.parsers.decoder import (
+    DEVICE_ID_IDENTIFIER,
+    MODULE_ID_IDENTIFIER,
+    INTERFACE_NAME_IDENTIFIER_V1,
+    INTERFACE_NAME_IDENTIFIER_V2,
+    decode_identifier,
+)
 from azext_iot.monitor.models.arguments import CommonHandlerArguments
 
 
 class CommonHandler(AbstractBaseEventsHandler):
-    def __init__(self, common_handler_args: CommonHandlerArguments):
+    def __init__(self, common_handler_args: CommonHandlerArguments, stream=None):
         super(CommonHandler, self).__init__()
         self._common_handler_args = common_handler_args
+        self._writer = EventWriter(
+            output=self._common_handler_args.output,
+            compact=self._common_handler_args.compact,
+            stream=stream,
+        )
+
+        # Filters are compiled once, every message is matched against them
+        device_id = self._common_handler_args.device_id
+        devices = self._common_handler_args.devices
+        self._device_matcher = _compile_id_matcher(device_id)
+        self._module_matcher = _compile_id_matcher(self._common_handler_args.module_id)
+        self._devices = frozenset(devices) if devices else None
+
+        # Exact device id filters can be checked against the raw annotation bytes
+        self._device_id_bytes = None
+        if device_id and not _is_pattern(device_id):
+            self._device_id_bytes = device_id.encode("utf8")
+        self._devices_bytes = None
+        if self._devices:
+            self._devices_bytes = frozenset(d.encode("utf8") for d in self._devices)
 
     def parse_message(self, message):
+        # Stage one: only look at identity annotations to drop filtered messages early
+        if not self._should_process_message(message):
+            return
+
+        # Stage two: full decode of properties and payload
         parser = CommonParser(
             message=message,
             common_parser_args=self._common_handler_args.common_parser_args,
         )
 
-        if not self._should_process_device(parser.device_id):
-            return
-
-        if not self._should_process_interface(parser.interface_name):
-            return
-
-        if not self._should_process_module(parser.module_id):
-            return
-
         result = parser.parse_message()
 
-        if self._common_handler_args.output.lower() == "json":
-            dump = json.dumps(result, indent=4)
-        else:
-            dump = yaml.safe_dump(result, default_flow_style=False)
+        self._writer.write(result)
 
-        print(dump, flush=True)
+    def close(self):
+        self._writer.close()
 
-    def _should_process_device(self, device_id):
-        expected_device_id = self._common_handler_args.device_id
-        expected_devices = self._common_handler_args.devices
+    def _should_process_message(self, message, filter_interface=True) -> bool:
+        annotations = message.annotations or {}
+
+        raw_device_id = self._get_raw_device_id(message)
+        if isinstance(raw_device_id, str):
+            # ids carried as str (e.g. application properties) are matched as bytes
+            raw_device_id = raw_device_id.encode("utf8")
 
-        process_device = self._perform_id_match(expected_device_id, device_id)
+        if self._device_id_bytes is not None:
+            if raw_device_id != self._device_id_bytes:
+                return False
+        elif self._device_matcher and not self._device_matcher(decode_identifier(raw_device_id)):
+            # only wildcard device ids need the decoded id
+            return False
 
-        if expected_devices and device_id not in expected_devices:
+        if self._devices_bytes is not None and raw_device_id not in self._devices_bytes:
             return False
 
-        return process_device
-
-    def _perform_id_match(self, expected_id, actual_id):
-        if expected_id and expected_id != actual_id:
-            if "*" in expected_id or "?" in expected_id:
-                regex = (
-                    re.escape(expected_id).replace("\\*", ".*").replace("\\?", ".")
-                    + "$"
-                )
-                if not re.match(regex, actual_id):
-                    return False
-            else:
+        if filter_interface and self._common_handler_args.interface_name:
+            raw_interface_name = annotations.get(
+                INTERFACE_NAME_IDENTIFIER_V1
+            ) or annotations.get(INTERFACE_NAME_IDENTIFIER_V2)
+            if not self._should_process_interface(decode_identifier(raw_interface_name)):
+                return False
+
+        if self._common_handler_args.module_id:
+            raw_module_id = annotations.get(MODULE_ID_IDENTIFIER)
+            if not self._should_process_module(decode_identifier(raw_module_id)):
                 return False
+
         return True
 
+    def _get_raw_device_id(self, message):
+        return (message.annotations or {}).get(DEVICE_ID_IDENTIFIER)
+
+    def _should_process_device(self, device_id):
+        if self._devices is not None and device_id not in self._devices:
+            return False
+
+        return self._perform_id_match(self._device_matcher, device_id)
+
+    def _perform_id_match(self, matcher, actual_id):
+        # no matcher means no filter was specified
+        if not matcher:
+            return True
+        return matcher(actual_id)
+
     def _should_process_interface(self, interface_name):
         expected_interface_name = self._common_handler_args.interface_name
 
@@ -77,5 +120,25 @@ class CommonHandler(AbstractBaseEventsHandler):
         return expected_interface_name == interface_name
 
     def _should_process_module(self, module_id):
-        expected_module_id = self._common_handler_args.module_id
-        return self._perform_id_match(expected_module_id, module_id)
+        return self._perform_id_match(self._module_matcher, module_id)
+
+
+def _is_pattern(expected_id: str) -> bool:
+    return "*" in expected_id or "?" in expected_id
+
+
+def _compile_id_matcher(expected_id: str):
+    if not expected_id:
+        return None
+
+    if not _is_pattern(expected_id):
+        return lambda actual_id: actual_id == expected_id
+
+    pattern = re.compile(
+        re.escape(expected_id).replace("\\*", ".*").replace("\\?", ".") + "$"
+    )
+
+    def _match(actual_id):
+        return actual_id == expected_id or pattern.match(actual_id) is not None
+
+    return _match
@@ -0,0 +1,77 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+
+from typing import Callable
+from knack.log import get_logger
+from azext_iot.monitor.handlers.common_handler import CommonHandler
+from azext_iot.monitor.models.arguments import CommonHandlerArguments
+from azext_iot.monitor.parsers.decoder import decode_identifier
+
+logger = get_logger(__name__)
+
+MESSAGE_SOURCE_IDENTIFIER = b"iothub-message-source"
+DEVICE_ID_PROPERTY = b"deviceId"
+TWIN_CHANGE_EVENTS_SOURCE = "twinChangeEvents"
+PROPERTY_KINDS = ("desired", "reported")
+
+
+class PropertyChangeHandler(CommonHandler):
+    """
+    Hands device twin change notifications from the event stream to on_change.
+
+    Notifications are only present when twin change events are routed to the monitored
+    Event Hub. Other messages are skipped without decoding their payload. on_change is
+    called with the device id, the property kind (desired or reported), the twin version
+    and the changed properties.
+    """
+
+    def __init__(
+        self,
+        common_handler_args: CommonHandlerArguments,
+        on_change: Callable[[str, str, int, dict], None],
+    ):
+        super(PropertyChangeHandler, self).__init__(common_handler_args)
+        self._on_change = on_change
+
+    def parse_message(self, message):
+        self.parse_messages([message])
+
+    def _get_raw_device_id(self, message):
+        raw_device_id = super(PropertyChangeHandler, self)._get_raw_device_id(message)
+        if raw_device_id is None:
+            raw_device_id = (message.application_properties or {}).get(DEVICE_ID_PROPERTY)
+        return raw_device_id
+
+    def parse_messages(self, messages):
+        for message in messages:
+            # IoT Hub stamps the source as an annotation, routed copies may carry it as a property
+            source = (message.annotations or {}).get(MESSAGE_SOURCE_IDENTIFIER) or (
+                message.application_properties or {}
+            ).get(MESSAGE_SOURCE_IDENTIFIER)
+            if decode_identifier(source) != TWIN_CHANGE_EVENTS_SOURCE:
+                continue
+
+            if not self._should_process_message(message, filter_interface=False):
+                continue
+
+            device_id = decode_identifier(self._get_raw_device_id(message))
+            try:
+                notification = json.loads(b"".join(message.get_data()))
+            except ValueError:
+                logger.debug("Skipping malformed twin change event of device '%s'.", device_id)
+                continue
+
+            properties = notification.get("properties") or {}
+            for kind in PROPERTY_KINDS:
+                changes = {
+                    key: value
+                    for key, value in (properties.get(kind) or {}).items()
+                    if not key.startswith("$")
+                }
+                if changes:
+                    self._on_change(device_id, kind, notification.get("version"), changes)
@@ -0,0 +1,218 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+
+from array import array
+from datetime import datetime
+from azext_iot.constants import EVENT_MONITOR_STATS_INTERVAL_SEC
+from azext_iot.monitor.handlers.common_handler import CommonHandler
+from azext_iot.monitor.models.arguments import CommonHandlerArguments
+from azext_iot.monitor.parsers.decoder import (
+    DEVICE_ID_IDENTIFIER,
+    ENQUEUED_TIME_IDENTIFIER,
+    decode_identifier,
+)
+from azext_iot.monitor.utility import get_loop
+
+# Histogram buckets are powers of two, bucket i counts values in [2^(i-1), 2^i)
+HISTOGRAM_BUCKETS = 32
+TOP_DEVICES = 10
+
+
+class StatsHandler(CommonHandler):
+    """
+    Aggregates message statistics instead of printing events.
+
+    Only annotations and the raw body length of each message are read, payloads are
+    never decoded. Counters are kept per device and per partition, alongside payload
+    size and enqueue-to-receive latency histograms. A summary is written every interval
+    seconds while monitoring and a final report is written on close.
+    """
+
+    def __init__(
+        self,
+        common_handler_args: CommonHandlerArguments,
+        stream=None,
+        interval: float = EVENT_MONITOR_STATS_INTERVAL_SEC,
+    ):
+        super(StatsHandler, self).__init__(common_handler_args, stream=stream)
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+        self._messages = 0
+        self._bytes = 0
+        self._latency_count = 0
+        self._latency_total = 0
+        self._latency_min = None
+        self._latency_max = 0
+
+        # device and partition counters are indexed arrays, the dicts only map ids to slots
+        self._device_index = {}
+        self._device_messages = array("Q")
+        self._device_bytes = array("Q")
+        self._partition_index = {}
+        self._partition_messages = array("Q")
+        self._size_histogram = array("Q", [0] * HISTOGRAM_BUCKETS)
+        self._latency_histogram = array("Q", [0] * HISTOGRAM_BUCKETS)
+
+        self._loop = get_loop()
+        self._timer = None
+        if self._interval:
+            self._timer = self._loop.call_later(self._interval, self._report)
+
+    def parse_message(self, message):
+        self.parse_messages([message])
+
+    def parse_messages(self, messages):
+        # latency is measured up to the receive time, excluding time spent queued for processing
+        received_ms = getattr(messages, "received_ms", None) or int(time.time() * 1000)
+        partition = getattr(messages, "partition", None)
+
+        with self._lock:
+            processed = 0
+            for message in messages:
+                if not self._should_process_message(message):
+                    continue
+                processed += 1
+
+                annotations = message.annotations or {}
+                size = sum(len(data) for data in message.get_data())
+                self._bytes += size
+                self._size_histogram[_bucket(size)] += 1
+
+                raw_device_id = annotations.get(DEVICE_ID_IDENTIFIER)
+                slot = self._device_index.get(raw_device_id)
+                if slot is None:
+                    slot = self._device_index[raw_device_id] = len(self._device_messages)
+                    self._device_messages.append(0)
+                    self._device_bytes.append(0)
+                self._device_messages[slot] += 1
+                self._device_bytes[slot] += size
+
+                enqueued_ms = _to_epoch_ms(annotations.get(ENQUEUED_TIME_IDENTIFIER))
+                if enqueued_ms is not None:
+                    self._record_latency(max(0, received_ms - enqueued_ms))
+
+            self._messages += processed
+            if partition is not None and processed:
+                slot = self._partition_index.get(partition)
+                if slot is None:
+                    slot = self._partition_index[partition] = len(self._partition_messages)
+                    self._partition_messages.append(0)
+                self._partition_messages[slot] += processed
+
+    def close(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._write_summary(final=True)
+        super(StatsHandler, self).close()
+
+    def get_summary(self, final: bool = False) -> dict:
+        with self._lock:
+            elapsed = max(time.monotonic() - self._start, 1e-9)
+
+            devices = sorted(
+                self._device_index.items(),
+                key=lambda item: self._device_messages[item[1]],
+                reverse=True,
+            )
+            latency = None
+            if self._latency_count:
+                latency = {
+                    "min": self._latency_min,
+                    "avg": round(self._latency_total / self._latency_count, 1),
+                    "max": self._latency_max,
+                    "p50": _percentile(self._latency_histogram, self._latency_count, 0.5),
+                    "p95": _percentile(self._latency_histogram, self._latency_count, 0.95),
+                    "p99": _percentile(self._latency_histogram, self._latency_count, 0.99),
+                }
+
+            return {
+                "stats": {
+                    "final": final,
+                    "elapsedSec": round(elapsed, 1),
+                    "messages": self._messages,
+                    "messagesPerSec": round(self._messages / elapsed, 2),
+                    "bytes": self._bytes,
+                    "deviceCount": len(devices),
+                    "topDevices": {
+                        decode_identifier(device_id): {
+                            "messages": self._device_messages[slot],
+                            "messagesPerSec": round(self._device_messages[slot] / elapsed, 2),
+                            "bytes": self._device_bytes[slot],
+                        }
+                        for device_id, slot in devices[:TOP_DEVICES]
+                    },
+                    "partitions": {
+                        partition: {
+                            "messages": self._partition_messages[slot],
+                            "messagesPerSec": round(self._partition_messages[slot] / elapsed, 2),
+                        }
+                        for partition, slot in sorted(self._partition_index.items())
+                    },
+                    "payloadSizeBytes": _histogram_summary(self._size_histogram),
+                    "enqueueLatencyMs": latency,
+                    "enqueueLatencyHistogramMs": _histogram_summary(self._latency_histogram),
+                }
+            }
+
+    def _record_latency(self, latency_ms: int):
+        self._latency_count += 1
+        self._latency_total += latency_ms
+        if self._latency_min is None or latency_ms < self._latency_min:
+            self._latency_min = latency_ms
+        if latency_ms > self._latency_max:
+            self._latency_max = latency_ms
+        self._latency_histogram[_bucket(latency_ms)] += 1
+
+    def _report(self):
+        self._timer = None
+        if self._loop.is_closed():
+            return
+        self._write_summary()
+        self._timer = self._loop.call_later(self._interval, self._report)
+
+    def _write_summary(self, final: bool = False):
+        self._writer.write(self.get_summary(final=final))
+        self._writer.flush()
+
+
+def _bucket(value: int) -> int:
+    return min(int(value).bit_length(), HISTOGRAM_BUCKETS - 1)
+
+
+def _bucket_label(index: int) -> str:
+    return "<{}".format(1 << index)
+
+
+def _histogram_summary(histogram: array) -> dict:
+    return {_bucket_label(i): count for i, count in enumerate(histogram) if count}
+
+
+def _percentile(histogram: array, total: int, quantile: float) -> int:
+    # upper bound of the bucket holding the quantile
+    threshold = total * quantile
+    running = 0
+    for i, count in enumerate(histogram):
+        running += count
+        if running >= threshold:
+            return (1 << i) - 1
+    return (1 << (len(histogram) - 1)) - 1
+
+
+def _to_epoch_ms(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -50,8 +50,10 @@ class CommonHandlerArguments:
         device_id="",
         interface_name="",
         module_id="",
+        compact=False,
     ):
         self.output = output
+        self.compact = compact
         self.devices = devices or []
         self.device_id = device_id or ""
         self.interface_name = interface_name or ""
@@ -5,10 +5,19 @@
 # --------------------------------------------------------------------------------------------
 
 
-from enum import IntEnum
+from enum import Enum, IntEnum
 
 
 class Severity(IntEnum):
     info = 1
     warning = 2
     error = 3
+
+
+class PropertySource(Enum):
+    """
+    Source of device property changes for property monitoring.
+    """
+
+    twin = "twin"
+    events = "events"
@@ -0,0 +1,123 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+import sys
+import threading
+import time
+import yaml
+
+from knack.log import get_logger
+from azext_iot.common.utility import compact_json_dumps
+from azext_iot.monitor.utility import get_loop
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_BUFFER_SIZE = 64 * 1024
+DEFAULT_FLUSH_INTERVAL_SEC = 1.0
+
+
+class EventWriter:
+    """
+    Output stage for monitored events.
+
+    Serialized events are collected in a bounded buffer that is written to the stream
+    when it exceeds max_buffer_size characters or when flush_interval seconds have passed.
+    When the stream is interactive (tty) every event is written immediately.
+    Events may be written from a worker thread, idle flushes are scheduled on the
+    event loop that was current when the writer was created.
+    """
+
+    def __init__(
+        self,
+        output: str = "json",
+        compact: bool = False,
+        stream=None,
+        max_buffer_size: int = DEFAULT_MAX_BUFFER_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SEC,
+    ):
+        self._stream = stream or sys.stdout
+        self._output = (output or "json").lower()
+        self._compact = compact
+        self._max_buffer_size = max_buffer_size
+        self._flush_interval = flush_interval
+        if self._is_interactive():
+            self._max_buffer_size = 0
+
+        self._buffer = io.StringIO()
+        self._last_flush = time.monotonic()
+        self._flush_scheduled = False
+        self._loop = get_loop()
+        self._lock = threading.RLock()
+
+        self._dumper = None
+        if self._output == "yaml":
+            # A single dumper emits every event as a document of one yaml stream.
+            # Documents always start with "---" so output of several writers can be merged.
+            self._dumper = yaml.SafeDumper(
+                self._buffer, default_flow_style=False, explicit_start=True
+            )
+            self._dumper.open()
+
+    def write(self, result: dict):
+        with self._lock:
+            if self._dumper:
+                self._dumper.represent(result)
+            elif self._compact:
+                self._buffer.write(compact_json_dumps(result))
+                self._buffer.write("\n")
+            else:
+                self._buffer.write(json.dumps(result, indent=4))
+                self._buffer.write("\n")
+
+            if (
+                self._buffer.tell() > self._max_buffer_size
+                or time.monotonic() - self._last_flush >= self._flush_interval
+            ):
+                self.flush()
+            else:
+                self._schedule_flush()
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._buffer.tell():
+                return
+
+            self._stream.write(self._buffer.getvalue())
+            self._stream.flush()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+
+    def close(self):
+        with self._lock:
+            if self._dumper:
+                self._dumper.close()
+                self._dumper = None
+            self.flush()
+
+    def _is_interactive(self) -> bool:
+        try:
+            return self._stream.isatty()
+        except Exception:
+            return False
+
+    def _schedule_flush(self):
+        # Ensures buffered events are written out when the event stream goes idle
+        if self._flush_scheduled:
+            return
+
+        loop = self._loop
+        if loop.is_closed() or not loop.is_running():
+            return
+
+        def _timed_flush():
+            self._flush_scheduled = False
+            self.flush()
+
+        self._flush_scheduled = True
+        loop.call_soon_threadsafe(loop.call_later, self._flush_interval, _timed_flush)
@@ -11,7 +11,7 @@ from uamqp.message import Message
 from azext_iot.central.providers import CentralDeviceProvider
 from azext_iot.central.providers import CentralDeviceTemplateProvider
 from azext_iot.monitor.parsers import strings
-from azext_iot.monitor.central_validator import validate, extract_schema_type
+from azext_iot.monitor.central_validator import extract_schema_type
 from azext_iot.monitor.models.arguments import CommonParserArguments
 from azext_iot.monitor.models.enum import Severity
 from azext_iot.monitor.parsers.common_parser import CommonParser
@@ -36,13 +36,14 @@ class CentralParser(CommonParser):
         self._central_dns_suffix = central_dns_suffix
         self._template_id = None
 
-    def _add_central_issue(self, severity: Severity, details: str):
+    def _add_central_issue(self, severity: Severity, details: str, issue_type=None):
         self.issues_handler.add_central_issue(
             severity=severity,
             details=details,
             message=self._message,
             device_id=self.device_id,
             template_id=self._template_id,
+            issue_type=issue_type,
         )
 
     def parse_message(self) -> dict:
@@ -147,7 +148,12 @@ class CentralParser(CommonParser):
             if not schema:
                 name_miss.append(telemetry_name)
             else:
-                self._process_telemetry(telemetry_name, schema, telemetry)
+                validator = template.get_validator(
+                    name=telemetry_name,
+                    identifier=self.component_name,
+                    is_component=is_component,
+                )
+                self._process_telemetry(telemetry_name, schema, validator, telemetry)
 
         if name_miss:
             if is_component:
@@ -161,11 +167,20 @@ class CentralParser(CommonParser):
                 )
             self._add_central_issue(severity=Severity.warning, details=details)
 
-    def _process_telemetry(self, telemetry_name: str, schema, telemetry):
+    def _process_telemetry(self, telemetry_name: str, schema, validator, telemetry):
+        if validator(telemetry):
+            return
+
         expected_type = extract_schema_type(schema)
-        is_payload_valid = validate(schema, telemetry)
-        if expected_type and not is_payload_valid:
+        if expected_type:
             details = strings.invalid_primitive_schema_mismatch_template(
                 telemetry_name, expected_type, telemetry
             )
-            self._add_central_issue(severity=Severity.error, details=details)
+            # details embed the value sent, group by field and expected type instead
+            self._add_central_issue(
+                severity=Severity.error,
+                details=details,
+                issue_type=(
+                    "schema_mismatch", self.component_name, telemetry_name, expected_type
+                ),
+            )
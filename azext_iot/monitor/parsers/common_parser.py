@@ -9,18 +9,27 @@ import re
 
 from uamqp.message import Message
 
-from azext_iot.common.utility import parse_entity, unicode_binary_map
 from azext_iot.monitor.base_classes import AbstractBaseParser
 from azext_iot.monitor.parsers import strings
+from azext_iot.monitor.parsers.decoder import (  # noqa: F401
+    DEVICE_ID_IDENTIFIER,
+    MODULE_ID_IDENTIFIER,
+    INTERFACE_NAME_IDENTIFIER_V1,
+    INTERFACE_NAME_IDENTIFIER_V2,
+    COMPONENT_NAME_IDENTIFIER,
+)
+from azext_iot.monitor.parsers.decoder import (
+    EventRecord,
+    read_event_record,
+    decode_annotations,
+    decode_system_properties,
+)
 from azext_iot.monitor.models.arguments import CommonParserArguments
 from azext_iot.monitor.models.enum import Severity
 from azext_iot.monitor.parsers.issue import IssueHandler
 
-DEVICE_ID_IDENTIFIER = b"iothub-connection-device-id"
-MODULE_ID_IDENTIFIER = b"iothub-connection-module-id"
-INTERFACE_NAME_IDENTIFIER_V1 = b"iothub-interface-name"
-INTERFACE_NAME_IDENTIFIER_V2 = b"dt-dataschema"
-COMPONENT_NAME_IDENTIFIER = b"dt-subject"
+# Escaped line breaks some devices send between JSON tokens
+ESCAPED_LINE_BREAKS = re.compile(r"(\\r\\n)+|\\r+|\\n+")
 
 
 class CommonParser(AbstractBaseParser):
@@ -29,10 +38,11 @@ class CommonParser(AbstractBaseParser):
         self._common_parser_args = common_parser_args
         self._message = message
         self.device_id = ""  # need to default
-        self.device_id = self._parse_device_id(message)
-        self.module_id = self._parse_module_id(message)
-        self.interface_name = self._parse_interface_name(message)
-        self.component_name = self._parse_component_name(message)
+        self._record = self._read_event_record(message)
+        self.device_id = self._parse_device_id(self._record)
+        self.module_id = self._parse_module_id(self._record)
+        self.interface_name = self._parse_interface_name(self._record)
+        self.component_name = self._parse_component_name(self._record)
 
     def parse_message(self) -> dict:
         """
@@ -89,45 +99,35 @@ class CommonParser(AbstractBaseParser):
             device_id=self.device_id,
         )
 
-    def _parse_device_id(self, message: Message) -> str:
+    def _read_event_record(self, message: Message) -> EventRecord:
         try:
-            return str(message.annotations.get(DEVICE_ID_IDENTIFIER), "utf8")
+            return read_event_record(message)
         except Exception:
+            return EventRecord()
+
+    def _parse_device_id(self, record: EventRecord) -> str:
+        if not isinstance(record.device_id, str):
             details = strings.unknown_device_id()
             self._add_issue(severity=Severity.error, details=details)
             return ""
+        return record.device_id
 
-    def _parse_module_id(self, message: Message) -> str:
-        try:
-            return str(message.annotations.get(MODULE_ID_IDENTIFIER), "utf8")
-        except Exception:
-            # a message not containing an module name is expected for non-edge devices
-            # so there's no "issue" to log here
-            return ""
+    def _parse_module_id(self, record: EventRecord) -> str:
+        # a message not containing an module name is expected for non-edge devices
+        # so there's no "issue" to log here
+        return record.module_id or ""
 
-    def _parse_interface_name(self, message: Message) -> str:
-        try:
-            # Grab either the DTDL v1 or v2 amqp interface identifier.
-            # It's highly unlikely both will be present at the same time
-            # as they reflect different versions of a Plug & Play device.
-            target_interface = message.annotations.get(
-                INTERFACE_NAME_IDENTIFIER_V1
-            ) or message.annotations.get(INTERFACE_NAME_IDENTIFIER_V2)
-            return str(target_interface, "utf8")
-        except Exception:
-            # a message not containing an interface name is expected for non-pnp devices
-            # so there's no "issue" to log here
-            return ""
+    def _parse_interface_name(self, record: EventRecord) -> str:
+        # a message not containing an interface name is expected for non-pnp devices
+        # so there's no "issue" to log here
+        return record.interface_name or ""
 
-    def _parse_component_name(self, message: Message) -> str:
-        try:
-            return str(message.annotations.get(COMPONENT_NAME_IDENTIFIER), "utf8")
-        except Exception:
-            return ""
+    def _parse_component_name(self, record: EventRecord) -> str:
+        return record.component_name or ""
 
     def _parse_system_properties(self, message: Message):
         try:
-            return unicode_binary_map(parse_entity(message.properties, True))
+            return decode_system_properties(message.properties)
         except Exception:
             details = strings.invalid_system_properties()
             self._add_issue(severity=Severity.warning, details=details)
@@ -175,7 +175,7 @@ class CommonParser(AbstractBaseParser):
 
     def _parse_annotations(self, message: Message):
         try:
-            return unicode_binary_map(message.annotations)
+            return decode_annotations(message.annotations)
         except Exception:
             details = strings.invalid_annotations()
             self._add_issue(severity=Severity.warning, details=details)
@@ -183,30 +183,37 @@ class CommonParser(AbstractBaseParser):
 
     def _parse_application_properties(self, message: Message):
         try:
-            return unicode_binary_map(message.application_properties)
+            return decode_annotations(message.application_properties)
         except Exception:
             details = strings.invalid_application_properties()
             self._add_issue(severity=Severity.warning, details=details)
             return {}
 
     def _parse_payload(self, message: Message, content_type):
-        payload = ""
+        body = b""
         data = message.get_data()
 
         if data:
-            payload = str(next(data), "utf8")
+            body = next(data)
 
         if "application/json" in content_type.lower():
-            return self._try_parse_json(payload)
+            return self._try_parse_json(body)
 
-        return payload
+        return str(body, "utf8")
 
     def _try_parse_json(self, payload):
+        # Fast path: decode straight from the body bytes in a single pass
+        try:
+            return json.loads(payload)
+        except Exception:
+            pass
+
+        if isinstance(payload, (bytes, bytearray)):
+            payload = str(payload, "utf8")
+
         result = payload
         try:
-            regex = r"(\\r\\n)+|\\r+|\\n+"
-            payload_no_white_space = re.compile(regex).sub("", payload)
-            result = json.loads(payload_no_white_space)
+            result = json.loads(ESCAPED_LINE_BREAKS.sub("", payload))
         except Exception:
             details = strings.invalid_json()
             self._add_issue(severity=Severity.error, details=details)
@@ -0,0 +1,151 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Fixed-field decoders for uamqp messages.
+
+The generic helpers in azext_iot.common.utility (parse_entity, unicode_binary_map)
+rely on dir()/getattr reflection, which is too expensive to run for every event
+received by the monitor. The decoders here only touch the well known AMQP fields.
+"""
+
+DEVICE_ID_IDENTIFIER = b"iothub-connection-device-id"
+MODULE_ID_IDENTIFIER = b"iothub-connection-module-id"
+INTERFACE_NAME_IDENTIFIER_V1 = b"iothub-interface-name"
+INTERFACE_NAME_IDENTIFIER_V2 = b"dt-dataschema"
+COMPONENT_NAME_IDENTIFIER = b"dt-subject"
+OFFSET_IDENTIFIER = b"x-opt-offset"
+SEQUENCE_NUMBER_IDENTIFIER = b"x-opt-sequence-number"
+ENQUEUED_TIME_IDENTIFIER = b"x-opt-enqueued-time"
+
+# AMQP message properties section (uamqp.message.MessageProperties)
+SYSTEM_PROPERTY_FIELDS = (
+    "absolute_expiry_time",
+    "content_encoding",
+    "content_type",
+    "correlation_id",
+    "creation_time",
+    "group_id",
+    "group_sequence",
+    "message_id",
+    "reply_to",
+    "reply_to_group_id",
+    "subject",
+    "to",
+    "user_id",
+)
+
+# Annotation keys commonly stamped by IoT Hub / Event Hubs, pre-decoded
+KNOWN_ANNOTATION_KEYS = {
+    key: str(key, "utf8")
+    for key in (
+        DEVICE_ID_IDENTIFIER,
+        MODULE_ID_IDENTIFIER,
+        INTERFACE_NAME_IDENTIFIER_V1,
+        INTERFACE_NAME_IDENTIFIER_V2,
+        COMPONENT_NAME_IDENTIFIER,
+        b"iothub-connection-auth-method",
+        b"iothub-connection-auth-generation-id",
+        b"iothub-enqueuedtime",
+        b"iothub-message-source",
+        SEQUENCE_NUMBER_IDENTIFIER,
+        OFFSET_IDENTIFIER,
+        ENQUEUED_TIME_IDENTIFIER,
+        b"x-opt-partition-key",
+    )
+}
+
+
+class EventRecord:
+    """
+    Lightweight view over the identity annotations of a single event.
+
+    Values are decoded to str, missing annotations are represented by None.
+    """
+
+    __slots__ = ("device_id", "module_id", "interface_name", "component_name")
+
+    def __init__(self, device_id=None, module_id=None, interface_name=None, component_name=None):
+        self.device_id = device_id
+        self.module_id = module_id
+        self.interface_name = interface_name
+        self.component_name = component_name
+
+
+def _to_str(value):
+    if isinstance(value, bytes):
+        return str(value, "utf8")
+    return value
+
+
+def decode_identifier(value) -> str:
+    """Decode a raw identity annotation value, missing values decode to an empty string."""
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return str(value, "utf8")
+    return str(value)
+
+
+def read_event_record(message) -> EventRecord:
+    annotations = message.annotations or {}
+    get = annotations.get
+
+    # Grab either the DTDL v1 or v2 amqp interface identifier.
+    # It's highly unlikely both will be present at the same time
+    # as they reflect different versions of a Plug & Play device.
+    interface_name = get(INTERFACE_NAME_IDENTIFIER_V1) or get(
+        INTERFACE_NAME_IDENTIFIER_V2
+    )
+
+    return EventRecord(
+        device_id=_to_str(get(DEVICE_ID_IDENTIFIER)),
+        module_id=_to_str(get(MODULE_ID_IDENTIFIER)),
+        interface_name=_to_str(interface_name),
+        component_name=_to_str(get(COMPONENT_NAME_IDENTIFIER)),
+    )
+
+
+def decode_system_properties(properties) -> dict:
+    """
+    Decode the AMQP properties section into a dict of str keys.
+
+    Equivalent to unicode_binary_map(parse_entity(properties, True)).
+    """
+    result = {}
+    if properties is None:
+        return result
+
+    for field in SYSTEM_PROPERTY_FIELDS:
+        value = getattr(properties, field, None)
+        if not value:
+            continue
+        if isinstance(value, bytes):
+            value = str(value, "utf8")
+        result[field] = value
+
+    return result
+
+
+def decode_annotations(annotations) -> dict:
+    """
+    Decode binary keys and values of AMQP annotations (or application properties).
+
+    Equivalent to unicode_binary_map(annotations).
+    """
+    result = {}
+    if not annotations:
+        return result
+
+    known_keys = KNOWN_ANNOTATION_KEYS
+    for key, value in annotations.items():
+        if isinstance(key, bytes):
+            key = known_keys.get(key) or str(key, "utf8")
+        if isinstance(value, bytes):
+            value = str(value, "utf8")
+        result[key] = value
+
+    return result
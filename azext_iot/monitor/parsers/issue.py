@@ -11,17 +11,34 @@ from azext_iot.monitor.models.enum import Severity
 
 logger = get_logger(__name__)
 
+# Example messages kept per issue group, and maximum number of issue groups
+MAX_ISSUE_SAMPLES = 3
+MAX_ISSUE_GROUPS = 10000
+
 
 class Issue:
-    def __init__(self, severity: Severity, details: str, message, device_id=""):
+    def __init__(
+        self, severity: Severity, details: str, message, device_id="", issue_type=None
+    ):
         self.severity = severity
         self.details = details
         self.device_id = device_id
-        self.message = str(message)
+        # issues of the same type are aggregated together, details may embed message data
+        self.issue_type = issue_type or details
+        self._message = message
+        self._message_str = None
 
         if not self.device_id:
             self.device_id = "Unknown"
 
+    @property
+    def message(self) -> str:
+        # messages are only rendered for issues that are reported
+        if self._message_str is None:
+            self._message_str = str(self._message)
+            self._message = None
+        return self._message_str
+
     def log(self):
         to_log = "[{}] [DeviceId: {}] {}\n".format(
             self.severity.name.upper(), self.device_id, self.details
@@ -40,16 +57,27 @@ class Issue:
             logger.error(to_log)
 
     def json_repr(self):
-        json_repr = vars(self)
-        json_repr["severity"] = self.severity.name
-        return json_repr
+        return {
+            "severity": self.severity.name,
+            "details": self.details,
+            "device_id": self.device_id,
+            "message": self.message,
+        }
 
 
 class CentralIssue(Issue):
     def __init__(
-        self, severity: Severity, details: str, message, device_id="", template_id=""
+        self,
+        severity: Severity,
+        details: str,
+        message,
+        device_id="",
+        template_id="",
+        issue_type=None,
     ):
-        super(CentralIssue, self).__init__(severity, details, message, device_id)
+        super(CentralIssue, self).__init__(
+            severity, details, message, device_id, issue_type=issue_type
+        )
         self.template_id = template_id
 
         if not self.template_id:
@@ -62,19 +90,36 @@ class CentralIssue(Issue):
 
         self._log(to_log)
 
+    def json_repr(self):
+        json_repr = super(CentralIssue, self).json_repr()
+        json_repr["template_id"] = self.template_id
+        return json_repr
+
 
 class IssueHandler:
     def __init__(self):
         self._issues = []
 
-    def add_issue(self, severity: Severity, details: str, message, device_id=""):
+    def add_issue(
+        self, severity: Severity, details: str, message, device_id="", issue_type=None
+    ):
         issue = Issue(
-            severity=severity, details=details, message=message, device_id=device_id
+            severity=severity,
+            details=details,
+            message=message,
+            device_id=device_id,
+            issue_type=issue_type,
         )
         self._issues.append(issue)
 
     def add_central_issue(
-        self, severity: Severity, details: str, message, device_id="", template_id=""
+        self,
+        severity: Severity,
+        details: str,
+        message,
+        device_id="",
+        template_id="",
+        issue_type=None,
     ):
         issue = CentralIssue(
             severity=severity,
@@ -82,6 +127,7 @@ class IssueHandler:
             message=message,
             device_id=device_id,
             template_id=template_id,
+            issue_type=issue_type,
         )
         self._issues.append(issue)
 
@@ -128,3 +174,64 @@ class IssueHandler:
             "error" will not be included
         """
         return [issue for issue in self._issues if issue.severity <= severity]
+
+
+class IssueAggregator:
+    """
+    Aggregates issues with constant memory.
+
+    Issues are counted per (device id, template id, severity, issue type). The details and
+    message of the first max_samples issues of each group are kept as examples. Once
+    max_groups groups exist, issues of new groups are only counted as ungrouped.
+    """
+
+    def __init__(
+        self, max_samples: int = MAX_ISSUE_SAMPLES, max_groups: int = MAX_ISSUE_GROUPS
+    ):
+        self._max_samples = max_samples
+        self._max_groups = max_groups
+        # group key -> [count, [sample json_repr, ...]]
+        self._groups = {}
+        self.total = 0
+        self.ungrouped = 0
+
+    def add(self, issue: Issue):
+        self.total += 1
+        key = (
+            issue.device_id,
+            getattr(issue, "template_id", None),
+            issue.severity,
+            issue.issue_type,
+        )
+        group = self._groups.get(key)
+        if group is None:
+            if len(self._groups) >= self._max_groups:
+                self.ungrouped += 1
+                return
+            group = self._groups[key] = [0, []]
+
+        group[0] += 1
+        if len(group[1]) < self._max_samples:
+            group[1].append(issue.json_repr())
+
+    def add_all(self, issues: List[Issue]):
+        for issue in issues:
+            self.add(issue)
+
+    def get_summary(self) -> List[dict]:
+        """
+        One entry per group, most frequent first. Entries hold the fields of the first
+        issue of the group, the number of issues and the messages of the samples.
+        """
+        summary = []
+        for count, samples in sorted(
+            self._groups.values(), key=lambda group: group[0], reverse=True
+        ):
+            entry = dict(samples[0])
+            entry["count"] = count
+            entry["samples"] = [sample["message"] for sample in samples]
+            summary.append(entry)
+        return summary
+
+    def __len__(self) -> int:
+        return self.total
@@ -0,0 +1,178 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from knack.log import get_logger
+from azext_iot.common.shared import MonitorOverflowType
+from azext_iot.constants import EVENT_MONITOR_QUEUE_SIZE
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class StageMetrics:
+    """Latency counters of a single pipeline stage, in seconds."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avgMs": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "maxMs": round(self.max * 1000, 3),
+        }
+
+
+class PipelineMetrics:
+    """
+    Metrics of an event pipeline.
+
+    Stages:
+        receive: waiting on the service for a batch of messages.
+        enqueue: receiver blocked on a full queue (backpressure).
+        queue: batch waiting in the queue for the handler.
+        process: handler processing a batch.
+    """
+
+    STAGES = ("receive", "enqueue", "queue", "process")
+
+    def __init__(self):
+        self.stages = {stage: StageMetrics() for stage in self.STAGES}
+        self.messages = 0
+        self.dropped_batches = 0
+        self.dropped_messages = 0
+        self.max_queue_depth = 0
+
+    def summary(self) -> dict:
+        return {
+            "messages": self.messages,
+            "droppedBatches": self.dropped_batches,
+            "droppedMessages": self.dropped_messages,
+            "maxQueueDepth": self.max_queue_depth,
+            "stages": {name: stage.summary() for name, stage in self.stages.items()},
+        }
+
+
+class EventPipeline:
+    """
+    Bounded queue between AMQP partition receivers and an events handler.
+
+    Receivers put message batches on a shared queue and keep receiving while a single
+    consumer hands batches, in order, to on_messages_received on a worker thread.
+    When the queue is full the overflow policy either blocks the receivers (the link
+    credit is then not renewed, pushing back on the service) or drops a batch.
+
+    Must be started and used from the event loop running the receivers.
+    """
+
+    def __init__(
+        self,
+        on_messages_received,
+        max_queue_size: int = EVENT_MONITOR_QUEUE_SIZE,
+        overflow: str = MonitorOverflowType.block.value,
+    ):
+        self._on_messages_received = on_messages_received
+        self._overflow = MonitorOverflowType(overflow)
+        self._queue = asyncio.Queue(maxsize=max_queue_size)
+        # A single thread keeps handler calls serialized and ordered
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._consumer = None
+        self.error = None
+        self.metrics = PipelineMetrics()
+
+    def start(self):
+        self._consumer = asyncio.ensure_future(self._consume())
+
+    async def put(self, batch: list, on_processed=None):
+        """
+        Queue a batch for processing. on_processed(batch) is called on the event loop
+        once the handler has processed the batch.
+        Raises the handler error, if processing of an earlier batch failed.
+        """
+        if self.error:
+            raise self.error
+
+        item = (batch, on_processed, time.monotonic())
+        if self._queue.full():
+            if self._overflow == MonitorOverflowType.dropNewest:
+                self._record_drop(batch)
+                return
+            if self._overflow == MonitorOverflowType.dropOldest:
+                self._record_drop(self._queue.get_nowait()[0])
+                self._queue.put_nowait(item)
+                return
+
+            start = time.monotonic()
+            await self._queue.put(item)
+            self.metrics.stages["enqueue"].record(time.monotonic() - start)
+        else:
+            self._queue.put_nowait(item)
+
+        depth = self._queue.qsize()
+        if depth > self.metrics.max_queue_depth:
+            self.metrics.max_queue_depth = depth
+
+    async def close(self):
+        """Process the remaining queued batches and stop the consumer."""
+        if self._consumer:
+            await self._queue.put((_STOP, None, None))
+            await self._consumer
+            self._consumer = None
+        self._executor.shutdown(wait=True)
+        logger.info("Event pipeline metrics: %s", self.metrics.summary())
+
+    def cancel(self):
+        if self._consumer:
+            self._consumer.cancel()
+            self._consumer = None
+        self._executor.shutdown(wait=False)
+
+    async def _consume(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch, on_processed, queued_at = await self._queue.get()
+            if batch is _STOP:
+                return
+
+            # after a handler error, keep draining so receivers never block on a full queue
+            if self.error:
+                continue
+
+            start = time.monotonic()
+            self.metrics.stages["queue"].record(start - queued_at)
+            try:
+                await loop.run_in_executor(self._executor, self._on_messages_received, batch)
+            except Exception as e:  # pylint: disable=broad-except
+                self.error = e
+                continue
+            self.metrics.stages["process"].record(time.monotonic() - start)
+            self.metrics.messages += len(batch)
+            if on_processed:
+                on_processed(batch)
+
+    def _record_drop(self, batch: list):
+        if not self.metrics.dropped_batches:
+            logger.warning(
+                "Event processing queue is full, dropping messages (overflow policy: %s).",
+                self._overflow.value,
+            )
+        self.metrics.dropped_batches += 1
+        self.metrics.dropped_messages += len(batch)
@@ -5,16 +5,27 @@
 # --------------------------------------------------------------------------------------------
 
 from azext_iot.central.models.enum import ApiVersion
+import asyncio
 import datetime
+import random
 
 import isodate
 import time
+
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from typing import Callable, List
+from knack.log import get_logger
+from knack.util import CLIError
 from azext_iot.monitor.parsers import strings
 from azext_iot.monitor.models.enum import Severity
 from azext_iot.constants import (
     CENTRAL_ENDPOINT,
-    DEVICETWIN_POLLING_INTERVAL_SEC,
     DEVICETWIN_MONITOR_TIME_SEC,
+    DEVICETWIN_POLLING_CONCURRENCY,
+    DEVICETWIN_POLLING_MAX_INTERVAL_SEC,
+    DEVICETWIN_POLLING_MIN_INTERVAL_SEC,
+    DEVICETWIN_MULTI_POLLING_MIN_INTERVAL_SEC,
     PNP_DTDLV2_COMPONENT_MARKER,
 )
 
@@ -24,7 +35,20 @@ from azext_iot.central.providers import (
     CentralDeviceProvider,
     CentralDeviceTemplateProvider,
 )
+from azext_iot.central.providers.template_store import (
+    DeviceTemplateStore,
+    get_default_template_store_path,
+)
 from azext_iot.monitor.parsers.issue import IssueHandler
+from azext_iot.monitor.utility import get_loop
+
+logger = get_logger(__name__)
+
+# Changes reported by a poll are those updated since the previous poll, plus this margin
+# to tolerate clock skew between the service and the local machine
+DEVICETWIN_CLOCK_SKEW_SEC = 5
+# Relative jitter applied to the polling interval of each device in multi-device monitoring
+DEVICETWIN_POLLING_JITTER = 0.2
 
 
 class PropertyMonitor:
@@ -35,54 +59,83 @@ class PropertyMonitor:
         device_id: str,
         token: str,
         central_dns_suffix=CENTRAL_ENDPOINT,
+        central_device_provider: CentralDeviceProvider = None,
+        central_template_provider: CentralDeviceTemplateProvider = None,
+        min_poll_interval: float = DEVICETWIN_POLLING_MIN_INTERVAL_SEC,
     ):
         self._cmd = cmd
         self._app_id = app_id
         self._device_id = device_id
         self._token = token
         self._central_dns_suffix = central_dns_suffix
-        self._central_device_provider = CentralDeviceProvider(
+        self._central_device_provider = central_device_provider or CentralDeviceProvider(
             cmd=self._cmd,
             app_id=self._app_id,
             token=self._token,
             api_version=ApiVersion.v1.value,
         )
-        self._central_template_provider = CentralDeviceTemplateProvider(
-            cmd=self._cmd,
-            app_id=self._app_id,
-            token=self._token,
-            api_version=ApiVersion.v1.value,
+        self._central_template_provider = (
+            central_template_provider
+            or CentralDeviceTemplateProvider(
+                cmd=self._cmd,
+                app_id=self._app_id,
+                token=self._token,
+                api_version=ApiVersion.v1.value,
+                template_store=_get_template_store(self._cmd),
+            )
         )
         self._template = self._get_device_template()
 
-    def _compare_properties(self, prev_prop: Property, prop: Property):
+        # twin polling state
+        self._min_poll_interval = min_poll_interval
+        self.poll_interval = min_poll_interval
+        self._prev_twin = None
+        self._prev_polled_at = None
+        # property name -> (version, metadata index), see _index_metadata
+        self._metadata_indexes = {}
+
+    def _compare_properties(
+        self, prev_prop: Property, prop: Property, window_sec=DEVICETWIN_MONITOR_TIME_SEC
+    ):
         if prev_prop.version == prop.version:
             return
 
+        # diff against the metadata seen for the previous version, so only properties
+        # whose update marker moved are looked at. Without it, fall back to reporting
+        # properties updated within window_sec.
+        prev_version, prev_index = self._metadata_indexes.get(prev_prop.name, (None, None))
+        index = _index_metadata(prop.metadata)
+        self._metadata_indexes[prop.name] = (prop.version, index)
+        if prev_index is not None and prev_version == prev_prop.version:
+            return _diff_metadata_index(prev_index, index, prop.props)
+
         changes = {
             key: self._changed_props(
                 prop.props[key],
                 prop.metadata[key],
                 key,
+                window_sec,
             )
             for key, val in prop.metadata.items()
-            if self._is_relevant(key, val)
+            if self._is_relevant(key, val, window_sec)
         }
 
         return changes
 
-    def _is_relevant(self, key, val):
+    def _is_relevant(self, key, val, window_sec=DEVICETWIN_MONITOR_TIME_SEC):
         if key in {"$lastUpdated", "$lastUpdatedVersion"}:
             return False
 
         updated_within = datetime.datetime.now() - datetime.timedelta(
-            seconds=DEVICETWIN_MONITOR_TIME_SEC
+            seconds=window_sec
         )
 
         last_updated = isodate.parse_datetime(val["$lastUpdated"])
         return last_updated.timestamp() >= updated_within.timestamp()
 
-    def _changed_props(self, prop, metadata, property_name):
+    def _changed_props(
+        self, prop, metadata, property_name, window_sec=DEVICETWIN_MONITOR_TIME_SEC
+    ):
 
         # not an interface - whole thing is change log
         if not self._is_component(prop):
@@ -94,7 +147,7 @@ class PropertyMonitor:
         diff = {
             key: prop[key]
             for key, val in metadata.items()
-            if self._is_relevant(key, val)
+            if self._is_relevant(key, val, window_sec)
         }
         return diff
 
@@ -175,57 +228,333 @@ class PropertyMonitor:
         )
         return template
 
+    @property
+    def device_id(self) -> str:
+        return self._device_id
+
+    def poll_twin_change(self, session=None):
+        """
+        Polls the device twin once. Returns (previous twin, twin, window_sec) if the twin
+        changed since the previous poll, window_sec being the age of the property updates
+        to report, otherwise None.
+
+        Twins are requested conditionally on the etag of the previous twin. poll_interval
+        backs off while the twin is unchanged and resets once it changes.
+        """
+        polled_at = time.time()
+        prev_twin = self._prev_twin
+        twin = self._central_device_provider.get_device_twin(
+            device_id=self._device_id,
+            central_dns_suffix=self._central_dns_suffix,
+            etag=prev_twin.etag if prev_twin else None,
+            session=session,
+        )
+
+        change = None
+        if twin and prev_twin and _twin_changed(prev_twin, twin):
+            window_sec = polled_at - self._prev_polled_at + DEVICETWIN_CLOCK_SKEW_SEC
+            change = (prev_twin, twin, window_sec)
+            self.poll_interval = self._min_poll_interval
+        elif prev_twin:
+            self.poll_interval = min(
+                self.poll_interval * 2, DEVICETWIN_POLLING_MAX_INTERVAL_SEC
+            )
+
+        if twin and not prev_twin:
+            self._index_twin(twin)
+
+        if twin or not prev_twin:
+            self._prev_twin = twin
+            self._prev_polled_at = polled_at
+
+        return change
+
+    def _index_twin(self, twin):
+        for prop in (twin.desired_property, twin.reported_property):
+            self._metadata_indexes[prop.name] = (prop.version, _index_metadata(prop.metadata))
+
+    def print_twin_change(self, prev_twin, twin, window_sec, show_device_id=False):
+        device_id = self._device_id if show_device_id else None
+        change_d = self._compare_properties(
+            prev_twin.desired_property, twin.desired_property, window_sec
+        )
+        change_r = self._compare_properties(
+            prev_twin.reported_property, twin.reported_property, window_sec
+        )
+
+        if change_d:
+            _print_changes(
+                "desired", twin.desired_property.version, change_d, device_id=device_id
+            )
+
+        if change_r:
+            _print_changes(
+                "reported", twin.reported_property.version, change_r, device_id=device_id
+            )
+
+    def validate_twin_change(self, prev_twin, twin, window_sec, minimum_severity):
+        change_r = self._compare_properties(
+            prev_twin.reported_property, twin.reported_property, window_sec
+        )
+        if change_r:
+            self._validate_payload(change_r, minimum_severity)
+
+    def _poll_twin_changes(self):
+        while True:
+            change = self.poll_twin_change()
+            if change:
+                yield change
+
+            logger.debug("Next device twin poll in %s second(s).", self.poll_interval)
+            time.sleep(self.poll_interval)
+
     def start_property_monitor(
         self,
     ):
-        prev_twin = None
+        for prev_twin, twin, window_sec in self._poll_twin_changes():
+            self.print_twin_change(prev_twin, twin, window_sec)
+
+    def start_validate_property_monitor(self, minimum_severity):
+        for prev_twin, twin, window_sec in self._poll_twin_changes():
+            self.validate_twin_change(prev_twin, twin, window_sec, minimum_severity)
 
+
+class PropertyPollScheduler:
+    """
+    Polls the device twins of many devices from one event loop.
+
+    Every device keeps its own adaptive polling interval (PropertyMonitor.poll_twin_change),
+    with jittered sleeps so the polls of all devices spread out over time. Twin requests run
+    on a thread pool and share one HTTP session; at most max_concurrency are in flight.
+    """
+
+    def __init__(
+        self,
+        monitors: List[PropertyMonitor],
+        on_twin_change: Callable,
+        max_concurrency: int = DEVICETWIN_POLLING_CONCURRENCY,
+    ):
+        self._monitors = monitors
+        self._on_twin_change = on_twin_change
+        self._max_concurrency = max_concurrency
+
+    def run(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        executor = ThreadPoolExecutor(max_workers=self._max_concurrency)
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_maxsize=self._max_concurrency))
+        loop = get_loop()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        polls = [
+            loop.create_task(self._poll(monitor, executor, session, semaphore))
+            for monitor in self._monitors
+        ]
+        try:
+            # polls only end on errors they don't handle, such as KeyboardInterrupt
+            loop.run_until_complete(asyncio.gather(*polls, return_exceptions=True))
+        finally:
+            # leave no polls pending on the shared event loop, gathering the remaining
+            # ones also retrieves the error a poll stopped with so asyncio doesn't log it
+            for poll in polls:
+                poll.cancel()
+            loop.run_until_complete(asyncio.gather(*polls, return_exceptions=True))
+            # in flight requests are bounded by max_concurrency, don't wait on them
+            executor.shutdown(wait=False)
+            session.close()
+
+    async def _poll(self, monitor: PropertyMonitor, executor, session, semaphore):
+        loop = asyncio.get_event_loop()
+
+        # spread the first polls of all devices over the minimum interval
+        await asyncio.sleep(random.uniform(0, DEVICETWIN_MULTI_POLLING_MIN_INTERVAL_SEC))
         while True:
-            twin = self._central_device_provider.get_device_twin(
-                device_id=self._device_id,
-                central_dns_suffix=self._central_dns_suffix
+            change = None
+            try:
+                async with semaphore:
+                    change = await loop.run_in_executor(
+                        executor, monitor.poll_twin_change, session
+                    )
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning(
+                    "Unable to get the device twin of device '%s': %s", monitor.device_id, e
+                )
+                monitor.poll_interval = DEVICETWIN_POLLING_MAX_INTERVAL_SEC
+
+            if change:
+                self._on_twin_change(monitor, *change)
+
+            await asyncio.sleep(
+                monitor.poll_interval
+                * random.uniform(1 - DEVICETWIN_POLLING_JITTER, 1 + DEVICETWIN_POLLING_JITTER)
             )
 
-            if prev_twin:
-                change_d = self._compare_properties(
-                    prev_twin.desired_property,
-                    twin.desired_property,
+
+class PropertyChangeReporter:
+    """
+    Reports property changes of any number of devices, as received from device twin change
+    notifications (see PropertyChangeHandler) or by polling device twins.
+
+    Changes are printed, or when minimum_severity is set, reported properties are validated
+    against the device template of each device.
+    """
+
+    def __init__(
+        self,
+        cmd,
+        app_id: str,
+        token: str,
+        central_dns_suffix=CENTRAL_ENDPOINT,
+        minimum_severity: Severity = None,
+    ):
+        self._cmd = cmd
+        self._app_id = app_id
+        self._token = token
+        self._central_dns_suffix = central_dns_suffix
+        self._minimum_severity = minimum_severity
+        self._central_device_provider = CentralDeviceProvider(
+            cmd=cmd, app_id=app_id, token=token, api_version=ApiVersion.v1.value
+        )
+        self._central_template_provider = CentralDeviceTemplateProvider(
+            cmd=cmd,
+            app_id=app_id,
+            token=token,
+            api_version=ApiVersion.v1.value,
+            template_store=_get_template_store(cmd),
+        )
+        # device id -> PropertyMonitor holding the device template, None if unavailable
+        self._monitors = {}
+
+    def on_change(self, device_id: str, kind: str, version: int, changes: dict):
+        if self._minimum_severity is None:
+            _print_changes(kind, version, changes, device_id=device_id)
+            return
+
+        if kind != "reported":
+            return
+
+        monitor = self._get_monitor(device_id)
+        if monitor:
+            monitor._validate_payload(changes, self._minimum_severity)
+
+    def on_twin_change(self, monitor: PropertyMonitor, prev_twin, twin, window_sec):
+        if self._minimum_severity is None:
+            monitor.print_twin_change(prev_twin, twin, window_sec, show_device_id=True)
+            return
+
+        monitor.validate_twin_change(prev_twin, twin, window_sec, self._minimum_severity)
+
+    def list_device_ids(self, device_id_pattern: str = None, template: str = None) -> List[str]:
+        """
+        Returns the ids of the app devices matching device_id_pattern (supports * and ?)
+        and using the device template with id template.
+        """
+        devices = self._central_device_provider.list_devices(
+            central_dns_suffix=self._central_dns_suffix
+        )
+        return [
+            device.id
+            for device in devices
+            if (not device_id_pattern or fnmatchcase(device.id, device_id_pattern))
+            and (not template or device.template == template)
+        ]
+
+    def start_poll_monitor(self, device_ids: List[str]):
+        """Polls the device twins of device_ids on a shared scheduler, see PropertyPollScheduler."""
+        with ThreadPoolExecutor(max_workers=DEVICETWIN_POLLING_CONCURRENCY) as executor:
+            monitors = [
+                monitor
+                for monitor in executor.map(self._get_monitor, device_ids)
+                if monitor
+            ]
+        if not monitors:
+            raise CLIError("No devices to monitor.")
+
+        print("Monitoring properties of {} device(s).".format(len(monitors)), flush=True)
+        PropertyPollScheduler(monitors, self.on_twin_change).run()
+
+    def _get_monitor(self, device_id: str):
+        if device_id not in self._monitors:
+            try:
+                self._monitors[device_id] = PropertyMonitor(
+                    cmd=self._cmd,
+                    app_id=self._app_id,
+                    device_id=device_id,
+                    token=self._token,
+                    central_dns_suffix=self._central_dns_suffix,
+                    central_device_provider=self._central_device_provider,
+                    central_template_provider=self._central_template_provider,
+                    min_poll_interval=DEVICETWIN_MULTI_POLLING_MIN_INTERVAL_SEC,
                 )
-                change_r = self._compare_properties(
-                    prev_twin.reported_property, twin.reported_property
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning(
+                    "Unable to get the device template of device '%s', "
+                    "its properties are not monitored: %s",
+                    device_id,
+                    e,
                 )
+                self._monitors[device_id] = None
+        return self._monitors[device_id]
 
-                if change_d:
-                    print("Changes in desired properties:")
-                    print("version :", twin.desired_property.version)
-                    print(change_d)
 
-                if change_r:
-                    print("Changes in reported properties:")
-                    print("version :", twin.reported_property.version)
-                    print(change_r)
+def _get_template_store(cmd):
+    # no config directory to store templates in without a CLI context
+    return DeviceTemplateStore(get_default_template_store_path(cmd)) if cmd else None
 
-            time.sleep(DEVICETWIN_POLLING_INTERVAL_SEC)
 
-            prev_twin = twin
+def _twin_changed(prev_twin, twin) -> bool:
+    return (
+        prev_twin.desired_property.version != twin.desired_property.version
+        or prev_twin.reported_property.version != twin.reported_property.version
+    )
 
-    def start_validate_property_monitor(self, minimum_severity):
-        prev_twin = None
 
-        while True:
+def _print_changes(kind: str, version, changes: dict, device_id: str = None):
+    print("Changes in {} properties:".format(kind))
+    if device_id:
+        print("device :", device_id)
+    print("version :", version)
+    print(changes)
 
-            twin = self._central_device_provider.get_device_twin(
-                device_id=self._device_id,
-                central_dns_suffix=self._central_dns_suffix
-            )
 
-            if prev_twin:
-                change_r = self._compare_properties(
-                    prev_twin.reported_property, twin.reported_property
-                )
-                if change_r:
-                    self._validate_payload(change_r, minimum_severity)
+def _update_marker(metadata: dict):
+    return metadata.get("$lastUpdatedVersion"), metadata.get("$lastUpdated")
 
-            time.sleep(DEVICETWIN_POLLING_INTERVAL_SEC)
 
-            prev_twin = twin
+def _index_metadata(metadata: dict) -> dict:
+    """
+    Maps each property to its update marker ($lastUpdatedVersion, $lastUpdated) and the
+    markers of its own properties, so twin versions can be diffed without parsing dates.
+    """
+    return {
+        key: (
+            _update_marker(val),
+            {
+                name: _update_marker(nested)
+                for name, nested in val.items()
+                if not name.startswith("$") and isinstance(nested, dict)
+            },
+        )
+        for key, val in (metadata or {}).items()
+        if not key.startswith("$") and isinstance(val, dict)
+    }
+
+
+def _diff_metadata_index(prev_index: dict, index: dict, props: dict) -> dict:
+    changes = {}
+    for key, (marker, nested_markers) in index.items():
+        prev_marker, prev_nested_markers = prev_index.get(key, (None, {}))
+        if marker == prev_marker:
+            continue
+
+        prop = props.get(key)
+        if isinstance(prop, dict) and prop.get(PNP_DTDLV2_COMPONENT_MARKER) == "c":
+            # components only report the properties that changed within them
+            prop = {
+                name: prop[name]
+                for name, nested_marker in nested_markers.items()
+                if name in prop and nested_marker != prev_nested_markers.get(name)
+            }
+        changes[key] = prop
+    return changes
@@ -5,31 +5,102 @@
 # --------------------------------------------------------------------------------------------
 
 import asyncio
+import multiprocessing
+import os
+import queue
+import signal
 import sys
+import time
 import uamqp
 
 from uuid import uuid4
 from knack.log import get_logger
 from typing import List
-from azext_iot.constants import VERSION, USER_AGENT
+from azext_iot.common.shared import MonitorOverflowType
+from azext_iot.constants import (
+    VERSION,
+    USER_AGENT,
+    EVENT_MONITOR_PREFETCH,
+)
+from azext_iot.monitor.checkpoint import CheckpointStore
 from azext_iot.monitor.models.target import Target
+from azext_iot.monitor.pipeline import EventPipeline
 from azext_iot.monitor.utility import get_loop
 
 logger = get_logger(__name__)
 DEBUG = False
 
+# AMQP error conditions of a receiver using a stale events endpoint or credential
+STALE_TARGET_CONDITIONS = (
+    uamqp.constants.ErrorCodes.LinkRedirect.value,
+    uamqp.constants.ErrorCodes.ConnectionRedirect.value,
+    uamqp.constants.ErrorCodes.UnauthorizedAccess.value,
+)
+
+
+class MonitorWorkerError(RuntimeError):
+    """
+    Error reported by a monitor worker process. stale_target is set when the worker
+    failed on a stale events endpoint or credential, see is_stale_target_error.
+    """
+
+    def __init__(self, message, stale_target=False):
+        super(MonitorWorkerError, self).__init__(message)
+        self.stale_target = stale_target
+
+
+def is_stale_target_error(error) -> bool:
+    """
+    Whether error, or an error it was raised from, shows that the events endpoint or
+    credential of the monitored target is stale: the receiver link or connection was
+    redirected, or its authorization was rejected.
+    """
+    seen = set()
+    while isinstance(error, BaseException) and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, uamqp.errors.AuthenticationException):
+            return True
+        if isinstance(error, MonitorWorkerError) and error.stale_target:
+            return True
+        if isinstance(error, uamqp.errors.AMQPConnectionError):
+            condition = getattr(error, "condition", None)
+            if getattr(condition, "value", condition) in STALE_TARGET_CONDITIONS:
+                return True
+        error = error.__cause__ or error.__context__
+    return False
+
 
 def start_single_monitor(
     target: Target,
     enqueued_time_utc,
     on_start_string: str,
-    on_message_received,
+    on_message_received=None,
     timeout=0,
+    on_messages_received=None,
+    prefetch=EVENT_MONITOR_PREFETCH,
+    checkpoint_store: CheckpointStore = None,
+    queue_size=None,
+    overflow=MonitorOverflowType.block.value,
 ):
     """
     :param on_message_received:
         A callback to process messages as they arrive from the service.
         It takes a single argument, a ~uamqp.message.Message object.
+    :param on_messages_received:
+        A callback to process batches of messages as they arrive from the service.
+        It takes a single argument, a list of ~uamqp.message.Message objects.
+        Takes precedence over on_message_received.
+    :param prefetch:
+        The link credit of each partition receiver, i.e. the maximum number of
+        messages requested from the service ahead of processing.
+    :param checkpoint_store:
+        Optional store of processed offsets. Partitions with a checkpoint resume
+        after the checkpointed offset instead of enqueued_time_utc.
+    :param queue_size:
+        Maximum number of received batches buffered ahead of the message callback, which
+        then runs on a separate thread. By default the callback runs in the receive loop.
+    :param overflow:
+        MonitorOverflowType value, behavior of the receivers when the buffer is full.
     """
     return start_multiple_monitors(
         targets=[target],
@@ -37,6 +108,11 @@ def start_single_monitor(
         on_start_string=on_start_string,
         on_message_received=on_message_received,
         timeout=timeout,
+        on_messages_received=on_messages_received,
+        prefetch=prefetch,
+        checkpoint_store=checkpoint_store,
+        queue_size=queue_size,
+        overflow=overflow,
     )
 
 
@@ -44,20 +120,47 @@ def start_multiple_monitors(
     targets: List[Target],
     on_start_string: str,
     enqueued_time_utc,
-    on_message_received,
+    on_message_received=None,
     timeout=0,
+    on_messages_received=None,
+    prefetch=EVENT_MONITOR_PREFETCH,
+    checkpoint_store: CheckpointStore = None,
+    queue_size=None,
+    overflow=MonitorOverflowType.block.value,
 ):
     """
     :param on_message_received:
         A callback to process messages as they arrive from the service.
         It takes a single argument, a ~uamqp.message.Message object.
+    :param on_messages_received:
+        A callback to process batches of messages as they arrive from the service.
+        It takes a single argument, a list of ~uamqp.message.Message objects.
+        Takes precedence over on_message_received.
+    :param prefetch:
+        The link credit of each partition receiver, i.e. the maximum number of
+        messages requested from the service ahead of processing.
+    :param checkpoint_store:
+        Optional store of processed offsets. Partitions with a checkpoint resume
+        after the checkpointed offset instead of enqueued_time_utc.
+    :param queue_size:
+        Maximum number of received batches buffered ahead of the message callback, which
+        then runs on a separate thread. By default the callback runs in the receive loop.
+    :param overflow:
+        MonitorOverflowType value, behavior of the receivers when the buffer is full.
     """
+    if not on_messages_received:
+        on_messages_received = _batch_callback(on_message_received)
+
     coroutines = [
         _initiate_event_monitor(
             target=target,
             enqueued_time_utc=enqueued_time_utc,
-            on_message_received=on_message_received,
+            on_messages_received=on_messages_received,
             timeout=timeout,
+            prefetch=prefetch,
+            checkpoint_store=checkpoint_store,
+            queue_size=queue_size,
+            overflow=overflow,
         )
         for target in targets
     ]
@@ -87,41 +190,310 @@ def start_multiple_monitors(
         except RuntimeError:
             pass  # no running loop anymore
     finally:
-        if result:
-            errors = result[0]
-            if errors and errors[0]:
-                logger.debug(errors)
-                raise RuntimeError(errors[0])
+        if checkpoint_store:
+            checkpoint_store.close()
+        errors = []
+        for target_result in result or []:
+            if isinstance(target_result, BaseException):
+                # the connection failed before any partition was monitored
+                errors.append(target_result)
+            else:
+                errors.extend(error for error in target_result or [] if error)
+        if errors:
+            logger.debug(errors)
+            # a stale target error is kept as cause, so the caller can tell it apart
+            cause = next((error for error in errors if is_stale_target_error(error)), errors[0])
+            raise RuntimeError("; ".join(str(error) for error in errors)) from _get_cause(cause)
+
+
+def start_partitioned_monitors(
+    target: Target,
+    auth_factory,
+    handler_factory,
+    enqueued_time_utc,
+    on_start_string: str,
+    timeout=0,
+    prefetch=EVENT_MONITOR_PREFETCH,
+    workers=0,
+    stream=None,
+    checkpoint_store: CheckpointStore = None,
+    queue_size=None,
+    overflow=MonitorOverflowType.block.value,
+):
+    """
+    Shards the partitions of a target across worker processes. Each worker opens its own
+    AMQP connection and runs its own handler, serialized output is merged into stream.
+    Output is ordered per partition, as each partition is owned by a single worker.
+
+    :param auth_factory:
+        Callable without arguments returning the uamqp auth for the target. Auth is not
+        shared with workers so each worker builds its own.
+    :param handler_factory:
+        Callable taking a stream keyword argument and returning an events handler
+        (with parse_messages and close) that writes its output to that stream.
+    :param workers:
+        Number of worker processes. Use 0 to size from the CPU count.
+    :param checkpoint_store:
+        Optional store of processed offsets, each worker opens its own connection to it.
+    """
+    stream = stream or sys.stdout
+    partitions = list(target.partitions or [])
+    shards = _shard_partitions(partitions, workers or os.cpu_count() or 1)
+
+    if len(shards) < 2 or "fork" not in multiprocessing.get_all_start_methods():
+        if len(shards) > 1:
+            logger.warning(
+                "Multi-process monitoring is not supported on this platform, using a single process."
+            )
+        handler = handler_factory(stream=stream)
+        try:
+            return start_multiple_monitors(
+                targets=[target],
+                on_start_string=on_start_string,
+                enqueued_time_utc=enqueued_time_utc,
+                on_messages_received=handler.parse_messages,
+                timeout=timeout,
+                prefetch=prefetch,
+                checkpoint_store=checkpoint_store,
+                queue_size=queue_size,
+                overflow=overflow,
+            )
+        finally:
+            handler.close()
+
+    # fork is used since spawn would re-import the az entry point in every worker
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    stop_event = context.Event()
+    processes = [
+        context.Process(
+            target=_run_partition_worker,
+            kwargs={
+                "hostname": target.hostname,
+                "path": target.path,
+                "consumer_group": target.consumer_group,
+                "partitions": shard,
+                "auth_factory": auth_factory,
+                "handler_factory": handler_factory,
+                "enqueued_time_utc": enqueued_time_utc,
+                "timeout": timeout,
+                "prefetch": prefetch,
+                "checkpoint_store": checkpoint_store,
+                "queue_size": queue_size,
+                "overflow": overflow,
+                "results": results,
+                "stop_event": stop_event,
+            },
+            daemon=True,
+        )
+        for shard in shards
+    ]
+
+    errors = []
+    print(on_start_string, flush=True)
+    try:
+        for process in processes:
+            process.start()
+        logger.info("Started %s monitor workers.", len(processes))
+        _merge_worker_output(results, len(processes), stream, errors, processes)
+    except KeyboardInterrupt:
+        print("Stopping event monitor...", flush=True)
+        stop_event.set()
+        _merge_worker_output(results, len(processes), stream, errors, processes)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    if errors:
+        logger.debug(errors)
+        raise RuntimeError(errors[0]) from _get_cause(errors[0])
+
+
+def _get_cause(error):
+    return error if isinstance(error, BaseException) else None
+
+
+def _shard_partitions(partitions: list, workers: int) -> List[list]:
+    workers = max(1, min(workers, len(partitions)))
+    return [partitions[i::workers] for i in range(workers)] if partitions else []
+
+
+def _merge_worker_output(results, worker_count: int, stream, errors: list, processes: list):
+    finished = 0
+    while finished < worker_count:
+        try:
+            kind, value = results.get(timeout=1)
+        except queue.Empty:
+            # workers killed before reporting (e.g. OOM, SIGKILL) never post "done"
+            if not any(p.is_alive() for p in processes):
+                dead = [p for p in processes if p.exitcode]
+                if dead:
+                    errors.append(
+                        "Monitor workers exited unexpectedly: {}".format(
+                            ", ".join(
+                                "pid {} (exit code {})".format(p.pid, p.exitcode) for p in dead
+                            )
+                        )
+                    )
+                return
+            continue
+
+        if kind == "data":
+            stream.write(value)
+            stream.flush()
+        elif kind == "done":
+            finished += 1
+            if value:
+                errors.append(value)
+
+
+class _QueueStream:
+    """File-like object forwarding written chunks to a multiprocessing queue."""
+
+    def __init__(self, results):
+        self._results = results
+
+    def write(self, chunk: str):
+        self._results.put(("data", chunk))
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def _run_partition_worker(
+    hostname,
+    path,
+    consumer_group,
+    partitions,
+    auth_factory,
+    handler_factory,
+    enqueued_time_utc,
+    timeout,
+    prefetch,
+    results,
+    stop_event,
+    checkpoint_store=None,
+    queue_size=None,
+    overflow=MonitorOverflowType.block.value,
+):
+    # Ctrl-C is handled by the parent process, which signals workers through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    error = None
+    watcher = None
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    handler = handler_factory(stream=_QueueStream(results))
+    try:
+        target = Target(
+            hostname=hostname, path=path, partitions=partitions, auth=auth_factory()
+        )
+        target.add_consumer_group(consumer_group)
+        monitor = loop.create_task(
+            _initiate_event_monitor(
+                target=target,
+                enqueued_time_utc=enqueued_time_utc,
+                on_messages_received=handler.parse_messages,
+                timeout=timeout,
+                prefetch=prefetch,
+                checkpoint_store=checkpoint_store,
+                queue_size=queue_size,
+                overflow=overflow,
+            )
+        )
+        watcher = loop.create_task(_watch_stop_event(stop_event, monitor))
+        partition_results = loop.run_until_complete(monitor)
+        partition_errors = [result for result in partition_results or [] if result]
+        if partition_errors:
+            # errors are passed to the parent process without their cause, which is
+            # inspected here
+            error = MonitorWorkerError(
+                "; ".join(str(e) for e in partition_errors),
+                stale_target=any(is_stale_target_error(e) for e in partition_errors),
+            )
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:  # pylint: disable=broad-except
+        error = MonitorWorkerError(str(e), stale_target=is_stale_target_error(e))
+    finally:
+        if watcher:
+            watcher.cancel()
+            loop.run_until_complete(asyncio.gather(watcher, return_exceptions=True))
+        try:
+            handler.close()
+            if checkpoint_store:
+                checkpoint_store.close()
+        finally:
+            results.put(("done", error))
+            loop.close()
+
+
+async def _watch_stop_event(stop_event, monitor):
+    while not stop_event.is_set():
+        await asyncio.sleep(0.2)
+    monitor.cancel()
 
 
 async def _initiate_event_monitor(
-    target: Target, enqueued_time_utc, on_message_received, timeout=0
+    target: Target,
+    enqueued_time_utc,
+    on_messages_received,
+    timeout=0,
+    prefetch=EVENT_MONITOR_PREFETCH,
+    checkpoint_store: CheckpointStore = None,
+    queue_size=None,
+    overflow=MonitorOverflowType.block.value,
 ):
     if not target.partitions:
         logger.debug("No Event Hub partitions found to listen on.")
         return
 
     coroutines = []
+    pipeline = None
+    if queue_size:
+        pipeline = EventPipeline(
+            on_messages_received, max_queue_size=queue_size, overflow=overflow
+        )
+        pipeline.start()
 
-    async with uamqp.ConnectionAsync(
-        target.hostname,
-        sasl=target.auth,
-        debug=DEBUG,
-        container_id=_get_container_id(),
-        properties=_get_conn_props(),
-    ) as conn:
-        for p in target.partitions:
-            coroutines.append(
-                _monitor_events(
-                    target=target,
-                    connection=conn,
-                    partition=p,
-                    enqueued_time_utc=enqueued_time_utc,
-                    on_message_received=on_message_received,
-                    timeout=timeout,
+    try:
+        async with uamqp.ConnectionAsync(
+            target.hostname,
+            sasl=target.auth,
+            debug=DEBUG,
+            container_id=_get_container_id(),
+            properties=_get_conn_props(),
+        ) as conn:
+            for p in target.partitions:
+                coroutines.append(
+                    _monitor_events(
+                        target=target,
+                        connection=conn,
+                        partition=p,
+                        enqueued_time_utc=enqueued_time_utc,
+                        on_messages_received=on_messages_received,
+                        timeout=timeout,
+                        prefetch=prefetch,
+                        checkpoint_store=checkpoint_store,
+                        pipeline=pipeline,
+                    )
                 )
-            )
-        return await asyncio.gather(*coroutines, return_exceptions=True)
+            results = await asyncio.gather(*coroutines, return_exceptions=True)
+        if pipeline:
+            await pipeline.close()
+    finally:
+        if pipeline:
+            pipeline.cancel()
+
+    # surface handler errors of the last processed batches
+    if pipeline and pipeline.error and not results[0]:
+        results[0] = pipeline.error
+    return results
 
 
 async def _monitor_events(
@@ -129,26 +501,51 @@ async def _monitor_events(
     connection,
     partition,
     enqueued_time_utc,
-    on_message_received,
+    on_messages_received,
     timeout=0,
+    prefetch=EVENT_MONITOR_PREFETCH,
+    checkpoint_store: CheckpointStore = None,
+    pipeline: EventPipeline = None,
 ):
+    """
+    :param pipeline:
+        Optional pipeline that batches are handed to instead of calling
+        on_messages_received in the receive loop.
+    """
     source = uamqp.address.Source(
         "amqps://{}/{}/ConsumerGroups/{}/Partitions/{}".format(
             target.hostname, target.path, target.consumer_group, partition
         )
     )
-    source.set_filter(
-        bytes(
-            "amqp.annotation.x-opt-enqueuedtimeutc > " + str(enqueued_time_utc), "utf8"
+    hub = "{}/{}".format(target.hostname, target.path)
+    checkpoint = None
+    if checkpoint_store:
+        checkpoint = checkpoint_store.get_checkpoint(hub, target.consumer_group, partition)
+
+    if checkpoint:
+        logger.info("Resuming partition %s after offset %s", partition, checkpoint["offset"])
+        source.set_filter(
+            bytes("amqp.annotation.x-opt-offset > '{}'".format(checkpoint["offset"]), "utf8")
+        )
+    else:
+        source.set_filter(
+            bytes(
+                "amqp.annotation.x-opt-enqueuedtimeutc > " + str(enqueued_time_utc), "utf8"
+            )
         )
-    )
+
+    def _on_processed(batch):
+        if checkpoint_store:
+            checkpoint_store.update_from_message(
+                hub, target.consumer_group, partition, batch[-1]
+            )
 
     exp_cancelled = False
     receive_client = uamqp.ReceiveClientAsync(
         source,
         auth=target.auth,
         timeout=timeout,
-        prefetch=0,
+        prefetch=prefetch,
         client_name=_get_container_id(),
         debug=DEBUG,
     )
@@ -157,8 +554,22 @@ async def _monitor_events(
         if connection:
             await receive_client.open_async(connection=connection)
 
-        async for msg in receive_client.receive_messages_iter_async():
-            on_message_received(msg)
+        # Batches are returned as soon as any messages are available, up to the link credit.
+        # An empty batch means the receiver closed due to inactivity timeout.
+        while True:
+            start = time.monotonic()
+            batch = await receive_client.receive_message_batch_async(
+                max_batch_size=prefetch
+            )
+            if not batch:
+                break
+            batch = PartitionBatch(batch, partition, received_ms=int(time.time() * 1000))
+            if pipeline:
+                pipeline.metrics.stages["receive"].record(time.monotonic() - start)
+                await pipeline.put(batch, on_processed=_on_processed)
+            else:
+                on_messages_received(batch)
+                _on_processed(batch)
 
     except asyncio.CancelledError:
         exp_cancelled = True
@@ -166,7 +577,7 @@ async def _monitor_events(
     except uamqp.errors.LinkDetach as ld:
         if isinstance(ld.description, bytes):
             ld.description = str(ld.description, "utf8")
-        raise RuntimeError(ld.description)
+        raise RuntimeError(ld.description) from ld
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt, closing monitor on partition %s", partition)
         exp_cancelled = True
@@ -178,6 +589,28 @@ async def _monitor_events(
         logger.info("Closed monitor on partition %s", partition)
 
 
+class PartitionBatch(list):
+    """
+    Batch of messages received from a single partition, with the time it was received
+    (epoch milliseconds).
+    """
+
+    __slots__ = ("partition", "received_ms")
+
+    def __init__(self, messages, partition, received_ms=None):
+        super(PartitionBatch, self).__init__(messages)
+        self.partition = partition
+        self.received_ms = received_ms
+
+
+def _batch_callback(on_message_received):
+    def _on_messages_received(messages):
+        for msg in messages:
+            on_message_received(msg)
+
+    return _on_messages_received
+
+
 def _stop_and_suppress_eloop(loop):
     try:
         loop.stop()
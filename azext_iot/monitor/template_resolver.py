@@ -0,0 +1,131 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import queue
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from knack.log import get_logger
+from azext_iot.central.providers import (
+    CentralDeviceProvider,
+    CentralDeviceTemplateProvider,
+)
+from azext_iot.constants import CENTRAL_ENDPOINT
+
+logger = get_logger(__name__)
+
+DEFAULT_RESOLVER_WORKERS = 4
+DEFAULT_MAX_PENDING_MESSAGES = 100
+
+
+class DeviceTemplateResolver:
+    """
+    Resolves the device template of devices sending messages, off the message path.
+
+    warm_up fills the device and template provider caches before monitoring starts, using
+    the paged device list. Devices seen later are looked up on background threads while
+    their messages wait in a small per-device pending queue (oldest messages are dropped
+    once it is full). Messages of a device are handed back in order once it is resolved.
+
+    Apart from the background lookups, methods must be called from a single thread
+    (the thread handling messages).
+    """
+
+    def __init__(
+        self,
+        central_device_provider: CentralDeviceProvider,
+        central_template_provider: CentralDeviceTemplateProvider,
+        central_dns_suffix=CENTRAL_ENDPOINT,
+        max_workers: int = DEFAULT_RESOLVER_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING_MESSAGES,
+    ):
+        self._central_device_provider = central_device_provider
+        self._central_template_provider = central_template_provider
+        self._central_dns_suffix = central_dns_suffix
+        self._max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._ready = set()
+        self._pending = {}
+        self._resolved = queue.Queue()
+        self.dropped_messages = 0
+
+    def warm_up(self):
+        try:
+            devices = self._central_device_provider.list_devices(
+                central_dns_suffix=self._central_dns_suffix
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Unable to list devices, templates will be resolved per device: %s", e)
+            return
+
+        template_ids = {device.template for device in devices if device.template}
+        list(self._executor.map(self._fetch_template, template_ids))
+        self._ready.update(device.id for device in devices)
+        logger.info(
+            "Resolved %s device templates for %s devices.", len(template_ids), len(devices)
+        )
+
+    def is_ready(self, device_id: str) -> bool:
+        return device_id in self._ready
+
+    def park(self, device_id: str, message):
+        """Hold message until the template of device_id is resolved."""
+        pending = self._pending.get(device_id)
+        if pending is None:
+            pending = self._pending[device_id] = deque(maxlen=self._max_pending)
+            self._executor.submit(self._resolve, device_id)
+
+        if len(pending) == self._max_pending:
+            if not self.dropped_messages:
+                logger.warning(
+                    "Too many messages waiting on device template lookup, dropping the oldest."
+                )
+            self.dropped_messages += 1
+        pending.append(message)
+
+    def has_pending(self) -> bool:
+        """Whether messages are waiting on a device template lookup."""
+        return bool(self._pending)
+
+    def pop_ready(self) -> list:
+        """Returns messages of devices resolved since the last call, in arrival order per device."""
+        messages = []
+        while True:
+            try:
+                device_id = self._resolved.get_nowait()
+            except queue.Empty:
+                return messages
+            self._ready.add(device_id)
+            messages.extend(self._pending.pop(device_id, ()))
+
+    def close(self) -> list:
+        """Waits for lookups in flight and returns all remaining messages."""
+        self._executor.shutdown(wait=True)
+        messages = self.pop_ready()
+        for pending in self._pending.values():
+            messages.extend(pending)
+        self._pending = {}
+        return messages
+
+    def _resolve(self, device_id: str):
+        try:
+            device = self._central_device_provider.get_device(
+                device_id, central_dns_suffix=self._central_dns_suffix
+            )
+            self._fetch_template(device.template)
+        except Exception as e:  # pylint: disable=broad-except
+            # the parser reports the missing device or template when validating
+            logger.debug("Unable to resolve template of device '%s': %s", device_id, e)
+        finally:
+            self._resolved.put(device_id)
+
+    def _fetch_template(self, template_id: str):
+        try:
+            self._central_template_provider.get_device_template(
+                template_id, central_dns_suffix=self._central_dns_suffix
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug("Unable to get device template '%s': %s", template_id, e)
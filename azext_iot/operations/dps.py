@@ -19,7 +19,7 @@ from azext_iot.common.utility import shell_safe_json_parse
 from azext_iot.common.certops import open_certificate
 from azext_iot.common.utility import compute_device_key
 from azext_iot.dps.providers.discovery import DPSDiscovery
-from azext_iot.operations.generic import _execute_query
+from azext_iot.operations.generic import _execute_query, _stream_query
 from azext_iot._factory import SdkResolver
 from azext_iot.sdk.dps.service.models import (
     IndividualEnrollment,
@@ -53,6 +53,7 @@ def iot_dps_device_enrollment_list(
     top=None,
     login=None,
     auth_type_dataplane=None,
+    stream=False,
 ):
     from azext_iot.sdk.dps.service.models.query_specification import QuerySpecification
 
@@ -70,6 +71,9 @@ def iot_dps_device_enrollment_list(
 
         query_command = "SELECT *"
         query = [QuerySpecification(query=query_command)]
+        if stream:
+            _stream_query(query, sdk.individual_enrollment.query, top)
+            return None
         return _execute_query(query, sdk.individual_enrollment.query, top)
     except ProvisioningServiceErrorDetailsException as e:
         raise CLIError(e)
@@ -349,7 +353,13 @@ def iot_dps_device_enrollment_delete(
 
 
 def iot_dps_device_enrollment_group_list(
-    cmd, dps_name=None, resource_group_name=None, top=None, login=None, auth_type_dataplane=None,
+    cmd,
+    dps_name=None,
+    resource_group_name=None,
+    top=None,
+    login=None,
+    auth_type_dataplane=None,
+    stream=False,
 ):
     from azext_iot.sdk.dps.service.models.query_specification import QuerySpecification
 
@@ -366,6 +376,9 @@ def iot_dps_device_enrollment_group_list(
 
         query_command = "SELECT *"
         query1 = [QuerySpecification(query=query_command)]
+        if stream:
+            _stream_query(query1, sdk.enrollment_group.query, top)
+            return None
         return _execute_query(query1, sdk.enrollment_group.query, top)
     except ProvisioningServiceErrorDetailsException as e:
         raise CLIError(e)
@@ -4,35 +4,278 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import queue
+import sys
+import threading
+import time
+
+from knack.log import get_logger
 from knack.util import CLIError
 from azext_iot.assets.user_messages import error_param_top_out_of_bounds
+from azext_iot.common.utility import compact_json_dumps
+from azext_iot.constants import (
+    QUERY_DEFAULT_PAGE_SIZE,
+    QUERY_MAX_PAGE_SIZE,
+    QUERY_PAGE_MAX_BYTES,
+    QUERY_PAGE_TARGET_LATENCY_SEC,
+)
+
+logger = get_logger(__name__)
+
+QUERY_HEADERS = {"Cache-Control": "no-cache, must-revalidate"}
 
 
-def _execute_query(query_args, query_method, top=None):
+def _execute_query(query_args, query_method, top=None, prefetch=0, adaptive_page_size=False):
     payload = []
-    headers = {"Cache-Control": "no-cache, must-revalidate"}
-
-    if top:
-        headers["x-ms-max-item-count"] = str(top)
-
-    result = query_method(*query_args, custom_headers=headers, raw=True)
-    token = result.response.headers.get("x-ms-continuation")
-
-    payload.extend(result.response.json())
-    while token:
-        # In case requested count is > service max page size
-        if top:
-            pl = len(payload)
-            if pl < top:
-                page = top - pl
-                headers["x-ms-max-item-count"] = str(page)
-            else:
-                break
+    for page in _iter_query_pages(query_args, query_method, top, prefetch, adaptive_page_size):
+        payload.extend(page)
+    return payload
+
+
+def _iter_query_pages(query_args, query_method, top=None, prefetch=0, adaptive_page_size=False):
+    """
+    Yields the pages of a query result as they are received, following x-ms-continuation
+    tokens until the result is exhausted or top records have been yielded.
+
+    Without top, up to prefetch pages are requested on a background thread ahead of the
+    page being decoded and processed, and with adaptive_page_size the page size is tuned by
+    QueryPageSizer. Both are opted into by IoT Hub queries only. With top the size of each
+    page requested depends on the records received so far, so pages are requested one by one.
+
+    The records, pages and bytes received are logged once the iteration ends.
+    """
+    stats = {"records": 0, "pages": 0, "bytes": 0}
+    try:
+        if not top:
+            sizer = QueryPageSizer() if adaptive_page_size else None
+            responses = _iter_query_responses(query_args, query_method, stats, sizer)
+            if prefetch > 0:
+                responses = _prefetch(responses, prefetch)
+            for response in responses:
+                page = response.json()
+                stats["records"] += len(page)
+                yield page
+            return
+
+        headers = dict(QUERY_HEADERS)
+        while True:
+            # In case requested count is > service max page size
+            headers["x-ms-max-item-count"] = str(top - stats["records"])
+
+            response = query_method(*query_args, custom_headers=headers, raw=True).response
+            token = response.headers.get("x-ms-continuation")
+            stats["pages"] += 1
+            stats["bytes"] += len(response.content)
+            page = response.json()[: top - stats["records"]]
+            stats["records"] += len(page)
+            yield page
+
+            if not token or stats["records"] >= top:
+                return
+            headers["x-ms-continuation"] = token
+    finally:
+        logger.info(
+            "Query returned %s records in %s pages (%s bytes).",
+            stats["records"],
+            stats["pages"],
+            stats["bytes"],
+        )
+
+
+def _iter_query_responses(query_args, query_method, stats=None, sizer=None):
+    # requests the next page as soon as the headers of a page are received
+    headers = dict(QUERY_HEADERS)
+    while True:
+        start = time.monotonic()
+        response = query_method(*query_args, custom_headers=headers, raw=True).response
+        token = response.headers.get("x-ms-continuation")
+        size = len(response.content)
+        if sizer:
+            sizer.observe(time.monotonic() - start, size)
+        if stats is not None:
+            stats["pages"] += 1
+            stats["bytes"] += size
+        yield response
+
+        if not token:
+            return
         headers["x-ms-continuation"] = token
-        result = query_method(*query_args, custom_headers=headers, raw=True)
-        token = result.response.headers.get("x-ms-continuation")
-        payload.extend(result.response.json())
-    return payload[:top] if top else payload
+        if sizer:
+            headers["x-ms-max-item-count"] = str(sizer.page_size)
+
+
+class QueryPageSizer:
+    """
+    Picks the page size of the next query request from the latency and payload size of
+    the pages received so far.
+
+    Starts at the service default page size. The page size doubles, up to max_page_size,
+    while pages arrive within half of target_latency and below half of max_bytes, and is
+    halved when a page exceeds either limit.
+    """
+
+    def __init__(
+        self,
+        page_size: int = QUERY_DEFAULT_PAGE_SIZE,
+        max_page_size: int = QUERY_MAX_PAGE_SIZE,
+        target_latency: float = QUERY_PAGE_TARGET_LATENCY_SEC,
+        max_bytes: int = QUERY_PAGE_MAX_BYTES,
+    ):
+        self.page_size = page_size
+        self._max_page_size = max_page_size
+        self._target_latency = target_latency
+        self._max_bytes = max_bytes
+
+    def observe(self, latency: float, size: int) -> int:
+        """Records the latency (seconds) and size (bytes) of a page, returns the next page size."""
+        if latency > self._target_latency or size > self._max_bytes:
+            self.page_size = max(self.page_size // 2, 1)
+        elif latency * 2 <= self._target_latency and size * 2 <= self._max_bytes:
+            self.page_size = min(self.page_size * 2, self._max_page_size)
+        return self.page_size
+
+
+_PREFETCH_DONE = object()
+
+
+def _prefetch(iterable, depth: int):
+    """
+    Iterates iterable on a background thread, at most depth items ahead of the consumer.
+    Items are yielded in order. Errors raised by iterable are raised to the consumer.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def _put(entry):
+        return _put_until_stopped(items, entry, stop)
+
+    def _produce():
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            _put((None, e))
+            return
+        _put((_PREFETCH_DONE, None))
+
+    threading.Thread(target=_produce, daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if error:
+                raise error
+            if item is _PREFETCH_DONE:
+                return
+            yield item
+    finally:
+        # stops the producer when the consumer stops early
+        stop.set()
+
+
+def _put_until_stopped(items: queue.Queue, entry, stop: threading.Event) -> bool:
+    # blocks while items is full, gives up once stop is set
+    while not stop.is_set():
+        try:
+            items.put(entry, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _iter_parallel_query_pages(slice_query_args, query_method, top=None):
+    """
+    Runs one query per entry of slice_query_args concurrently and yields their pages as
+    they are received, in no particular order.
+
+    The slices are expected to partition one query (see _build_query_slices in
+    operations.hub). Records repeated across slices are yielded once, by deviceId and
+    moduleId. Throttled (429) requests are retried by the data-plane rate governor
+    (see common.rate_governor), which pauses every slice. With top, each slice is
+    capped at top and the iteration stops once top records have been yielded.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    items = queue.Queue(maxsize=2 * len(slice_query_args))
+    stop = threading.Event()
+
+    def _put(entry):
+        return _put_until_stopped(items, entry, stop)
+
+    def _scan(query_args):
+        try:
+            for page in _iter_query_pages(query_args, query_method, top, adaptive_page_size=True):
+                if not _put((page, None)):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            _put((None, e))
+            return
+        _put((_PREFETCH_DONE, None))
+
+    executor = ThreadPoolExecutor(max_workers=len(slice_query_args))
+    for query_args in slice_query_args:
+        executor.submit(_scan, query_args)
+
+    seen = set()
+    count = 0
+    remaining = len(slice_query_args)
+    try:
+        while remaining:
+            page, error = items.get()
+            if error:
+                raise error
+            if page is _PREFETCH_DONE:
+                remaining -= 1
+                continue
+
+            page = [record for record in page if _is_first_seen(record, seen)]
+            if top:
+                page = page[: top - count]
+            count += len(page)
+            if page:
+                yield page
+            if top and count >= top:
+                return
+    finally:
+        # stops the slices when the consumer stops early or a slice failed, and waits for
+        # their in-flight requests so that none is sent after the query returned
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+def _is_first_seen(record, seen: set) -> bool:
+    if not isinstance(record, dict) or "deviceId" not in record:
+        # projections without deviceId can not be told apart
+        return True
+    key = (record["deviceId"], record.get("moduleId"))
+    if key in seen:
+        return False
+    seen.add(key)
+    return True
+
+
+def _stream_query(
+    query_args, query_method, top=None, stream=None, prefetch=0, adaptive_page_size=False
+) -> int:
+    """
+    Writes the records of a query result to stream (stdout by default) as NDJSON, one page
+    at a time, so memory use does not grow with the result size. Returns the record count.
+    """
+    return _write_query_pages(
+        _iter_query_pages(query_args, query_method, top, prefetch, adaptive_page_size), stream
+    )
+
+
+def _write_query_pages(pages, stream=None) -> int:
+    stream = stream or sys.stdout
+    count = 0
+    for page in pages:
+        if page:
+            stream.write("".join(compact_json_dumps(record) + "\n" for record in page))
+            stream.flush()
+        count += len(page)
+    return count
 
 
 def _process_top(top, upper_limit=None):
@@ -15,6 +15,9 @@ from azext_iot.constants import (
     TRACING_ALLOWED_FOR_LOCATION,
     TRACING_ALLOWED_FOR_SKU,
     IOTHUB_TRACK_2_SDK_MIN_VERSION,
+    EVENT_MONITOR_PREFETCH,
+    QUERY_MAX_PARALLEL,
+    QUERY_PREFETCH_PAGES,
 )
 from azext_iot.common.sas_token_auth import SasTokenAuthentication
 from azext_iot.common.shared import (
@@ -28,7 +31,8 @@ from azext_iot.common.shared import (
     IoTHubStateType,
     DeviceAuthApiType,
     ConnectionStringParser,
-    EntityStatusType
+    EntityStatusType,
+    MonitorOverflowType,
 )
 from azext_iot.iothub.providers.discovery import IotHubDiscovery
 from azext_iot.common.utility import (
@@ -41,12 +45,35 @@ from azext_iot.common.utility import (
     generate_key,
 )
 from azext_iot._factory import SdkResolver, CloudError
-from azext_iot.operations.generic import _execute_query, _process_top
+from azext_iot.operations.generic import (
+    _execute_query,
+    _iter_parallel_query_pages,
+    _process_top,
+    _stream_query,
+    _write_query_pages,
+)
 import pprint
+import re
+import string
 
 logger = get_logger(__name__)
 printer = pprint.PrettyPrinter(indent=2)
 
+# property paths allowed in a query projection, e.g. properties.reported.$metadata
+QUERY_FIELD_PATTERN = re.compile(r"^[A-Za-z_$][\w$]*(\.[A-Za-z_$][\w$]*)*$")
+# queries --parallel can split by deviceId range
+QUERY_SLICEABLE_PATTERN = re.compile(
+    r"^\s*select\s+(?P<select>.+?)\s+from\s+(?P<source>devices(\.modules)?)"
+    r"(\s+where\s+(?P<where>.+?))?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+# aggregation, ordering and top apply to the whole result and can not be split into slices
+QUERY_UNSLICEABLE_PATTERN = re.compile(
+    r"\b(count|avg|sum|min|max)\s*\(|\b(group|order)\s+by\b|^\s*select\s+top\b",
+    re.IGNORECASE,
+)
+QUERY_SLICE_CHARS = string.digits + string.ascii_uppercase + string.ascii_lowercase
+
 
 # Query
 
@@ -58,8 +85,11 @@ def iot_query(
     resource_group_name=None,
     login=None,
     auth_type_dataplane=None,
+    stream=False,
+    parallel=None,
 ):
     top = _process_top(top)
+    slices = _build_query_slices(query_command, parallel) if parallel is not None else None
     discovery = IotHubDiscovery(cmd)
     target = discovery.get_target(
         resource_name=hub_name,
@@ -67,6 +97,12 @@ def iot_query(
         login=login,
         auth_type=auth_type_dataplane,
     )
+    if slices:
+        return _iot_parallel_query(target=target, slices=slices, top=top, stream=stream)
+    return _iot_query(target=target, query_command=query_command, top=top, stream=stream)
+
+
+def _iot_query(target, query_command, top=None, stream=False):
     resolver = SdkResolver(target=target)
     service_sdk = resolver.get_sdk(SdkType.service_sdk)
 
@@ -74,11 +110,75 @@ def iot_query(
         query_args = [query_command]
         query_method = service_sdk.query.get_twins
 
-        return _execute_query(query_args, query_method, top)
+        if stream:
+            # records are written as they arrive, nothing is returned for output
+            _stream_query(
+                query_args, query_method, top, prefetch=QUERY_PREFETCH_PAGES, adaptive_page_size=True
+            )
+            return None
+        return _execute_query(
+            query_args, query_method, top, prefetch=QUERY_PREFETCH_PAGES, adaptive_page_size=True
+        )
+    except CloudError as e:
+        raise CLIError(unpack_msrest_error(e))
+
+
+def _iot_parallel_query(target, slices, top=None, stream=False):
+    resolver = SdkResolver(target=target)
+    service_sdk = resolver.get_sdk(SdkType.service_sdk)
+
+    try:
+        pages = _iter_parallel_query_pages(
+            [[query] for query in slices], service_sdk.query.get_twins, top
+        )
+        if stream:
+            _write_query_pages(pages)
+            return None
+        return [record for page in pages for record in page]
     except CloudError as e:
         raise CLIError(unpack_msrest_error(e))
 
 
+def _build_query_slices(query_command, parallel):
+    """
+    Splits a devices (or devices.modules) query into parallel queries over disjoint
+    deviceId ranges, which together cover every deviceId.
+    """
+    if parallel < 1 or parallel > QUERY_MAX_PARALLEL:
+        raise CLIError("--parallel must be between 1 and {}.".format(QUERY_MAX_PARALLEL))
+    if parallel == 1:
+        return [query_command]
+
+    match = QUERY_SLICEABLE_PATTERN.match(query_command)
+    if not match or QUERY_UNSLICEABLE_PATTERN.search(query_command):
+        raise CLIError(
+            "--parallel supports queries of the form 'select ... from devices [where ...]' "
+            "or 'select ... from devices.modules [where ...]' without aggregation, "
+            "group by, order by or top."
+        )
+
+    # range bounds spread over the characters device ids usually start with,
+    # the first and last ranges are open so ids starting with other characters are included
+    bounds = [
+        QUERY_SLICE_CHARS[len(QUERY_SLICE_CHARS) * i // parallel] for i in range(1, parallel)
+    ]
+    predicates = ["deviceId < '{}'".format(bounds[0])]
+    predicates.extend(
+        "deviceId >= '{}' and deviceId < '{}'".format(lower, upper)
+        for lower, upper in zip(bounds, bounds[1:])
+    )
+    predicates.append("deviceId >= '{}'".format(bounds[-1]))
+
+    query = "select {} from {}".format(match.group("select"), match.group("source"))
+    where = match.group("where")
+    return [
+        "{} where ({}) and {}".format(query, where, predicate)
+        if where
+        else "{} where {}".format(query, predicate)
+        for predicate in predicates
+    ]
+
+
 # Device
 
 
@@ -122,12 +222,12 @@ def iot_device_list(
     resource_group_name=None,
     login=None,
     auth_type_dataplane=None,
+    stream=False,
+    fields=None,
 ):
-    query = (
-        "select * from devices where capabilities.iotEdge = true"
-        if edge_enabled
-        else "select * from devices"
-    )
+    query = "select {} from devices".format(_build_query_projection(fields))
+    if edge_enabled:
+        query += " where capabilities.iotEdge = true"
     result = iot_query(
         cmd=cmd,
         query_command=query,
@@ -136,13 +236,27 @@ def iot_device_list(
         resource_group_name=resource_group_name,
         login=login,
         auth_type_dataplane=auth_type_dataplane,
+        stream=stream,
     )
 
-    if not result:
+    if not result and not stream:
         logger.info('No registered devices found on hub "%s".', hub_name)
     return result
 
 
+def _build_query_projection(fields=None):
+    if not fields:
+        return "*"
+
+    for field in fields:
+        if not QUERY_FIELD_PATTERN.match(field):
+            raise CLIError(
+                "Invalid field '{}'. Fields are twin property paths such as "
+                "'deviceId' or 'properties.reported.firmware'.".format(field)
+            )
+    return ", ".join(fields)
+
+
 def iot_device_create(
     cmd,
     device_id,
@@ -2940,6 +3054,13 @@ def iot_hub_monitor_events(
     login=None,
     content_type=None,
     device_query=None,
+    compact=False,
+    prefetch=EVENT_MONITOR_PREFETCH,
+    workers=1,
+    checkpoint=False,
+    queue_size=None,
+    overflow=MonitorOverflowType.block.value,
+    stats=False,
 ):
     try:
         _iot_hub_monitor_events(
@@ -2958,6 +3079,13 @@ def iot_hub_monitor_events(
             login=login,
             content_type=content_type,
             device_query=device_query,
+            compact=compact,
+            prefetch=prefetch,
+            workers=workers,
+            checkpoint=checkpoint,
+            queue_size=queue_size,
+            overflow=overflow,
+            stats=stats,
         )
     except RuntimeError as e:
         raise CLIError(e)
@@ -3033,20 +3161,27 @@ def _iot_hub_monitor_events(
     login=None,
     content_type=None,
     device_query=None,
-):
+    compact=False,
+    prefetch=EVENT_MONITOR_PREFETCH,
+    workers=1,
+    checkpoint=False,
+    queue_size=None,
+    overflow=MonitorOverflowType.block.value,
+    stats=False,
+):
+    if prefetch < 1:
+        raise CLIError("Monitoring prefetch must be 1 or greater.")
+    if workers < 0:
+        raise CLIError("Monitoring workers must be 0 (CPU count) or greater.")
+    if queue_size is not None and queue_size < 1:
+        raise CLIError("Monitoring queue size must be 1 or greater.")
+    if stats and workers != 1:
+        raise CLIError("Monitoring statistics are not supported with multiple workers.")
+
     (enqueued_time, properties, timeout, output) = init_monitoring(
         cmd, timeout, properties, enqueued_time, repair, yes
     )
 
-    device_ids = {}
-    if device_query:
-        devices_result = iot_query(
-            cmd, device_query, hub_name, None, resource_group_name, login=login
-        )
-        if devices_result:
-            for device_result in devices_result:
-                device_ids[device_result["deviceId"]] = True
-
     discovery = IotHubDiscovery(cmd)
     target = discovery.get_target(
         resource_name=hub_name,
@@ -3055,16 +3190,36 @@ def _iot_hub_monitor_events(
         login=login,
     )
 
+    device_ids = {}
+    if device_query:
+        devices_result = _iot_query(target=target, query_command=device_query)
+        if devices_result:
+            for device_result in devices_result:
+                device_ids[device_result["deviceId"]] = True
+
     from azext_iot.monitor.builders import hub_target_builder
-    from azext_iot.monitor.handlers import CommonHandler
-    from azext_iot.monitor.telemetry import start_single_monitor
+    from azext_iot.monitor.builders.target_cache import (
+        EventTargetCache,
+        get_default_target_cache_path,
+    )
+    from azext_iot.monitor.checkpoint import CheckpointStore, get_default_checkpoint_path
+    from azext_iot.monitor.handlers import CommonHandler, StatsHandler
+    from azext_iot.monitor.telemetry import (
+        is_stale_target_error,
+        start_single_monitor,
+        start_partitioned_monitors,
+    )
     from azext_iot.monitor.utility import generate_on_start_string
     from azext_iot.monitor.models.arguments import (
         CommonParserArguments,
         CommonHandlerArguments,
     )
 
-    target = hub_target_builder.EventTargetBuilder().build_iot_hub_target(target)
+    builder = hub_target_builder.EventTargetBuilder(
+        cache=EventTargetCache(get_default_target_cache_path(cmd))
+    )
+    hub_target = target
+    target = builder.build_iot_hub_target(hub_target)
     target.add_consumer_group(consumer_group)
 
     on_start_string = generate_on_start_string(device_id=device_id)
@@ -3079,17 +3234,54 @@ def _iot_hub_monitor_events(
         device_id=device_id,
         interface_name=interface_name,
         module_id=module_id,
+        compact=compact,
     )
 
-    handler = CommonHandler(handler_args)
+    checkpoint_store = None
+    if checkpoint:
+        checkpoint_store = CheckpointStore(get_default_checkpoint_path(cmd))
 
-    start_single_monitor(
-        target=target,
-        enqueued_time_utc=enqueued_time,
-        on_start_string=on_start_string,
-        on_message_received=handler.parse_message,
-        timeout=timeout,
-    )
+    try:
+        if workers != 1:
+            from functools import partial
+
+            start_partitioned_monitors(
+                target=target,
+                auth_factory=builder.build_auth_factory(hub_target),
+                handler_factory=partial(CommonHandler, handler_args),
+                enqueued_time_utc=enqueued_time,
+                on_start_string=on_start_string,
+                timeout=timeout,
+                prefetch=prefetch,
+                workers=workers,
+                checkpoint_store=checkpoint_store,
+                queue_size=queue_size,
+                overflow=overflow,
+            )
+            return
+
+        handler = StatsHandler(handler_args) if stats else CommonHandler(handler_args)
+
+        try:
+            start_single_monitor(
+                target=target,
+                enqueued_time_utc=enqueued_time,
+                on_start_string=on_start_string,
+                on_messages_received=handler.parse_messages,
+                timeout=timeout,
+                prefetch=prefetch,
+                checkpoint_store=checkpoint_store,
+                queue_size=queue_size,
+                overflow=overflow,
+            )
+        finally:
+            handler.close()
+    except Exception as e:
+        # the cached events endpoint is stale once the receiver is redirected, e.g. after a
+        # failover, or its authorization is rejected. Other errors leave the cache as is.
+        if builder.from_cache and is_stale_target_error(e):
+            builder.invalidate_cached_target(hub_target)
+        raise
 
 
 def iot_hub_distributed_tracing_update(
@@ -17,6 +17,8 @@ from azext_iot.central.providers import (
     CentralExportProvider,
 )
 from azext_iot.central.models.enum import ApiVersion
+import asyncio
+import itertools
 import pytest
 import json
 import responses
@@ -28,9 +30,16 @@ from azure.cli.core.mock import DummyCli
 from azext_iot.central import commands_device
 from azext_iot.central import commands_monitor
 from azext_iot.central.providers import CentralDeviceProvider
+from azext_iot.central.providers.provider_cache import ProviderCache
+from azext_iot.central.providers.template_store import DeviceTemplateStore
 from azext_iot.central.models.devicetwin import DeviceTwin
-from azext_iot.monitor.property import PropertyMonitor
+from azext_iot.monitor.property import (
+    PropertyChangeReporter,
+    PropertyMonitor,
+    PropertyPollScheduler,
+)
 from azext_iot.monitor.models.enum import Severity
+from azext_iot.monitor.utility import get_loop
 from azext_iot.tests.helpers import load_json
 from azext_iot.tests.test_constants import FileNames
 from azext_iot.constants import PNP_DTDLV2_COMPONENT_MARKER
@@ -43,6 +52,7 @@ from azext_iot.central.models.v1_1_preview import (
 )
 from azext_iot.central.models.v1 import RoleV1, TemplateV1, UserV1
 from azext_iot.central.services._utility import get_object
+from azure.cli.core.azclierror import ResourceNotFoundError
 
 device_id = "mydevice"
 app_id = "myapp"
@@ -283,6 +293,161 @@ class TestCentralDeviceProvider:
         twin = provider.get_device_twin("someDeviceId")
         assert twin == self._device_twin
 
+    @mock.patch("azext_iot.central.services.device")
+    def test_should_cache_device_not_found(self, mock_device_svc):
+        provider = CentralDeviceProvider(
+            cmd=None, app_id=app_id, api_version=ApiVersion.v1.value
+        )
+        mock_device_svc.get_device.side_effect = ResourceNotFoundError(
+            {"code": "NotFound"}
+        )
+
+        for _ in range(3):
+            with pytest.raises(CLIError):
+                provider.get_device("unknownDeviceId")
+
+        # not found is remembered, only the first lookup calls the service
+        assert mock_device_svc.get_device.call_count == 1
+        stats = provider.get_cache_stats()["devices"]
+        assert stats["misses"] == 1
+        assert stats["negativeHits"] == 2
+
+
+class TestProviderCache:
+    @pytest.fixture
+    def clock(self):
+        with mock.patch(
+            "azext_iot.central.providers.provider_cache.time"
+        ) as mock_time:
+            mock_time.monotonic.return_value = 0
+            yield mock_time
+
+    def test_get_or_fetch(self, clock):
+        cache = ProviderCache()
+        fetch = mock.MagicMock(return_value="value")
+
+        assert cache.get_or_fetch("key", fetch) == "value"
+        assert cache.get_or_fetch("key", fetch) == "value"
+
+        assert fetch.call_count == 1
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["misses"] == 1
+
+    def test_lru_eviction(self, clock):
+        cache = ProviderCache(max_entries=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        # touch a, b becomes least recently used
+        assert cache.get("a") == 1
+        cache["c"] = 3
+
+        assert "b" not in cache
+        assert cache.values() == [1, 3]
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiry(self, clock):
+        cache = ProviderCache(ttl=10)
+        cache["a"] = 1
+
+        clock.monotonic.return_value = 9
+        assert cache.get("a") == 1
+
+        clock.monotonic.return_value = 10
+        assert cache.get("a") is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_pinned_entries(self, clock):
+        cache = ProviderCache(max_entries=None, ttl=None)
+        cache.update({key: key for key in range(3)})
+
+        clock.monotonic.return_value = 10 ** 6
+        assert cache.values() == [0, 1, 2]
+        stats = cache.get_stats()
+        assert stats["evictions"] == 0
+        assert stats["expirations"] == 0
+
+    def test_negative_ttl(self, clock):
+        cache = ProviderCache(negative_ttl=5)
+        fetch = mock.MagicMock(side_effect=ResourceNotFoundError("not found"))
+
+        for _ in range(2):
+            with pytest.raises(ResourceNotFoundError):
+                cache.get_or_fetch("key", fetch)
+        assert fetch.call_count == 1
+
+        clock.monotonic.return_value = 5
+        fetch.side_effect = None
+        fetch.return_value = "value"
+        assert cache.get_or_fetch("key", fetch) == "value"
+        assert fetch.call_count == 2
+
+    def test_other_errors_are_not_cached(self, clock):
+        cache = ProviderCache()
+        fetch = mock.MagicMock(side_effect=CLIError("throttled"))
+
+        for _ in range(2):
+            with pytest.raises(CLIError):
+                cache.get_or_fetch("key", fetch)
+        assert fetch.call_count == 2
+
+
+class TestDeviceTemplateStore:
+    _device_template = load_json(FileNames.central_device_template_file)
+
+    def _get_template(self, etag):
+        template = TemplateV1(deepcopy(self._device_template))
+        template.etag = etag
+        return template
+
+    def test_round_trip(self, tmp_path):
+        store = DeviceTemplateStore(str(tmp_path))
+        template = self._get_template("etag-1")
+
+        assert store.get(app_id, "azureiotcentral.com", "1.0", template.id) is None
+        store.set(app_id, "azureiotcentral.com", "1.0", template)
+
+        etag, stored = DeviceTemplateStore(str(tmp_path)).get(
+            app_id, "azureiotcentral.com", "1.0", template.id
+        )
+        assert etag == "etag-1"
+        assert stored.raw_template == template.raw_template
+        assert stored.etag == "etag-1"
+        assert stored.get_validator("Bool")(True)
+        # entries are plain JSON, the template is parsed again on load
+        (entry_file,) = tmp_path.iterdir()
+        with open(str(entry_file)) as f:
+            assert json.load(f)["template"] == template.raw_template
+        assert store.get("otherapp", "azureiotcentral.com", "1.0", template.id) is None
+
+        store.invalidate(app_id, "azureiotcentral.com", "1.0", template.id)
+        assert store.get(app_id, "azureiotcentral.com", "1.0", template.id) is None
+
+    @mock.patch("azext_iot.central.services.device_template")
+    def test_provider_revalidates_stored_template(self, mock_device_template_svc, tmp_path):
+        store = DeviceTemplateStore(str(tmp_path))
+        template = self._get_template("etag-1")
+        mock_device_template_svc.get_device_template.return_value = template
+
+        def get_device_template():
+            # every command creates its own provider
+            provider = CentralDeviceTemplateProvider(
+                cmd=None, app_id=app_id, api_version=ApiVersion.v1.value, template_store=store
+            )
+            return provider.get_device_template(template.id)
+
+        assert get_device_template() == template
+
+        # not modified
+        mock_device_template_svc.get_device_template.return_value = None
+        stored = get_device_template()
+        assert stored.raw_template == template.raw_template
+
+        etags = [
+            call.kwargs["etag"]
+            for call in mock_device_template_svc.get_device_template.call_args_list
+        ]
+        assert etags == [None, "etag-1"]
+
 
 class TestCentralDeviceGroupProvider:
     _device_groups = [
@@ -755,6 +920,96 @@ class TestCentralPropertyMonitor:
         FileNames.central_property_validation_template_file
     )
 
+    @mock.patch("azext_iot.monitor.property.time")
+    @mock.patch("azext_iot.central.services.device_template")
+    @mock.patch("azext_iot.central.services.device")
+    def test_adaptive_conditional_polling(
+        self, mock_device_svc, mock_device_template_svc, mock_time
+    ):
+        raw_twin = json.loads(
+            json.dumps(self._device_twin).replace("current_time", datetime.now().isoformat())
+        )
+        twin = DeviceTwin(deepcopy(raw_twin))
+        twin.etag = "etag-1"
+        twin_next = DeviceTwin(deepcopy(raw_twin))
+        twin_next.reported_property.version = twin.reported_property.version + 1
+
+        # unchanged (304) twice, then a new version, then unchanged
+        mock_device_svc.get_device_twin.side_effect = [twin, None, None, twin_next, None]
+        mock_time.time.return_value = 0
+        intervals = []
+
+        def sleep(interval):
+            intervals.append(interval)
+            if len(intervals) == 5:
+                raise KeyboardInterrupt
+
+        mock_time.sleep.side_effect = sleep
+        monitor = PropertyMonitor(
+            cmd=None,
+            app_id=app_id,
+            device_id=device_id,
+            token=None,
+            central_dns_suffix=None,
+        )
+
+        with pytest.raises(KeyboardInterrupt):
+            monitor.start_property_monitor()
+
+        etags = [
+            call.kwargs["etag"] for call in mock_device_svc.get_device_twin.call_args_list
+        ]
+        assert etags == [None, "etag-1", "etag-1", "etag-1", twin_next.etag]
+        assert intervals == [10, 20, 40, 10, 20]
+
+    def test_poll_scheduler(self):
+        changes = []
+        sessions = set()
+        monitors = []
+        for name in ["d1", "d2"]:
+            monitor = mock.MagicMock(device_id=name, poll_interval=0)
+            monitor.poll_twin_change.side_effect = itertools.chain(
+                [None, ("prev", name, 1.0)], itertools.repeat(None)
+            )
+            monitors.append(monitor)
+
+        def on_twin_change(monitor, prev_twin, twin, window_sec):
+            changes.append(twin)
+            if len(changes) == 2:
+                raise KeyboardInterrupt
+
+        scheduler = PropertyPollScheduler(monitors, on_twin_change, max_concurrency=1)
+        with pytest.raises(KeyboardInterrupt):
+            scheduler.run()
+
+        assert sorted(changes) == ["d1", "d2"]
+        # polls still sleeping are cancelled
+        assert all(task.done() for task in asyncio.all_tasks(get_loop()))
+        for monitor in monitors:
+            for call in monitor.poll_twin_change.call_args_list:
+                sessions.add(call.args[0])
+        # all twin requests share one HTTP session
+        assert len(sessions) == 1
+
+    @mock.patch("azext_iot.central.services.device")
+    def test_list_device_ids(self, mock_device_svc):
+        devices = [
+            mock.MagicMock(id="sensor-1", template="t1"),
+            mock.MagicMock(id="sensor-2", template="t2"),
+            mock.MagicMock(id="gateway-1", template="t1"),
+        ]
+        mock_device_svc.list_devices.return_value = devices
+        reporter = PropertyChangeReporter(cmd=None, app_id=app_id, token=None)
+
+        assert reporter.list_device_ids(device_id_pattern="sensor-*") == [
+            "sensor-1",
+            "sensor-2",
+        ]
+        assert reporter.list_device_ids(template="t1") == ["sensor-1", "gateway-1"]
+        assert reporter.list_device_ids(device_id_pattern="sensor-*", template="t1") == [
+            "sensor-1"
+        ]
+
     @mock.patch("azext_iot.central.services.device_template")
     @mock.patch("azext_iot.central.services.device")
     def test_should_return_updated_properties(
@@ -817,6 +1072,45 @@ class TestCentralPropertyMonitor:
         )
         assert result is None
 
+    @mock.patch("azext_iot.central.services.device_template")
+    @mock.patch("azext_iot.central.services.device")
+    def test_should_diff_properties_by_update_metadata(
+        self, mock_device_svc, mock_device_template_svc
+    ):
+        # timestamps far outside the monitoring window, changes come from metadata diffs
+        raw_twin = json.loads(
+            json.dumps(self._device_twin).replace("current_time", "2020-01-01T00:00:00Z")
+        )
+        twin = DeviceTwin(deepcopy(raw_twin))
+        raw_twin["properties"]["reported"]["$version"] += 1
+        device_info = raw_twin["properties"]["reported"]["device_info"]
+        device_info["swVersion"] = "10"
+        metadata = raw_twin["properties"]["reported"]["$metadata"]["device_info"]
+        metadata["$lastUpdated"] = metadata["swVersion"]["$lastUpdated"] = "2020-01-02T00:00:00Z"
+        twin_next = DeviceTwin(raw_twin)
+
+        mock_device_svc.get_device_twin.side_effect = [twin, twin_next]
+        monitor = PropertyMonitor(
+            cmd=None,
+            app_id=app_id,
+            device_id=device_id,
+            token=None,
+            central_dns_suffix=None,
+        )
+        assert monitor.poll_twin_change() is None
+        prev_twin, next_twin, window_sec = monitor.poll_twin_change()
+
+        result = monitor._compare_properties(
+            prev_twin.reported_property, next_twin.reported_property, window_sec
+        )
+        assert result == {"device_info": {"swVersion": "10"}}
+        assert (
+            monitor._compare_properties(
+                prev_twin.desired_property, next_twin.desired_property, window_sec
+            )
+            is None
+        )
+
     @mock.patch("azext_iot.central.services.device_template")
     @mock.patch("azext_iot.central.services.device")
     def test_validate_properties_declared_multiple_interfaces(
@@ -8,12 +8,25 @@ import pytest
 import collections
 
 from azext_iot.central.models.v1 import TemplateV1
-from azext_iot.monitor.central_validator import validate, extract_schema_type
+from azext_iot.monitor.central_validator import (
+    compile_validator,
+    extract_schema_type,
+    validate as validate_schema,
+)
 
 from azext_iot.tests.helpers import load_json
 from azext_iot.tests.test_constants import FileNames
 
 
+def _compile_and_validate(schema, value):
+    return compile_validator(schema)(value)
+
+
+@pytest.fixture(params=[validate_schema, _compile_and_validate], ids=["validate", "compiled"])
+def validate(request):
+    return request.param
+
+
 class TestTemplateValidations:
     def test_template_interface_list(self):
         expected_interface_list = [
@@ -43,6 +56,44 @@ class TestTemplateValidations:
             expected_component_list
         )
 
+    @pytest.mark.parametrize(
+        "template_file",
+        [
+            FileNames.central_property_validation_template_file,
+            FileNames.central_device_template_file,
+        ],
+    )
+    def test_schema_index_matches_scan(self, template_file):
+        def scan(entities, name, identifier):
+            if identifier:
+                return entities.get(identifier, {}).get(name)
+            for entry in entities.values():
+                if entry.get(name):
+                    return entry.get(name)
+
+        template = TemplateV1(load_json(template_file))
+        for is_component, entities in (
+            (False, template.interfaces),
+            (True, template.components),
+        ):
+            names = {name for entry in entities.values() for name in entry}
+            names.add("notInTemplate")
+            for name in names:
+                for identifier in [None, "notAnIdentifier"] + list(entities):
+                    assert template.get_schema(
+                        name, is_component=is_component, identifier=identifier
+                    ) == scan(entities, name, identifier)
+
+    def test_validators_are_cached(self):
+        template = TemplateV1(load_json(FileNames.central_device_template_file))
+
+        validator = template.get_validator("Object")
+
+        assert validator is template.get_validator("Object")
+        assert validator({"Double": 123})
+        assert not validator({"Double": "123"})
+        assert template.get_validator("notInTemplate") is None
+
 
 class TestExtractSchemaType:
     def test_extract_schema_type_component(self):
@@ -113,14 +164,14 @@ class TestPrimitiveValidations:
             (0, False),
         ],
     )
-    def test_boolean(self, value, expected_result):
+    def test_boolean(self, validate, value, expected_result):
         assert validate({"schema": "boolean"}, value) == expected_result
 
     @pytest.mark.parametrize(
         "value, expected_result",
         [(1, True), (-1, True), (1.1, True), ("1", False), ("1.1", False)],
     )
-    def test_double_float_long(self, value, expected_result):
+    def test_double_float_long(self, validate, value, expected_result):
         assert validate({"schema": "double"}, value) == expected_result
         assert validate({"schema": "float"}, value) == expected_result
         assert validate({"schema": "long"}, value) == expected_result
@@ -129,18 +180,18 @@ class TestPrimitiveValidations:
         "value, expected_result",
         [(1, True), (-1, True), (1.1, False), ("1", False), ("1.1", False)],
     )
-    def test_int(self, value, expected_result):
+    def test_int(self, validate, value, expected_result):
         assert validate({"schema": "integer"}, value) == expected_result
 
     @pytest.mark.parametrize(
         "value, expected_result",
         [("a", True), ("asd", True), (1, False), (True, False)],
     )
-    def test_str(self, value, expected_result):
+    def test_str(self, validate, value, expected_result):
         assert validate({"schema": "string"}, value) == expected_result
 
     # by convention we have stated that an empty payload is valid
-    def test_empty(self):
+    def test_empty(self, validate):
         assert validate(None, None)
 
 
@@ -153,7 +204,7 @@ class TestDateTimeValidations:
     @pytest.mark.parametrize(
         "to_validate", ["20200101", "20200101Z", "2020-01-01", "2020-01-01Z"]
     )
-    def test_is_iso8601_date_pass(self, to_validate):
+    def test_is_iso8601_date_pass(self, validate, to_validate):
         assert validate({"schema": "date"}, to_validate)
 
     @pytest.mark.parametrize(
@@ -168,17 +219,17 @@ class TestDateTimeValidations:
             "2020-01-01T00:00:00.00+08:30",
         ],
     )
-    def test_is_iso8601_datetime_pass(self, to_validate):
+    def test_is_iso8601_datetime_pass(self, validate, to_validate):
         assert validate({"schema": "dateTime"}, to_validate)
 
     @pytest.mark.parametrize("to_validate", ["P32DT7.592380349524318S", "P32DT7S"])
-    def test_is_iso8601_duration_pass(self, to_validate):
+    def test_is_iso8601_duration_pass(self, validate, to_validate):
         assert validate({"schema": "duration"}, to_validate)
 
     @pytest.mark.parametrize(
         "to_validate", ["00:00:00+08:30", "00:00:00Z", "00:00:00.123Z"]
     )
-    def test_is_iso8601_time_pass(self, to_validate):
+    def test_is_iso8601_time_pass(self, validate, to_validate):
         assert validate({"schema": "time"}, to_validate)
 
     # Failure suite
@@ -186,19 +237,19 @@ class TestDateTimeValidations:
         "to_validate",
         ["2020-13-35", *BAD_ARRAY],
     )
-    def test_is_iso8601_date_fail(self, to_validate):
+    def test_is_iso8601_date_fail(self, validate, to_validate):
         assert not validate({"schema": "date"}, to_validate)
 
     @pytest.mark.parametrize("to_validate", ["2020-13-35", "2020-00-00T", *BAD_ARRAY])
-    def test_is_iso8601_datetime_fail(self, to_validate):
+    def test_is_iso8601_datetime_fail(self, validate, to_validate):
         assert not validate({"schema": "dateTime"}, to_validate)
 
     @pytest.mark.parametrize("to_validate", ["2020-01", *BAD_ARRAY])
-    def test_is_iso8601_duration_fail(self, to_validate):
+    def test_is_iso8601_duration_fail(self, validate, to_validate):
         assert not validate({"schema": "duration"}, to_validate)
 
     @pytest.mark.parametrize("to_validate", [*BAD_ARRAY])
-    def test_is_iso8601_time_fail(self, to_validate):
+    def test_is_iso8601_time_fail(self, validate, to_validate):
         assert not validate({"schema": "time"}, to_validate)
 
 
@@ -217,7 +268,7 @@ class TestPredefinedComplexType:
             ({"x": 123.123, "y": 123.123, "z": 123.123}, False),
         ],
     )
-    def test_geopoint(self, value, expected_result):
+    def test_geopoint(self, validate, value, expected_result):
         assert validate({"schema": "geopoint"}, value) == expected_result
 
     @pytest.mark.parametrize(
@@ -234,7 +285,7 @@ class TestPredefinedComplexType:
             ({"y": 123.123, "z": 123.123}, False),
         ],
     )
-    def test_vector(self, value, expected_result):
+    def test_vector(self, validate, value, expected_result):
         assert validate({"schema": "vector"}, value) == expected_result
 
 
@@ -243,7 +294,7 @@ class TestComplexType:
         "value, expected_result",
         [(1, True), (2, True), (3, False), ("1", False), ("2", False)],
     )
-    def test_int_enum(self, value, expected_result):
+    def test_int_enum(self, validate, value, expected_result):
         template = TemplateV1(load_json(FileNames.central_device_template_file))
         schema = template.get_schema("IntEnum")
         assert validate(schema, value) == expected_result
@@ -252,7 +303,7 @@ class TestComplexType:
         "value, expected_result",
         [("A", True), ("B", True), ("C", False), (1, False), (2, False)],
     )
-    def test_str_enum(self, value, expected_result):
+    def test_str_enum(self, validate, value, expected_result):
         template = TemplateV1(load_json(FileNames.central_device_template_file))
         schema = template.get_schema("StringEnum")
         assert validate(schema, value) == expected_result
@@ -266,7 +317,7 @@ class TestComplexType:
             ({"asd": 123}, False),
         ],
     )
-    def test_object_simple(self, value, expected_result):
+    def test_object_simple(self, validate, value, expected_result):
         template = TemplateV1(load_json(FileNames.central_device_template_file))
         schema = template.get_schema("Object")
         assert validate(schema, value) == expected_result
@@ -300,7 +351,7 @@ class TestComplexType:
             ),
         ],
     )
-    def test_object_medium(self, value, expected_result):
+    def test_object_medium(self, validate, value, expected_result):
         template = TemplateV1(
             load_json(FileNames.central_deeply_nested_device_template_file)
         )
@@ -379,7 +430,7 @@ class TestComplexType:
             ),
         ],
     )
-    def test_object_deep(self, value, expected_result):
+    def test_object_deep(self, validate, value, expected_result):
         template = TemplateV1(
             load_json(FileNames.central_deeply_nested_device_template_file)
         )
@@ -622,7 +622,8 @@ class TestEnrollmentList():
         yield mocked_response
 
     @pytest.mark.parametrize("top", [3, None])
-    def test_enrollment_list(self, serviceclient, fixture_cmd, top):
+    def test_enrollment_list(self, serviceclient, fixture_cmd, mocker, top):
+        prefetch = mocker.patch("azext_iot.operations.generic._prefetch")
         result = subject.iot_dps_device_enrollment_list(
             cmd=fixture_cmd,
             dps_name=mock_target['entity'],
@@ -638,6 +639,33 @@ class TestEnrollmentList():
         assert "{}/enrollments/query?".format(mock_target['entity']) in url
         assert method == "POST"
         assert json.dumps(result)
+        # only IoT Hub queries prefetch pages
+        prefetch.assert_not_called()
+
+    def test_enrollment_list_page_size(self, mocked_response, fixture_gdcs, fixture_sas, fixture_cmd):
+        url = "https://{}/enrollments/query?".format(mock_target['entity'])
+        for headers in [{"x-ms-continuation": "token"}, {}]:
+            mocked_response.add(
+                method=responses.POST,
+                url=url,
+                body=json.dumps([generate_enrollment_show()]),
+                status=200,
+                content_type="application/json",
+                headers=headers,
+                match_querystring=False,
+            )
+
+        result = subject.iot_dps_device_enrollment_list(
+            cmd=fixture_cmd,
+            dps_name=mock_target['entity'],
+            resource_group_name=resource_group,
+        )
+
+        assert len(result) == 2
+        # the page size is only tuned for IoT Hub queries
+        for call in mocked_response.calls:
+            assert "x-ms-max-item-count" not in call.request.headers
+        assert mocked_response.calls[1].request.headers["x-ms-continuation"] == "token"
 
     def test_enrollment_list_error(self, fixture_cmd, serviceclient_generic_error):
         with pytest.raises(CLIError):
@@ -16,12 +16,14 @@ import json
 import os
 import responses
 import re
+import threading
 from azext_iot.operations import hub as subject
 from azext_iot.operations import _mqtt as mqtt_subject
 from azext_iot.common.utility import (
     validate_key_value_pairs,
     read_file_content,
 )
+from azext_iot.common.rate_governor import RateGovernor
 from azext_iot.common.sas_token_auth import SasTokenAuthentication
 from azext_iot.constants import TRACING_PROPERTY
 from azext_iot.tests.generators import create_req_monitor_events, generate_generic_id
@@ -696,6 +698,30 @@ class TestDeviceList:
         assert len(result) == service_client.expected_size
         assert headers["x-ms-max-item-count"] == str(top)
 
+    @pytest.mark.parametrize(
+        "fields, edge, expected",
+        [
+            (["deviceId"], False, "select deviceId from devices"),
+            (
+                ["deviceId", "properties.reported.$metadata"],
+                True,
+                "select deviceId, properties.reported.$metadata from devices "
+                "where capabilities.iotEdge = true",
+            ),
+        ],
+    )
+    def test_device_list_fields(self, fixture_cmd, service_client, fields, edge, expected):
+        subject.iot_device_list(
+            fixture_cmd, mock_target["entity"], edge_enabled=edge, fields=fields
+        )
+        body = json.loads(service_client.calls[0].request.body)
+        assert body["query"] == expected
+
+    @pytest.mark.parametrize("fields", [["deviceId from devices;"], ["status", "a..b"]])
+    def test_device_list_invalid_fields(self, fixture_cmd, fields):
+        with pytest.raises(CLIError):
+            subject.iot_device_list(fixture_cmd, mock_target["entity"], fields=fields)
+
     @pytest.mark.parametrize("top", [-2, 0])
     def test_device_list_invalid_args(self, fixture_cmd, top):
         with pytest.raises(CLIError):
@@ -1429,6 +1455,130 @@ class TestQuery:
         else:
             assert not headers.get("x-ms-max-item-count")
 
+    @pytest.mark.parametrize("top, expected_count", [(None, 6), (3, 3)])
+    def test_query_stream(self, serviceclient, capsys, top, expected_count):
+        # 3 pages of 2 records
+        servresult = [generate_device_twin_show(), generate_device_twin_show()]
+        continuation = [generate_generic_id(), generate_generic_id(), None]
+        serviceclient.return_value = build_mock_response(
+            status_code=200, payload=servresult, headers_get_side_effect=continuation
+        )
+
+        result = subject.iot_query(
+            None, hub_name=mock_target["entity"], query_command=generic_query, top=top, stream=True
+        )
+
+        assert result is None
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == expected_count
+        assert json.loads(lines[0]) == servresult[0]
+        # pages are requested until top records are written
+        assert serviceclient.call_count == (expected_count + 1) // 2
+
+    def test_query_prefetch_error(self, serviceclient, mocker):
+        servresult = [generate_device_twin_show()]
+        serviceclient.side_effect = [
+            build_mock_response(
+                status_code=200, payload=servresult, headers_get_side_effect=[generate_generic_id()]
+            ),
+            build_mock_response(mocker, 500, {"error": "something failed"}),
+        ]
+
+        # errors of prefetched pages are raised in order
+        with pytest.raises(CLIError):
+            subject.iot_query(None, hub_name=mock_target["entity"], query_command=generic_query)
+
+    @pytest.mark.parametrize("top, expected_count", [(None, 5), (3, 3)])
+    def test_query_parallel(self, serviceclient, top, expected_count):
+        def send(request, **kwargs):
+            # every slice also returns a device seen by the other slices
+            query = json.loads(request.body)["query"]
+            return build_mock_response(
+                payload=[{"deviceId": query}, {"deviceId": "shared"}], headers={}
+            )
+
+        serviceclient.side_effect = send
+        result = subject.iot_query(
+            None, hub_name=mock_target["entity"], query_command=generic_query, top=top, parallel=4
+        )
+
+        assert len(result) == expected_count
+        assert len({record["deviceId"] for record in result}) == expected_count
+        if not top:
+            queries = {
+                json.loads(args[0][0].body)["query"] for args in serviceclient.call_args_list
+            }
+            assert queries == set(subject._build_query_slices(generic_query, 4))
+
+    @pytest.mark.parametrize(
+        "query, expected",
+        [
+            (
+                "select * from devices",
+                [
+                    "select * from devices where deviceId < 'V'",
+                    "select * from devices where deviceId >= 'V'",
+                ],
+            ),
+            (
+                "SELECT deviceId FROM devices.modules WHERE status = 'enabled'",
+                [
+                    "select deviceId from devices.modules where (status = 'enabled') and deviceId < 'V'",
+                    "select deviceId from devices.modules where (status = 'enabled') and deviceId >= 'V'",
+                ],
+            ),
+        ],
+    )
+    def test_query_parallel_slices(self, query, expected):
+        assert subject._build_query_slices(query, 2) == expected
+        assert subject._build_query_slices(query, 1) == [query]
+
+    def test_query_parallel_throttled(self, mocker, fixture_ghcs, mocked_response):
+        # a fresh governor, the throttled request must not slow down other tests
+        governor = RateGovernor()
+        mocker.patch("azext_iot._factory.get_rate_governor", return_value=governor)
+        servresult = [generate_device_twin_show()]
+        statuses = [429]
+        lock = threading.Lock()
+
+        def reply(request):
+            # the first request of either slice is throttled
+            with lock:
+                if statuses:
+                    return (statuses.pop(), {"Retry-After": "0"}, json.dumps({"Message": "throttled"}))
+            return (200, {}, json.dumps(servresult))
+
+        mocked_response.add_callback(
+            method=responses.POST,
+            url="https://{}/devices/query".format(mock_target["entity"]),
+            callback=reply,
+            content_type="application/json",
+        )
+        result = subject.iot_query(
+            None, hub_name=mock_target["entity"], query_command=generic_query, parallel=2
+        )
+        # the throttled request is retried once by the rate governor
+        assert len(mocked_response.calls) == 3
+        assert result == servresult
+        assert governor.get_stats()["other"]["throttled"] == 1
+
+    @pytest.mark.parametrize(
+        "query, parallel",
+        [
+            (generic_query, 0),
+            (generic_query, 33),
+            ("select count() as total from devices", 2),
+            ("select status, count() from devices group by status", 2),
+            ("select * from devices where status = 'enabled' order by deviceId", 2),
+            ("SELECT * FROM devices ORDER BY lastActivityTime DESC", 2),
+            ("select top 10 * from devices", 2),
+            ("select * from devices.jobs", 2),
+        ],
+    )
+    def test_query_parallel_invalid_args(self, query, parallel):
+        with pytest.raises(CLIError):
+            subject.iot_query(None, mock_target["entity"], query, parallel=parallel)
+
     @pytest.mark.parametrize("top", [-2, 0])
     def test_query_invalid_args(self, top):
         with pytest.raises(CLIError):
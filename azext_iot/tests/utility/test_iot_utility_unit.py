@@ -4,10 +4,12 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import itertools
 import json
 import pytest
 import os
 import sys
+import time
 
 from unittest import mock
 from knack.util import CLIError
@@ -16,6 +18,7 @@ from azext_iot.common.utility import (
     validate_min_python_version,
     process_json_arg,
     read_file_content,
+    compact_json_dumps,
     logger,
     ensure_iothub_sdk_min_version,
     ensure_iotdps_sdk_min_version,
@@ -24,6 +27,7 @@ from azext_iot.common.deps import ensure_uamqp
 from azext_iot.constants import EVENT_LIB, EXTENSION_NAME
 from azext_iot._validators import mode2_iot_login_handler
 from azext_iot.common.embedded_cli import EmbeddedCLI
+from azext_iot.operations.generic import QueryPageSizer, _prefetch
 
 
 class TestMinPython(object):
@@ -276,6 +280,19 @@ class TestProcessJsonArg(object):
         assert mocked_util_logger.call_count == 0
 
 
+class TestCompactJsonDumps(object):
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ({"a": [1, "b"], "c": {"d": None}}, '{"a":[1,"b"],"c":{"d":null}}'),
+            # non-str keys are not supported by orjson
+            ({1: True}, '{"1":true}'),
+        ],
+    )
+    def test_compact_json_dumps(self, value, expected):
+        assert compact_json_dumps(value) == expected
+
+
 class TestVersionComparison(object):
     @pytest.mark.parametrize(
         "current, minimum, expected",
@@ -421,3 +438,57 @@ class TestCliInit(object):
         original_sys_path.insert(0, ext_path)
         assert set(original_sys_path) == set(modified_sys_path)
         assert modified_sys_path[0] == ext_path
+
+
+class TestQueryPrefetch(object):
+    def test_prefetch_order_and_depth(self):
+        produced = []
+
+        def produce():
+            for i in range(10):
+                produced.append(i)
+                yield i
+
+        pages = _prefetch(produce(), depth=2)
+        assert next(pages) == 0
+        # the producer blocks once depth items are waiting
+        time.sleep(0.2)
+        assert len(produced) <= 4
+        assert list(pages) == list(range(1, 10))
+
+    def test_prefetch_stops_producer(self):
+        produced = []
+
+        def produce():
+            for i in itertools.count():
+                produced.append(i)
+                yield i
+
+        pages = _prefetch(produce(), depth=1)
+        assert next(pages) == 0
+        pages.close()
+        time.sleep(0.3)
+        count = len(produced)
+        time.sleep(0.2)
+        assert len(produced) == count
+
+
+class TestQueryPageSizer(object):
+    def test_page_size_grows_to_max(self):
+        sizer = QueryPageSizer(page_size=100, max_page_size=1000, target_latency=1.0, max_bytes=1000)
+        sizes = [sizer.observe(latency=0.1, size=100) for _ in range(5)]
+        assert sizes == [200, 400, 800, 1000, 1000]
+
+    @pytest.mark.parametrize("latency, size", [(2.0, 100), (0.1, 2000)])
+    def test_page_size_shrinks(self, latency, size):
+        sizer = QueryPageSizer(page_size=400, max_page_size=1000, target_latency=1.0, max_bytes=1000)
+        assert sizer.observe(latency=latency, size=size) == 200
+
+    def test_page_size_holds_near_limits(self):
+        sizer = QueryPageSizer(page_size=400, max_page_size=1000, target_latency=1.0, max_bytes=1000)
+        assert sizer.observe(latency=0.8, size=100) == 400
+        assert sizer.observe(latency=0.1, size=800) == 400
+
+    def test_page_size_minimum(self):
+        sizer = QueryPageSizer(page_size=1, target_latency=1.0)
+        assert sizer.observe(latency=5.0, size=0) == 1
@@ -0,0 +1,613 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import io
+import json
+import pytest
+import threading
+import yaml
+
+from unittest.mock import ANY as mock_any
+
+from uamqp.message import Message, MessageProperties
+from azext_iot.monitor.handlers import central_handler, common_handler
+from azext_iot.monitor.handlers.common_handler import CommonHandler
+from azext_iot.monitor.handlers.property_handler import PropertyChangeHandler
+from azext_iot.monitor.handlers.stats_handler import StatsHandler
+from azext_iot.monitor.models.enum import Severity
+from azext_iot.monitor.models.arguments import (
+    CentralHandlerArguments,
+    CommonHandlerArguments,
+    CommonParserArguments,
+)
+from azext_iot.monitor.output import EventWriter
+from azext_iot.monitor.parsers import decoder
+from azext_iot.monitor.parsers.issue import CentralIssue, IssueAggregator
+from azext_iot.monitor.telemetry import PartitionBatch
+from azext_iot.monitor.template_resolver import DeviceTemplateResolver
+
+
+def _build_message(device_id=None, module_id=None, interface_name=None, payload=None):
+    annotations = {}
+    if device_id is not None:
+        annotations[decoder.DEVICE_ID_IDENTIFIER] = device_id.encode()
+    if module_id is not None:
+        annotations[decoder.MODULE_ID_IDENTIFIER] = module_id.encode()
+    if interface_name is not None:
+        annotations[decoder.INTERFACE_NAME_IDENTIFIER_V2] = interface_name.encode()
+
+    return Message(
+        body=json.dumps(payload or {"key": "value"}).encode(),
+        properties=MessageProperties(
+            content_encoding="utf-8", content_type="application/json"
+        ),
+        annotations=annotations,
+    )
+
+
+def _build_handler(**kwargs):
+    return CommonHandler(
+        CommonHandlerArguments(
+            output="json", common_parser_args=CommonParserArguments(), **kwargs
+        )
+    )
+
+
+class TestCommonHandlerFiltering:
+    @pytest.mark.parametrize(
+        "handler_kwargs, message_kwargs, expected",
+        [
+            ({}, {"device_id": "device"}, True),
+            ({}, {}, True),
+            ({"device_id": "device"}, {"device_id": "device"}, True),
+            ({"device_id": "device"}, {"device_id": "device2"}, False),
+            ({"device_id": "device"}, {}, False),
+            ({"device_id": "dev*"}, {"device_id": "device"}, True),
+            ({"device_id": "dev?ce"}, {"device_id": "device"}, True),
+            ({"device_id": "dev?"}, {"device_id": "device"}, False),
+            ({"devices": ["d1", "d2"]}, {"device_id": "d2"}, True),
+            ({"devices": ["d1", "d2"]}, {"device_id": "d3"}, False),
+            ({"module_id": "module"}, {"device_id": "d", "module_id": "module"}, True),
+            ({"module_id": "module"}, {"device_id": "d", "module_id": "other"}, False),
+            ({"module_id": "mod*"}, {"device_id": "d"}, False),
+            ({"interface_name": "dtmi:i;1"}, {"device_id": "d", "interface_name": "dtmi:i;1"}, True),
+            ({"interface_name": "dtmi:i;1"}, {"device_id": "d", "interface_name": "dtmi:i;2"}, False),
+        ],
+    )
+    def test_should_process_message(self, handler_kwargs, message_kwargs, expected):
+        handler = _build_handler(**handler_kwargs)
+        message = _build_message(**message_kwargs)
+
+        assert handler._should_process_message(message) == expected
+
+    def test_filtered_message_skips_parser(self, mocker, capsys):
+        parser = mocker.patch.object(common_handler, "CommonParser")
+        handler = _build_handler(device_id="device")
+
+        handler.parse_message(_build_message(device_id="other-device"))
+
+        assert not parser.called
+        assert capsys.readouterr().out == ""
+
+    def test_matched_message_is_output(self, capsys):
+        handler = _build_handler(device_id="device")
+        payload = {"temperature": 20}
+
+        handler.parse_message(_build_message(device_id="device", payload=payload))
+        handler.close()
+
+        result = json.loads(capsys.readouterr().out)
+        assert result["event"]["origin"] == "device"
+        assert result["event"]["payload"] == payload
+
+    def test_device_query_filter_accepts_dict(self):
+        # iot hub monitor-events passes --device-query results as a dict keyed by device id
+        devices = {"device-{}".format(i): True for i in range(10000)}
+        handler = _build_handler(devices=devices)
+
+        assert handler._should_process_message(_build_message(device_id="device-9999"))
+        assert not handler._should_process_message(_build_message(device_id="device-10000"))
+        assert not handler._should_process_message(_build_message())
+
+    @pytest.mark.parametrize(
+        "handler_kwargs, device_id, expected",
+        [
+            ({"device_id": "d1"}, "d1", True),
+            ({"device_id": "d1"}, "d2", False),
+            ({"device_id": "d*"}, "d1", True),
+            ({"devices": ["d1"]}, "d1", True),
+            ({"devices": ["d1"]}, "d2", False),
+        ],
+    )
+    def test_str_device_id_annotation(self, handler_kwargs, device_id, expected):
+        handler = _build_handler(**handler_kwargs)
+        message = Message(body=b"", annotations={decoder.DEVICE_ID_IDENTIFIER: device_id})
+
+        assert handler._should_process_message(message) == expected
+
+    def test_exact_filters_skip_decoding(self, mocker):
+        decode = mocker.patch.object(common_handler, "decode_identifier")
+        handler = _build_handler(device_id="d1", devices=["d1"])
+
+        assert handler._should_process_message(_build_message(device_id="d1"))
+        assert not decode.called
+
+
+class TestIdMatcher:
+    @pytest.mark.parametrize(
+        "expected_id, actual_id, expected",
+        [
+            ("device", "device", True),
+            ("device", "device1", False),
+            ("dev*", "dev", True),
+            ("dev*", "device", True),
+            ("dev*", "adevice", False),
+            ("*ice", "device", True),
+            ("d?vice", "device", True),
+            ("d?vice", "dvice", False),
+            ("dev.ce", "device", False),
+            ("dev.ce*", "dev.ce-1", True),
+        ],
+    )
+    def test_compile_id_matcher(self, expected_id, actual_id, expected):
+        matcher = common_handler._compile_id_matcher(expected_id)
+        assert matcher(actual_id) == expected
+
+    @pytest.mark.parametrize("expected_id", [None, ""])
+    def test_no_filter(self, expected_id):
+        assert common_handler._compile_id_matcher(expected_id) is None
+
+
+class TestEventWriter:
+    events = [{"event": {"origin": "device-{}".format(i), "payload": {"i": i}}} for i in range(3)]
+
+    def test_json(self):
+        stream = io.StringIO()
+        writer = EventWriter(output="json", stream=stream)
+        for event in self.events:
+            writer.write(event)
+        writer.close()
+
+        expected = "".join(json.dumps(event, indent=4) + "\n" for event in self.events)
+        assert stream.getvalue() == expected
+
+    def test_compact_json(self):
+        stream = io.StringIO()
+        writer = EventWriter(output="json", compact=True, stream=stream)
+        for event in self.events:
+            writer.write(event)
+        writer.close()
+
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(line) for line in lines] == self.events
+
+    def test_yaml(self):
+        stream = io.StringIO()
+        writer = EventWriter(output="yaml", stream=stream)
+        for event in self.events:
+            writer.write(event)
+        writer.close()
+
+        assert list(yaml.safe_load_all(stream.getvalue())) == self.events
+
+    def test_buffered_until_size_exceeded(self):
+        stream = io.StringIO()
+        writer = EventWriter(
+            output="json", compact=True, stream=stream, max_buffer_size=100, flush_interval=3600
+        )
+        writer.write(self.events[0])
+        assert stream.getvalue() == ""
+
+        for _ in range(5):
+            writer.write(self.events[0])
+        assert stream.getvalue()
+
+        writer.close()
+        assert len(stream.getvalue().splitlines()) == 6
+
+    def test_flush_interval(self):
+        stream = io.StringIO()
+        writer = EventWriter(output="json", compact=True, stream=stream, flush_interval=0)
+        writer.write(self.events[0])
+        assert json.loads(stream.getvalue()) == self.events[0]
+
+    def test_interactive_stream_is_not_buffered(self, mocker):
+        stream = io.StringIO()
+        mocker.patch.object(stream, "isatty", return_value=True)
+        writer = EventWriter(output="json", stream=stream, flush_interval=3600)
+        writer.write(self.events[0])
+        assert json.loads(stream.getvalue()) == self.events[0]
+
+
+class TestStatsHandler:
+    def _build_handler(self, stream=None, **kwargs):
+        return StatsHandler(
+            CommonHandlerArguments(
+                output="json", common_parser_args=CommonParserArguments(), **kwargs
+            ),
+            stream=stream,
+            interval=0,
+        )
+
+    def _build_message(self, device_id, size, latency_ms):
+        return Message(
+            body=b"x" * size,
+            annotations={
+                decoder.DEVICE_ID_IDENTIFIER: device_id.encode(),
+                decoder.ENQUEUED_TIME_IDENTIFIER: 1000000 - latency_ms,
+            },
+        )
+
+    def test_summary(self, mocker):
+        mocker.patch(
+            "azext_iot.monitor.handlers.stats_handler.time.time", return_value=1000
+        )
+        parser = mocker.patch.object(common_handler, "CommonParser")
+        handler = self._build_handler()
+
+        handler.parse_messages(
+            PartitionBatch(
+                [
+                    self._build_message("d1", 10, 5),
+                    self._build_message("d1", 100, 50),
+                    self._build_message("d2", 1000, 500),
+                ],
+                "0",
+            )
+        )
+        handler.parse_messages(PartitionBatch([self._build_message("d2", 10, 5)], "1"))
+
+        stats = handler.get_summary()["stats"]
+        assert not parser.called
+        assert stats["messages"] == 4
+        assert stats["bytes"] == 1120
+        assert stats["deviceCount"] == 2
+        assert stats["topDevices"]["d1"]["messages"] == 2
+        assert stats["topDevices"]["d2"]["bytes"] == 1010
+        assert {p: v["messages"] for p, v in stats["partitions"].items()} == {"0": 3, "1": 1}
+        assert stats["payloadSizeBytes"] == {"<16": 2, "<128": 1, "<1024": 1}
+        assert stats["enqueueLatencyMs"]["min"] == 5
+        assert stats["enqueueLatencyMs"]["max"] == 500
+        assert stats["enqueueLatencyMs"]["p50"] == 7
+        assert stats["enqueueLatencyMs"]["p99"] == 511
+
+    def test_latency_is_measured_at_receive_time(self, mocker):
+        # the batch is processed long after it was received
+        mocker.patch(
+            "azext_iot.monitor.handlers.stats_handler.time.time", return_value=2000
+        )
+        handler = self._build_handler()
+
+        handler.parse_messages(
+            PartitionBatch([self._build_message("d1", 10, 5)], "0", received_ms=1000000)
+        )
+
+        latency = handler.get_summary()["stats"]["enqueueLatencyMs"]
+        assert latency["min"] == latency["max"] == 5
+
+    def test_filters_apply(self):
+        handler = self._build_handler(device_id="d1")
+
+        handler.parse_messages(
+            [self._build_message("d1", 10, 5), self._build_message("d2", 10, 5)]
+        )
+
+        stats = handler.get_summary()["stats"]
+        assert stats["messages"] == 1
+        assert list(stats["topDevices"]) == ["d1"]
+        assert stats["partitions"] == {}
+
+    def test_final_report_on_close(self):
+        stream = io.StringIO()
+        handler = self._build_handler(stream=stream)
+        handler.parse_message(self._build_message("d1", 10, 5))
+
+        handler.close()
+
+        result = json.loads(stream.getvalue())
+        assert result["stats"]["final"]
+        assert result["stats"]["messages"] == 1
+
+
+class FakeDevice:
+    def __init__(self, device_id, template):
+        self.id = device_id
+        self.template = template
+
+
+class TestDeviceTemplateResolver:
+    @pytest.fixture()
+    def providers(self, mocker):
+        device_provider = mocker.MagicMock()
+        template_provider = mocker.MagicMock()
+        device_provider.list_devices.return_value = [
+            FakeDevice("d1", "t1"),
+            FakeDevice("d2", "t1"),
+            FakeDevice("d3", "t2"),
+        ]
+        device_provider.get_device.side_effect = lambda device_id, **kwargs: FakeDevice(
+            device_id, "t3"
+        )
+        return device_provider, template_provider
+
+    def test_warm_up(self, providers):
+        device_provider, template_provider = providers
+        resolver = DeviceTemplateResolver(device_provider, template_provider)
+
+        resolver.warm_up()
+
+        assert all(resolver.is_ready(d) for d in ["d1", "d2", "d3"])
+        assert not resolver.is_ready("d4")
+        assert sorted(
+            call[0][0] for call in template_provider.get_device_template.call_args_list
+        ) == ["t1", "t2"]
+        assert not device_provider.get_device.called
+        resolver.close()
+
+    def test_warm_up_failure_is_not_fatal(self, providers):
+        device_provider, template_provider = providers
+        device_provider.list_devices.side_effect = Exception("forbidden")
+        resolver = DeviceTemplateResolver(device_provider, template_provider)
+
+        resolver.warm_up()
+
+        assert not resolver.is_ready("d1")
+        resolver.close()
+
+    def test_late_device_messages_wait_for_lookup(self, providers):
+        device_provider, template_provider = providers
+        resolver = DeviceTemplateResolver(device_provider, template_provider, max_pending=2)
+
+        for i in range(3):
+            resolver.park("d4", "m{}".format(i))
+        resolver.park("d5", "m3")
+
+        assert resolver.dropped_messages == 1
+        assert sorted(resolver.close()) == ["m1", "m2", "m3"]
+        assert resolver.is_ready("d4")
+        assert sorted(
+            call[0][0] for call in device_provider.get_device.call_args_list
+        ) == ["d4", "d5"]
+        template_provider.get_device_template.assert_called_with("t3", central_dns_suffix=mock_any)
+
+    def test_lookup_failure_releases_messages(self, providers):
+        device_provider, template_provider = providers
+        device_provider.get_device.side_effect = Exception("not found")
+        resolver = DeviceTemplateResolver(device_provider, template_provider)
+
+        resolver.park("d4", "m0")
+        resolver._executor.shutdown(wait=True)
+
+        assert resolver.pop_ready() == ["m0"]
+        assert resolver.is_ready("d4")
+
+
+class TestCentralHandlerTemplateResolution:
+    @pytest.fixture()
+    def lookup(self):
+        return threading.Event()
+
+    @pytest.fixture()
+    def device_provider(self, mocker, lookup):
+        device_provider = mocker.MagicMock()
+        device_provider.list_devices.return_value = [FakeDevice("known", "t1")]
+
+        def get_device(device_id, **kwargs):
+            lookup.wait(5)
+            return FakeDevice(device_id, "t1")
+
+        device_provider.get_device.side_effect = get_device
+        return device_provider
+
+    @pytest.fixture()
+    def validated(self, mocker):
+        validated = []
+        parser = mocker.patch.object(central_handler, "CentralParser")
+        parser.side_effect = lambda message, **kwargs: validated.append(message) or mocker.MagicMock()
+        return validated
+
+    def _build_handler(self, mocker, device_provider, duration=0):
+        handler = central_handler.CentralHandler(
+            central_device_provider=device_provider,
+            central_template_provider=mocker.MagicMock(),
+            central_handler_args=CentralHandlerArguments(
+                duration=duration,
+                max_messages=0,
+                common_handler_args=CommonHandlerArguments(
+                    output="json", common_parser_args=CommonParserArguments()
+                ),
+                progress_interval=1000,
+            ),
+            central_dns_suffix="azureiotcentral.com",
+        )
+        handler.warm_up()
+        return handler
+
+    def test_messages_of_late_devices_are_validated_in_order(
+        self, mocker, device_provider, lookup, validated
+    ):
+        handler = self._build_handler(mocker, device_provider)
+
+        messages = [
+            _build_message(device_id=device_id, payload={"i": i})
+            for i, device_id in enumerate(["known", "late", "known", "late"])
+        ]
+        handler.validate_messages(messages[:2])
+        handler.validate_messages(messages[2:])
+        lookup.set()
+        handler.close()
+
+        # known devices are validated right away, late devices once resolved, in order
+        assert validated == [messages[0], messages[2], messages[1], messages[3]]
+        assert device_provider.get_device.call_count == 1
+
+    def test_parked_messages_are_drained_on_idle_stream(
+        self, mocker, device_provider, lookup, validated
+    ):
+        mocker.patch.object(central_handler, "RESOLVED_DRAIN_INTERVAL_SEC", 0.05)
+        handler = self._build_handler(mocker, device_provider)
+        message = _build_message(device_id="late", payload={})
+
+        handler.validate_messages([message])
+        lookup.set()
+        # no further batch arrives, the drain timer releases the message
+        central_handler.get_loop().run_until_complete(asyncio.sleep(0.5))
+
+        assert validated == [message]
+        handler.close()
+        assert validated == [message]
+
+    def test_duration_expiry_validates_parked_messages(
+        self, mocker, device_provider, lookup, validated, capsys
+    ):
+        handler = self._build_handler(mocker, device_provider)
+        message = _build_message(device_id="late", payload={})
+
+        handler.validate_messages([message])
+        lookup.set()
+        with pytest.raises(KeyboardInterrupt):
+            handler._quit_duration_exceeded()
+
+        assert validated == [message]
+        assert "after parsing 1 message(s)" in capsys.readouterr().out
+
+
+class TestIssueAggregator:
+    def _issue(self, device_id="d1", details="details", message="message", **kwargs):
+        return CentralIssue(
+            severity=Severity.error,
+            details=details,
+            message=message,
+            device_id=device_id,
+            template_id="t1",
+            **kwargs
+        )
+
+    def test_groups_issues_with_bounded_samples(self):
+        aggregator = IssueAggregator(max_samples=2)
+        for i in range(5):
+            aggregator.add(self._issue(message="m{}".format(i)))
+        aggregator.add(self._issue(device_id="d2"))
+
+        summary = aggregator.get_summary()
+        assert len(aggregator) == 6
+        assert [entry["count"] for entry in summary] == [5, 1]
+        assert summary[0]["device_id"] == "d1"
+        assert summary[0]["template_id"] == "t1"
+        assert summary[0]["severity"] == "error"
+        assert summary[0]["message"] == "m0"
+        assert summary[0]["samples"] == ["m0", "m1"]
+
+    def test_issue_type_overrides_details(self):
+        aggregator = IssueAggregator()
+        aggregator.add(self._issue(details="value 1", issue_type="mismatch"))
+        aggregator.add(self._issue(details="value 2", issue_type="mismatch"))
+
+        summary = aggregator.get_summary()
+        assert len(summary) == 1
+        assert summary[0]["details"] == "value 1"
+        assert summary[0]["count"] == 2
+
+    def test_max_groups(self):
+        aggregator = IssueAggregator(max_groups=1)
+        aggregator.add(self._issue(device_id="d1"))
+        aggregator.add(self._issue(device_id="d2"))
+        aggregator.add(self._issue(device_id="d1"))
+
+        assert len(aggregator.get_summary()) == 1
+        assert aggregator.ungrouped == 1
+        assert len(aggregator) == 3
+
+    def test_unsampled_messages_are_not_rendered(self, mocker):
+        message = mocker.MagicMock()
+        aggregator = IssueAggregator(max_samples=1)
+        aggregator.add(self._issue())
+        aggregator.add(self._issue(message=message))
+
+        message.__str__.assert_not_called()
+
+    def test_central_handler_csv_summary(self, mocker, capsys):
+        handler = central_handler.CentralHandler(
+            central_device_provider=mocker.MagicMock(),
+            central_template_provider=mocker.MagicMock(),
+            central_handler_args=CentralHandlerArguments(
+                duration=0,
+                max_messages=0,
+                common_handler_args=CommonHandlerArguments(
+                    output="json", common_parser_args=CommonParserArguments()
+                ),
+                style="csv",
+            ),
+            central_dns_suffix="azureiotcentral.com",
+        )
+        handler._issues.add_all([self._issue(), self._issue(), self._issue(device_id="d2")])
+
+        handler._print_results()
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[1] == "severity,details,message,device_id,template_id,count"
+        assert lines[2:] == ["error,details,message,d1,t1,2", "error,details,message,d2,t1,1"]
+
+
+class TestPropertyChangeHandler:
+    def _build_twin_change(self, device_id, properties, source=b"twinChangeEvents"):
+        message = _build_message(
+            device_id=device_id, payload={"version": 7, "properties": properties}
+        )
+        message.annotations[b"iothub-message-source"] = source
+        message.application_properties = {b"deviceId": device_id.encode()}
+        return message
+
+    def test_reports_twin_changes(self):
+        changes = []
+        handler = PropertyChangeHandler(
+            CommonHandlerArguments(
+                output="json", common_parser_args=CommonParserArguments(), device_id="d*"
+            ),
+            on_change=lambda *args: changes.append(args),
+        )
+
+        handler.parse_messages(
+            [
+                self._build_twin_change(
+                    "d1",
+                    {
+                        "reported": {"temp": 21, "$metadata": {}, "$version": 7},
+                        "desired": {"target": 20},
+                    },
+                ),
+                # filtered device
+                self._build_twin_change("other", {"reported": {"temp": 1}}),
+                # telemetry
+                self._build_twin_change("d2", {"reported": {"temp": 1}}, source=b"Telemetry"),
+                _build_message(device_id="d3"),
+            ]
+        )
+
+        assert changes == [
+            ("d1", "desired", 7, {"target": 20}),
+            ("d1", "reported", 7, {"temp": 21}),
+        ]
+
+    def test_falls_back_to_application_properties(self):
+        changes = []
+        handler = PropertyChangeHandler(
+            CommonHandlerArguments(
+                output="json", common_parser_args=CommonParserArguments(), devices=["d1"]
+            ),
+            on_change=lambda *args: changes.append(args),
+        )
+
+        # routed copy without identity annotations
+        message = _build_message(payload={"version": 3, "properties": {"reported": {"temp": 1}}})
+        message.application_properties = {
+            b"iothub-message-source": b"twinChangeEvents",
+            b"deviceId": b"d1",
+        }
+        handler.parse_messages([message])
+
+        assert changes == [("d1", "reported", 3, {"temp": 1})]
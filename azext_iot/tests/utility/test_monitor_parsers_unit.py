@@ -15,7 +15,8 @@ from azext_iot.central.providers import (
     CentralDeviceTemplateProvider,
 )
 from azext_iot.central.models.v1 import TemplateV1, DeviceV1
-from azext_iot.monitor.parsers import common_parser, central_parser
+from azext_iot.common.utility import parse_entity, unicode_binary_map
+from azext_iot.monitor.parsers import common_parser, central_parser, decoder
 from azext_iot.monitor.parsers import strings
 from azext_iot.monitor.models.arguments import CommonParserArguments
 from azext_iot.monitor.models.enum import Severity
@@ -307,6 +308,97 @@ class TestCommonParser:
         expected_details = strings.invalid_json()
         _validate_issues(parser, Severity.error, 1, 1, [expected_details])
 
+    @pytest.mark.parametrize(
+        "body, expected",
+        [
+            (b'{"a": 1, "b": [1.5, "text\\n"]}', {"a": 1, "b": [1.5, "text\n"]}),
+            ('{"a": "\u00e9"}'.encode("utf8"), {"a": "\u00e9"}),
+            # escaped line breaks between tokens are only handled by the fallback
+            (b'{\\r\\n"a": 1\\n}', {"a": 1}),
+            (b'{"a": 123456789012345678901234567890}', {"a": 123456789012345678901234567890}),
+        ],
+    )
+    def test_parse_json_payload(self, body, expected):
+        message = Message(
+            body=body,
+            properties=MessageProperties(
+                content_encoding=self.encoding, content_type=self.content_type
+            ),
+            annotations={common_parser.DEVICE_ID_IDENTIFIER: self.device_id.encode()},
+        )
+        parser = common_parser.CommonParser(
+            message=message, common_parser_args=CommonParserArguments()
+        )
+
+        payload = parser.parse_message()["event"]["payload"]
+
+        assert payload == expected
+        assert not parser.issues_handler.get_all_issues()
+
+
+class TestDecoder:
+    @pytest.mark.parametrize(
+        "properties",
+        [
+            MessageProperties(),
+            MessageProperties(content_encoding="utf-8", content_type="application/json"),
+            MessageProperties(
+                message_id="message-id",
+                user_id="user-id",
+                to="/devices/device-id/messages/events",
+                correlation_id="correlation-id",
+                content_encoding="utf-16",
+                creation_time=1600000000000,
+                absolute_expiry_time=1600000060000,
+                group_id="group-id",
+                group_sequence=5,
+            ),
+        ],
+    )
+    def test_decode_system_properties_matches_reflection(self, properties):
+        expected = unicode_binary_map(parse_entity(properties, True))
+        assert decoder.decode_system_properties(properties) == expected
+
+    @pytest.mark.parametrize(
+        "annotations",
+        [
+            {},
+            {decoder.DEVICE_ID_IDENTIFIER: b"device-id"},
+            {
+                decoder.DEVICE_ID_IDENTIFIER: b"device-id",
+                b"x-opt-sequence-number": 10,
+                b"custom-annotation": b"value",
+                "str-key": "str-value",
+            },
+        ],
+    )
+    def test_decode_annotations_matches_unicode_binary_map(self, annotations):
+        assert decoder.decode_annotations(annotations) == unicode_binary_map(annotations)
+
+    def test_read_event_record(self):
+        message = Message(
+            body=b"",
+            annotations={
+                decoder.DEVICE_ID_IDENTIFIER: b"device-id",
+                decoder.INTERFACE_NAME_IDENTIFIER_V2: b"dtmi:interface;1",
+                decoder.COMPONENT_NAME_IDENTIFIER: b"component",
+            },
+        )
+        record = decoder.read_event_record(message)
+        assert record.device_id == "device-id"
+        assert record.module_id is None
+        assert record.interface_name == "dtmi:interface;1"
+        assert record.component_name == "component"
+
+    def test_missing_device_id_should_error(self):
+        message = Message(body=b"", annotations={})
+        parser = common_parser.CommonParser(
+            message=message, common_parser_args=CommonParserArguments()
+        )
+
+        assert parser.device_id == ""
+        _validate_issues(parser, Severity.error, 1, 1, [strings.unknown_device_id()])
+
 
 class TestCentralParser:
     device_id = "some-device-id"
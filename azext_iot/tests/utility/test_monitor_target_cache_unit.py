@@ -0,0 +1,115 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import pytest
+
+from azext_iot.monitor.builders import hub_target_builder
+from azext_iot.monitor.builders.target_cache import EventTargetCache
+
+hub_hostname = "myhub.azure-devices.net"
+events = {
+    "endpoint": "ihsuprodbyres.servicebus.windows.net",
+    "path": "iothub-ehub-myhub",
+    "address": "amqps://ihsuprodbyres.servicebus.windows.net/iothub-ehub-myhub/$management",
+    "partition_ids": ["0", "1", "2", "3"],
+}
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return EventTargetCache(str(tmp_path / "iotext" / "event_targets.json"))
+
+
+class TestEventTargetCache:
+    def test_round_trip(self, cache):
+        assert cache.get(hub_hostname) is None
+
+        cache.set(hub_hostname, events)
+
+        assert EventTargetCache(cache.path).get(hub_hostname) == events
+
+    def test_expired(self, cache, mocker):
+        cache.set(hub_hostname, events)
+        mocker.patch(
+            "azext_iot.monitor.builders.target_cache.time.time",
+            return_value=cache.ttl * 2 + 10 ** 10,
+        )
+
+        assert cache.get(hub_hostname) is None
+
+    def test_invalidate(self, cache):
+        cache.set(hub_hostname, events)
+        cache.set("otherhub.azure-devices.net", events)
+
+        cache.invalidate(hub_hostname)
+
+        assert cache.get(hub_hostname) is None
+        assert cache.get("otherhub.azure-devices.net") == events
+
+    def test_corrupt_file(self, cache):
+        cache.set(hub_hostname, events)
+        with open(cache.path, "w") as f:
+            f.write("{not json")
+
+        assert cache.get(hub_hostname) is None
+        cache.set(hub_hostname, events)
+        assert cache.get(hub_hostname) == events
+
+
+class TestEventTargetBuilderCache:
+    @pytest.fixture()
+    def service_calls(self, mocker):
+        async def evaluate_redirect(self, endpoint):
+            return None, {"events": {key: events[key] for key in ("endpoint", "path", "address")}}
+
+        async def query_meta_data(address, path, auth):
+            return {b"partition_count": len(events["partition_ids"])}
+
+        redirect = mocker.patch.object(
+            hub_target_builder.EventTargetBuilder,
+            "_evaluate_redirect",
+            side_effect=evaluate_redirect,
+            autospec=True,
+        )
+        meta_data = mocker.patch.object(
+            hub_target_builder, "query_meta_data", side_effect=query_meta_data
+        )
+        mocker.patch.object(hub_target_builder.AmqpBuilder, "build_iothub_amqp_endpoint_from_target")
+        mocker.patch.object(hub_target_builder.EventTargetBuilder, "_build_auth_container")
+        return redirect, meta_data
+
+    def _build_target(self, cache):
+        builder = hub_target_builder.EventTargetBuilder(cache=cache)
+        target = builder.build_iot_hub_target({"entity": hub_hostname})
+        return builder, target
+
+    def test_cache_miss_then_hit(self, cache, service_calls):
+        redirect, meta_data = service_calls
+
+        builder, target = self._build_target(cache)
+        assert not builder.from_cache
+        assert redirect.call_count == 1
+        assert meta_data.call_count == 1
+        assert target.partitions == events["partition_ids"]
+
+        builder, target = self._build_target(cache)
+        assert builder.from_cache
+        assert redirect.call_count == 1
+        assert meta_data.call_count == 1
+        assert target.hostname == events["endpoint"]
+        assert target.path == events["path"]
+        assert target.partitions == events["partition_ids"]
+
+    def test_invalidated_target_is_resolved_again(self, cache, service_calls):
+        redirect, _ = service_calls
+
+        self._build_target(cache)
+        builder, _ = self._build_target(cache)
+        builder.invalidate_cached_target({"entity": hub_hostname})
+        builder, _ = self._build_target(cache)
+
+        assert not builder.from_cache
+        assert redirect.call_count == 2
@@ -0,0 +1,492 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import asyncio
+import io
+import os
+import pytest
+import threading
+
+from uamqp import errors as amqp_errors
+from uamqp.constants import ErrorCodes
+from uamqp.message import Message
+from azext_iot.monitor import telemetry
+from azext_iot.monitor.checkpoint import CheckpointStore
+from azext_iot.monitor.pipeline import EventPipeline
+from azext_iot.monitor.parsers import decoder
+from azext_iot.monitor.models.target import Target
+
+
+def _build_target():
+    target = Target(hostname="hostname", path="path", partitions=["0"], auth=None)
+    target.add_consumer_group("$Default")
+    return target
+
+
+class FakeReceiveClient:
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.batch_sizes = []
+        self.closed = 0
+
+    async def open_async(self, connection=None):
+        pass
+
+    async def close_async(self):
+        self.closed += 1
+
+    async def receive_message_batch_async(self, max_batch_size=None):
+        self.batch_sizes.append(max_batch_size)
+        return self.batches.pop(0)
+
+
+@pytest.fixture()
+def receive_client(mocker):
+    client = FakeReceiveClient([["m1", "m2"], ["m3"], []])
+    client_class = mocker.patch.object(
+        telemetry.uamqp, "ReceiveClientAsync", return_value=client
+    )
+    return client_class, client
+
+
+class TestMonitorEvents:
+    def _run(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    @pytest.mark.parametrize("prefetch", [1, 300])
+    def test_batches_until_inactivity_timeout(self, receive_client, prefetch):
+        client_class, client = receive_client
+        batches = []
+
+        self._run(
+            telemetry._monitor_events(
+                target=_build_target(),
+                connection=None,
+                partition="0",
+                enqueued_time_utc=0,
+                on_messages_received=batches.append,
+                prefetch=prefetch,
+            )
+        )
+
+        assert batches == [["m1", "m2"], ["m3"]]
+        assert client_class.call_args[1]["prefetch"] == prefetch
+        assert client.batch_sizes == [prefetch] * 3
+        assert client.closed == 1
+
+    @pytest.mark.parametrize("queue_size, on_loop_thread", [(None, True), (10, False)])
+    def test_pipeline_only_with_queue_size(self, mocker, receive_client, queue_size, on_loop_thread):
+        connection = mocker.MagicMock()
+        connection.__aenter__ = mocker.AsyncMock(return_value=connection)
+        connection.__aexit__ = mocker.AsyncMock(return_value=False)
+        mocker.patch.object(telemetry.uamqp, "ConnectionAsync", return_value=connection)
+        threads = []
+
+        def on_messages_received(batch):
+            threads.append(threading.current_thread())
+
+        result = self._run(
+            telemetry._initiate_event_monitor(
+                target=_build_target(),
+                enqueued_time_utc=0,
+                on_messages_received=on_messages_received,
+                queue_size=queue_size,
+            )
+        )
+
+        assert result == [None]
+        assert len(threads) == 2
+        # without queue_size handlers (e.g. Central) run in the receive loop
+        assert all((t is threading.current_thread()) == on_loop_thread for t in threads)
+
+    def test_checkpoint_resume(self, mocker, tmp_path):
+        messages = [
+            Message(
+                body=b"",
+                annotations={
+                    decoder.OFFSET_IDENTIFIER: str(i * 100).encode(),
+                    decoder.SEQUENCE_NUMBER_IDENTIFIER: i,
+                },
+            )
+            for i in range(3)
+        ]
+        path = str(tmp_path / "checkpoints.db")
+        source = mocker.patch.object(telemetry.uamqp.address, "Source")
+
+        # first run starts from enqueued time and records the last offset
+        mocker.patch.object(
+            telemetry.uamqp,
+            "ReceiveClientAsync",
+            return_value=FakeReceiveClient([messages[:2], messages[2:], []]),
+        )
+        store = CheckpointStore(path)
+        self._run(
+            telemetry._monitor_events(
+                target=_build_target(),
+                connection=None,
+                partition="0",
+                enqueued_time_utc=1234,
+                on_messages_received=lambda batch: None,
+                checkpoint_store=store,
+            )
+        )
+        store.close()
+        source.return_value.set_filter.assert_called_with(
+            b"amqp.annotation.x-opt-enqueuedtimeutc > 1234"
+        )
+
+        # second run resumes after the checkpointed offset
+        mocker.patch.object(
+            telemetry.uamqp, "ReceiveClientAsync", return_value=FakeReceiveClient([[]])
+        )
+        store = CheckpointStore(path)
+        self._run(
+            telemetry._monitor_events(
+                target=_build_target(),
+                connection=None,
+                partition="0",
+                enqueued_time_utc=1234,
+                on_messages_received=lambda batch: None,
+                checkpoint_store=store,
+            )
+        )
+        source.return_value.set_filter.assert_called_with(
+            b"amqp.annotation.x-opt-offset > '200'"
+        )
+        assert store.get_checkpoint("hostname/path", "$Default", "0") == {
+            "offset": "200",
+            "sequence_number": 2,
+        }
+        store.close()
+
+    def test_batch_callback_wraps_single_message_callback(self):
+        received = []
+        callback = telemetry._batch_callback(received.append)
+
+        callback(["m1", "m2"])
+
+        assert received == ["m1", "m2"]
+
+
+class TestCheckpointStore:
+    def test_batched_writes(self, tmp_path):
+        path = str(tmp_path / "nested" / "checkpoints.db")
+        store = CheckpointStore(path, flush_interval=3600, flush_count=2)
+
+        store.update("hub", "$Default", "0", "100", 1)
+        assert store._pending
+        assert CheckpointStore(path).get_checkpoint("hub", "$Default", "0") is None
+
+        store.update("hub", "$Default", "1", "200", 2)
+        assert store._pending == {}
+        assert CheckpointStore(path).get_checkpoint("hub", "$Default", "1") == {
+            "offset": "200",
+            "sequence_number": 2,
+        }
+
+    def test_keyed_by_hub_consumer_group_partition(self, tmp_path):
+        path = str(tmp_path / "checkpoints.db")
+        store = CheckpointStore(path)
+        store.update("hub", "$Default", "0", "100", 1)
+        store.update("hub", "cg", "0", "300", 3)
+        store.update("hub2", "$Default", "0", "500", 5)
+        store.close()
+
+        store = CheckpointStore(path)
+        assert store.get_checkpoint("hub", "$Default", "0")["offset"] == "100"
+        assert store.get_checkpoint("hub", "cg", "0")["offset"] == "300"
+        assert store.get_checkpoint("hub2", "$Default", "0")["offset"] == "500"
+        assert store.get_checkpoint("hub", "$Default", "1") is None
+        store.close()
+
+
+class TestEventPipeline:
+    def _run(self, coroutine):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def test_batches_processed_in_order(self):
+        processed = []
+        completed = []
+
+        async def run():
+            pipeline = EventPipeline(processed.append, max_queue_size=2)
+            pipeline.start()
+            for i in range(10):
+                await pipeline.put(["m{}".format(i)], on_processed=completed.append)
+            await pipeline.close()
+            return pipeline
+
+        pipeline = self._run(run())
+
+        expected = [["m{}".format(i)] for i in range(10)]
+        assert processed == expected
+        assert completed == expected
+        metrics = pipeline.metrics.summary()
+        assert metrics["messages"] == 10
+        assert metrics["droppedMessages"] == 0
+        assert metrics["maxQueueDepth"] <= 2
+        assert metrics["stages"]["process"]["count"] == 10
+
+    @pytest.mark.parametrize(
+        "overflow, expected",
+        [
+            ("dropNewest", [["m0"], ["m1"], ["m2"]]),
+            ("dropOldest", [["m0"], ["m3"], ["m4"]]),
+        ],
+    )
+    def test_drop_policy(self, overflow, expected):
+        processed = []
+        release = threading.Event()
+
+        def handler(batch):
+            release.wait(5)
+            processed.append(batch)
+
+        async def run():
+            pipeline = EventPipeline(handler, max_queue_size=2, overflow=overflow)
+            pipeline.start()
+            await pipeline.put(["m0"])
+            # let the consumer pick up the first batch, which then blocks the handler
+            while not pipeline._queue.empty():
+                await asyncio.sleep(0.01)
+            for i in range(1, 5):
+                await pipeline.put(["m{}".format(i)])
+            release.set()
+            await pipeline.close()
+            return pipeline
+
+        pipeline = self._run(run())
+
+        assert processed == expected
+        assert pipeline.metrics.dropped_batches == 2
+        assert pipeline.metrics.dropped_messages == 2
+
+    def test_handler_error_is_raised_on_put(self):
+        def handler(batch):
+            raise ValueError("handler failure")
+
+        async def run():
+            pipeline = EventPipeline(handler, max_queue_size=1)
+            pipeline.start()
+            await pipeline.put(["m0"])
+            while not pipeline.error:
+                await asyncio.sleep(0.01)
+            with pytest.raises(ValueError, match="handler failure"):
+                await pipeline.put(["m1"])
+            await pipeline.close()
+
+        self._run(run())
+
+
+class FakeHandler:
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def parse_messages(self, messages):
+        for message in messages:
+            self.stream.write("{}\n".format(message))
+
+    def close(self):
+        self.stream.flush()
+
+
+async def _fake_initiate_event_monitor(
+    target, enqueued_time_utc, on_messages_received, **kwargs
+):
+    results = []
+    for partition in target.partitions:
+        if partition == "killed":
+            # exits without reporting, as if the worker was killed
+            os._exit(3)
+        if partition.startswith("error"):
+            results.append(RuntimeError("{} failure".format(partition)))
+            continue
+        if partition == "redirected":
+            results.append(_raised_from(_link_redirect()))
+            continue
+        for i in range(3):
+            on_messages_received(["{}-{}".format(partition, i)])
+        results.append(None)
+    return results
+
+
+def _link_redirect():
+    return amqp_errors.LinkRedirect(
+        ErrorCodes.LinkRedirect,
+        info={b"hostname": b"redirected.servicebus.windows.net", b"address": b"amqps://redirected"},
+    )
+
+
+def _raised_from(cause):
+    # a RuntimeError raised while handling cause, the way receiver errors are surfaced
+    try:
+        raise RuntimeError("monitor failure") from cause
+    except RuntimeError as e:
+        return e
+
+
+class TestStaleTargetError:
+    @pytest.mark.parametrize(
+        "error, expected",
+        [
+            (_raised_from(_link_redirect()), True),
+            (_raised_from(amqp_errors.LinkDetach(b"amqp:unauthorized-access")), True),
+            (amqp_errors.ConnectionClose(ErrorCodes.ConnectionRedirect), True),
+            (amqp_errors.TokenAuthFailure(401, b"Unauthorized"), True),
+            (telemetry.MonitorWorkerError("failure", stale_target=True), True),
+            (_raised_from(amqp_errors.LinkDetach(ErrorCodes.InternalServerError)), False),
+            (telemetry.MonitorWorkerError("failure"), False),
+            (RuntimeError("handler failure"), False),
+            ("failure", False),
+        ],
+    )
+    def test_is_stale_target_error(self, error, expected):
+        assert telemetry.is_stale_target_error(error) is expected
+
+
+class TestPartitionedMonitors:
+    @pytest.mark.parametrize(
+        "partitions, workers, expected",
+        [
+            (["0", "1", "2", "3"], 2, [["0", "2"], ["1", "3"]]),
+            (["0", "1"], 4, [["0"], ["1"]]),
+            (["0", "1", "2"], 1, [["0", "1", "2"]]),
+            ([], 4, []),
+        ],
+    )
+    def test_shard_partitions(self, partitions, workers, expected):
+        assert telemetry._shard_partitions(partitions, workers) == expected
+
+    def test_merged_output_is_ordered_per_partition(self, mocker):
+        mocker.patch.object(
+            telemetry, "_initiate_event_monitor", _fake_initiate_event_monitor
+        )
+        target = _build_target()
+        target.partitions = ["0", "1", "2", "3"]
+        stream = io.StringIO()
+
+        telemetry.start_partitioned_monitors(
+            target=target,
+            auth_factory=lambda: None,
+            handler_factory=FakeHandler,
+            enqueued_time_utc=0,
+            on_start_string="start",
+            workers=2,
+            stream=stream,
+        )
+
+        lines = stream.getvalue().splitlines()
+        assert sorted(lines) == sorted(
+            "{}-{}".format(p, i) for p in target.partitions for i in range(3)
+        )
+        for partition in target.partitions:
+            assert [line for line in lines if line.startswith(partition)] == [
+                "{}-{}".format(partition, i) for i in range(3)
+            ]
+
+    def test_every_partition_error_is_raised(self, mocker):
+        mocker.patch.object(
+            telemetry, "_initiate_event_monitor", _fake_initiate_event_monitor
+        )
+        target = _build_target()
+        target.partitions = ["0", "error1", "redirected", "error2"]
+
+        with pytest.raises(RuntimeError) as e:
+            telemetry.start_multiple_monitors(
+                targets=[target],
+                on_start_string="start",
+                enqueued_time_utc=0,
+                on_messages_received=lambda batch: None,
+            )
+
+        assert str(e.value) == "error1 failure; monitor failure; error2 failure"
+        assert telemetry.is_stale_target_error(e.value)
+
+    def test_worker_error_is_raised(self, mocker):
+        mocker.patch.object(
+            telemetry, "_initiate_event_monitor", _fake_initiate_event_monitor
+        )
+        target = _build_target()
+        target.partitions = ["0", "error"]
+
+        with pytest.raises(RuntimeError, match="error failure"):
+            telemetry.start_partitioned_monitors(
+                target=target,
+                auth_factory=lambda: None,
+                handler_factory=FakeHandler,
+                enqueued_time_utc=0,
+                on_start_string="start",
+                workers=2,
+                stream=io.StringIO(),
+            )
+
+    def test_worker_reports_every_partition_error(self, mocker):
+        mocker.patch.object(
+            telemetry, "_initiate_event_monitor", _fake_initiate_event_monitor
+        )
+        target = _build_target()
+        # both error partitions are owned by the second worker
+        target.partitions = ["0", "error-1", "2", "error-3"]
+
+        with pytest.raises(RuntimeError) as error:
+            telemetry.start_partitioned_monitors(
+                target=target,
+                auth_factory=lambda: None,
+                handler_factory=FakeHandler,
+                enqueued_time_utc=0,
+                on_start_string="start",
+                workers=2,
+                stream=io.StringIO(),
+            )
+        assert "error-1 failure" in str(error.value)
+        assert "error-3 failure" in str(error.value)
+
+    def test_killed_worker_is_reported(self, mocker):
+        mocker.patch.object(
+            telemetry, "_initiate_event_monitor", _fake_initiate_event_monitor
+        )
+        target = _build_target()
+        target.partitions = ["0", "killed"]
+
+        with pytest.raises(RuntimeError, match="exit code 3"):
+            telemetry.start_partitioned_monitors(
+                target=target,
+                auth_factory=lambda: None,
+                handler_factory=FakeHandler,
+                enqueued_time_utc=0,
+                on_start_string="start",
+                workers=2,
+                stream=io.StringIO(),
+            )
+
+    def test_worker_reports_stale_target(self, mocker):
+        mocker.patch.object(
+            telemetry, "_initiate_event_monitor", _fake_initiate_event_monitor
+        )
+        target = _build_target()
+        target.partitions = ["0", "redirected"]
+
+        with pytest.raises(RuntimeError) as error:
+            telemetry.start_partitioned_monitors(
+                target=target,
+                auth_factory=lambda: None,
+                handler_factory=FakeHandler,
+                enqueued_time_utc=0,
+                on_start_string="start",
+                workers=2,
+                stream=io.StringIO(),
+            )
+        # the cause is inspected in the worker, the parent receives its outcome
+        assert telemetry.is_stale_target_error(error.value)
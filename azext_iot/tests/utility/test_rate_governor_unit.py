@@ -0,0 +1,181 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import pytest
+import responses
+import time
+
+from unittest import mock
+from urllib3.util.retry import Retry
+from azext_iot._factory import SdkResolver
+from azext_iot.common.rate_governor import (
+    RateGovernor,
+    TokenBucket,
+    get_operation_class,
+    _log_stats,
+    exempt_throttled_retries,
+    get_rate_governor,
+)
+from azext_iot.common.shared import SdkType
+from azext_iot.tests.conftest import mock_target
+
+hub_url = "https://{}".format(mock_target["entity"])
+
+
+def build_pipeline_response(status_code=200, headers=None):
+    response = mock.MagicMock(name="pipeline_response")
+    response.http_response.status_code = status_code
+    response.http_response.headers = headers or {}
+    return response
+
+
+class TestOperationClass(object):
+    @pytest.mark.parametrize(
+        "method, path, expected",
+        [
+            ("GET", "/devices/d1", "registry_read"),
+            ("GET", "/devices", "registry_read"),
+            ("PUT", "/devices/d1/modules/m1", "registry_write"),
+            ("DELETE", "/devices/d1", "registry_write"),
+            ("POST", "/devices", "registry_write"),
+            ("POST", "/devices/query", "other"),
+            ("GET", "/twins/d1", "twin"),
+            ("PATCH", "/twins/d1/modules/m1", "twin"),
+            ("POST", "/twins/d1/methods", "methods"),
+            ("POST", "/twins/d1/modules/m1/methods", "methods"),
+            ("GET", "/jobs/v2/j1", "other"),
+        ],
+    )
+    def test_operation_class(self, method, path, expected):
+        url = "{}{}?api-version=2020-09-30".format(hub_url, path)
+        assert get_operation_class(method, url) == expected
+
+
+class TestTokenBucket(object):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=20.0, burst=2, max_rate=20.0)
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == 0
+        # the bucket is empty, the next token arrives after 1 / rate seconds
+        assert bucket.acquire() == pytest.approx(0.05, abs=0.02)
+
+    def test_adapts_rate(self):
+        bucket = TokenBucket(rate=10.0, burst=1, max_rate=20.0, rate_increase=2.0)
+        bucket.succeeded()
+        assert bucket.rate == 20.0
+        bucket.succeeded()
+        assert bucket.rate == 20.0
+
+        bucket.throttled(0.1)
+        assert bucket.rate == 10.0
+        start = time.monotonic()
+        bucket.acquire()
+        assert time.monotonic() - start >= 0.09
+
+        for _ in range(10):
+            bucket.throttled(0)
+        # rates do not fall under a tenth of the initial rate
+        assert bucket.rate == 1.0
+
+    def test_paced_once_throttled(self):
+        bucket = TokenBucket(burst=1, backoff_rate=20.0)
+        assert all(bucket.acquire() == 0 for _ in range(100))
+        assert bucket.rate is None
+
+        bucket.throttled(0)
+        assert bucket.rate == 20.0
+        # the bucket is empty, the next token arrives after 1 / backoff_rate seconds
+        assert bucket.acquire() == pytest.approx(0.05, abs=0.02)
+
+    def test_unlimited_bucket_only_pauses(self):
+        bucket = TokenBucket()
+        assert all(bucket.acquire() == 0 for _ in range(100))
+        bucket.throttled(0.1)
+        assert bucket.acquire() == pytest.approx(0.1, abs=0.02)
+
+
+class TestRateGovernor(object):
+    def test_retries_throttled_requests(self):
+        governor = RateGovernor(budgets={"twin": (100.0, 10, 100.0)})
+        assert governor.get_stats()["twin"]["rate"] is None
+        send = mock.MagicMock(
+            side_effect=[
+                build_pipeline_response(429, {"Retry-After": "0"}),
+                build_pipeline_response(429, {"Retry-After": "0.1"}),
+                build_pipeline_response(200),
+            ]
+        )
+
+        start = time.monotonic()
+        response = governor.send("GET", hub_url + "/twins/d1", send)
+        assert response.http_response.status_code == 200
+        assert time.monotonic() - start >= 0.09
+        assert send.call_count == 3
+
+        stats = governor.get_stats()
+        assert stats["twin"]["requests"] == 3
+        assert stats["twin"]["throttled"] == 2
+        assert stats["twin"]["rate"] < 100.0
+        assert stats["other"]["requests"] == 0
+
+    def test_gives_up_after_max_retries(self):
+        governor = RateGovernor(budgets={}, max_retries=2, default_delay=0.01)
+        send = mock.MagicMock(return_value=build_pipeline_response(429))
+
+        response = governor.send("POST", hub_url + "/devices/query", send)
+        assert response.http_response.status_code == 429
+        assert send.call_count == 3
+        assert governor.get_stats()["other"]["throttled"] == 2
+
+    def test_shared_governor(self):
+        assert get_rate_governor() is get_rate_governor()
+
+    def test_service_sdk_retries_throttled_requests(self, mocker, mocked_response):
+        # a fresh governor, the throttled request must not slow down other tests
+        governor = RateGovernor(budgets={"registry_read": (100.0, 10, 100.0)})
+        mocker.patch("azext_iot._factory.get_rate_governor", return_value=governor)
+        device = {"deviceId": "d1"}
+        url = "{}/devices/d1".format(hub_url)
+        mocked_response.add(
+            method=responses.GET, url=url, status=429, headers={"Retry-After": "0"}
+        )
+        mocked_response.add(
+            method=responses.GET,
+            url=url,
+            body=json.dumps(device),
+            status=200,
+            content_type="application/json",
+        )
+
+        service_sdk = SdkResolver(target=mock_target).get_sdk(SdkType.service_sdk)
+        result = service_sdk.devices.get_identity(id="d1")
+        assert result.device_id == "d1"
+        assert len(mocked_response.calls) == 2
+        assert governor.get_stats()["registry_read"]["throttled"] == 1
+
+    def test_logs_stats_of_used_operation_classes(self, mocker):
+        governor = RateGovernor(budgets={})
+        logger = mocker.patch("azext_iot.common.rate_governor.logger")
+        _log_stats(governor)
+        assert not logger.debug.called
+
+        governor.send("GET", hub_url + "/twins/d1", lambda: build_pipeline_response(200))
+        _log_stats(governor)
+        stats = logger.debug.call_args[0][1]
+        assert list(stats) == ["other"]
+        assert stats["other"]["requests"] == 1
+
+    def test_throttled_retries_are_left_to_governor(self):
+        retry = Retry(total=3, status_forcelist=[429, 500], respect_retry_after_header=True)
+        exempt_throttled_retries(retry)
+
+        assert not retry.is_retry("GET", 429, has_retry_after=True)
+        assert retry.is_retry("GET", 503, has_retry_after=True)
+        assert retry.is_retry("GET", 500)
+        # retries derived while retrying keep ignoring 429
+        assert not retry.new(total=2).is_retry("GET", 429, has_retry_after=True)
+        assert Retry(total=3).is_retry("GET", 429, has_retry_after=True)
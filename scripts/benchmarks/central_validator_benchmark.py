@@ -0,0 +1,107 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Micro-benchmark for Central telemetry validation.
+
+Compares central_validator.validate, which resolves the schema type and validator for
+every value, against validators compiled once per template field (Template.get_validator).
+
+Usage:
+    python scripts/benchmarks/central_validator_benchmark.py [--iterations 20000]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from azext_iot.central.models.v1 import TemplateV1
+from azext_iot.common.utility import read_file_content
+from azext_iot.monitor.central_validator import validate
+
+TEST_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "..", "azext_iot", "tests", "central", "json"
+)
+
+PAYLOADS = {
+    "device_template.json": {
+        "Bool": True,
+        "Date": "2020-01-01",
+        "DateTime": "2020-01-01T01:00:00Z",
+        "Double": 123.5,
+        "Duration": "P1D",
+        "IntEnum": 1,
+        "StringEnum": "A",
+        "Float": 1.5,
+        "Geopoint": {"lat": 1, "lon": 2},
+        "Long": 123,
+        "Object": {"Double": 123},
+        "String": "value",
+        "Time": "01:00:00",
+        "Vector": {"x": 1, "y": 2, "z": 3},
+    },
+    "deeply_nested_template.json": {
+        "RidiculousObject": {
+            "LayerA": {
+                "Depth1A": {
+                    "Depth2": {
+                        "Depth3": {
+                            "Depth4": {
+                                "DeepestComplexEnum": 1,
+                                "DeepestVector": {"x": 1, "y": 2, "z": 3},
+                                "DeepestGeopoint": {"lat": 1, "lon": 2, "alt": 3},
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    },
+}
+
+
+def per_value(template, payload):
+    for name, value in payload.items():
+        validate(template.get_schema(name), value)
+
+
+def compiled(template, payload):
+    for name, value in payload.items():
+        template.get_validator(name)(value)
+
+
+def measure(func, template, payload, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(template, payload)
+    elapsed = time.perf_counter() - start
+    return iterations * len(payload) / elapsed if elapsed else float("inf")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--iterations", type=int, default=20000)
+    options = arg_parser.parse_args()
+
+    print("{:<30} {:>16} {:>16} {:>8}".format("template", "validate/sec", "compiled/sec", "speedup"))
+    for file_name, payload in PAYLOADS.items():
+        template = TemplateV1(json.loads(read_file_content(os.path.join(TEST_DIR, file_name))))
+
+        for name, value in payload.items():
+            assert validate(template.get_schema(name), value) == template.get_validator(name)(value)
+
+        before = measure(per_value, template, payload, options.iterations)
+        after = measure(compiled, template, payload, options.iterations)
+        print(
+            "{:<30} {:>16,.0f} {:>16,.0f} {:>7.2f}x".format(
+                file_name, before, after, after / before
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Micro-benchmark for monitor-events JSON payload decoding.
+
+Compares the previous decoding (utf8 decode, escaped line break regex, json.loads)
+against CommonParser._try_parse_json, which decodes straight from the body bytes and
+only falls back to the regex when that fails. Payload sizes range from 1 KB to 64 KB.
+
+Usage:
+    python scripts/benchmarks/monitor_json_benchmark.py [--iterations 2000]
+"""
+
+import argparse
+import json
+import re
+import time
+
+from azext_iot.monitor.models.arguments import CommonParserArguments
+from azext_iot.monitor.parsers.common_parser import CommonParser
+
+
+def build_payload(size):
+    payload = {"deviceId": "device-1", "readings": []}
+    i = 0
+    while len(json.dumps(payload)) < size:
+        payload["readings"].append(
+            {"sensor": "sensor-{}".format(i), "temperature": 21.5 + i, "status": "ok"}
+        )
+        i += 1
+    return json.dumps(payload).encode("utf8")
+
+
+def legacy_parse(body):
+    payload = str(body, "utf8")
+    regex = r"(\\r\\n)+|\\r+|\\n+"
+    return json.loads(re.compile(regex).sub("", payload))
+
+
+def measure(func, body, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(body)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed else float("inf")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--iterations", type=int, default=2000)
+    options = arg_parser.parse_args()
+
+    # bypass message decoding, only the payload step is measured
+    parser = CommonParser.__new__(CommonParser)
+    parser._common_parser_args = CommonParserArguments()
+
+    print("{:>8} {:>16} {:>16} {:>8}".format("size", "legacy/sec", "fast path/sec", "speedup"))
+    for size_kb in (1, 4, 16, 64):
+        body = build_payload(size_kb * 1024)
+        assert legacy_parse(body) == parser._try_parse_json(body)
+        before = measure(legacy_parse, body, options.iterations)
+        after = measure(parser._try_parse_json, body, options.iterations)
+        print(
+            "{:>6}KB {:>16,.0f} {:>16,.0f} {:>7.2f}x".format(
+                size_kb, before, after, after / before
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
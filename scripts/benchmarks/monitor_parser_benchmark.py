@@ -0,0 +1,107 @@
+# coding=utf-8
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Micro-benchmark for the monitor-events parsing path.
+
+Compares the reflection based decoding (parse_entity + unicode_binary_map) against the
+fixed-field decoders and reports events/sec for a full CommonParser.parse_message()
+and for CommonHandler dropping messages that do not match a --device-id filter.
+
+Usage:
+    python scripts/benchmarks/monitor_parser_benchmark.py [--events 20000]
+"""
+
+import argparse
+import json
+import time
+
+from uamqp.message import Message, MessageProperties
+
+from azext_iot.common.utility import parse_entity, unicode_binary_map
+from azext_iot.monitor.handlers import CommonHandler
+from azext_iot.monitor.models.arguments import CommonParserArguments, CommonHandlerArguments
+from azext_iot.monitor.parsers import decoder
+from azext_iot.monitor.parsers.common_parser import CommonParser
+
+
+def build_messages(count):
+    payload = json.dumps({"temperature": 21.5, "humidity": 40, "status": "ok"}).encode()
+    messages = []
+    for i in range(count):
+        properties = MessageProperties(
+            message_id="msg-{}".format(i),
+            content_encoding="utf-8",
+            content_type="application/json",
+        )
+        messages.append(
+            Message(
+                body=payload,
+                properties=properties,
+                annotations={
+                    decoder.DEVICE_ID_IDENTIFIER: "device-{}".format(i % 500).encode(),
+                    decoder.MODULE_ID_IDENTIFIER: b"module",
+                    b"iothub-enqueuedtime": 1600000000000 + i,
+                    b"x-opt-sequence-number": i,
+                    b"x-opt-offset": str(i * 512).encode(),
+                },
+                application_properties={b"appKey": b"appValue"},
+            )
+        )
+    return messages
+
+
+def legacy_decode(message):
+    unicode_binary_map(parse_entity(message.properties, True))
+    unicode_binary_map(message.annotations)
+
+
+def fixed_field_decode(message):
+    decoder.decode_system_properties(message.properties)
+    decoder.decode_annotations(message.annotations)
+
+
+def full_parse(message, args):
+    CommonParser(message=message, common_parser_args=args).parse_message()
+
+
+def filtered_handle(message, handler):
+    handler.parse_message(message)
+
+
+def measure(name, func, messages, *args):
+    start = time.perf_counter()
+    for message in messages:
+        func(message, *args)
+    elapsed = time.perf_counter() - start
+    rate = len(messages) / elapsed if elapsed else float("inf")
+    print("{:<28} {:>12,.0f} events/sec".format(name, rate))
+    return rate
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--events", type=int, default=20000)
+    options = arg_parser.parse_args()
+
+    messages = build_messages(options.events)
+    parser_args = CommonParserArguments(properties=["all"], content_type="application/json")
+
+    before = measure("decode (reflection)", legacy_decode, messages)
+    after = measure("decode (fixed-field)", fixed_field_decode, messages)
+    print("speedup: {:.1f}x".format(after / before))
+    measure("CommonParser.parse_message", full_parse, messages, parser_args)
+
+    handler = CommonHandler(
+        CommonHandlerArguments(
+            output="json", common_parser_args=parser_args, device_id="no-such-device"
+        )
+    )
+    measure("CommonHandler (filtered)", filtered_handle, messages, handler)
+
+
+if __name__ == "__main__":
+    main()